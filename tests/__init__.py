@@ -1 +1,6 @@
 """Init file for tests directory."""
+
+import os
+
+# Keep the tests from writing to the user's decoded map cache
+os.environ.setdefault("WAFERVIEW_NO_CACHE", "1")
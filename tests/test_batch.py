@@ -0,0 +1,119 @@
+"""Tests for batch module."""
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from waferview import batch
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML_DIR = os.path.join(TEST_PATH, "xml/SEMI_G85")
+
+
+class TestBatch(unittest.TestCase):
+    """Test the batch summarizer."""
+
+    def setUp(self):
+        """Set up a directory of maps including a broken one."""
+        self.tmp_dir = tempfile.mkdtemp()
+        shutil.copytree(TEST_XML_DIR, os.path.join(self.tmp_dir, "lot"))
+        self.bad_xml = os.path.join(self.tmp_dir, "lot", "broken.xml")
+        with open(self.bad_xml, "w", encoding="utf-8") as bad_file:
+            bad_file.write("<Map><Device>")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_find_maps(self):
+        """Test map files are found in directories."""
+        found = batch.find_maps([self.tmp_dir])
+        self.assertEqual(
+            [os.path.basename(path) for path in found],
+            ["SEMI_G85_1101_ALL.xml", "SEMI_G85_1101_MIN.xml", "broken.xml"],
+        )
+
+    def test_summarize(self):
+        """Test the summary of a single map."""
+        summary = batch.summarize(
+            os.path.join(TEST_XML_DIR, "SEMI_G85_1101_ALL.xml"), cache=False
+        )
+        self.assertNotIn("error", summary)
+        self.assertEqual(summary["wafer_id"], "ABCD123")
+        self.assertEqual(summary["lot_id"], "DEADBEEF")
+        self.assertEqual(summary["total_die"], 2808)
+        self.assertEqual(summary["pass"], 2765)
+        self.assertEqual(summary["fail"], 43)
+        self.assertEqual(summary["yield"], 98.47)
+        self.assertEqual(summary["bins"], {"00": 2765, "DE": 38, "AD": 5})
+        self.assertEqual(summary["count_mismatch"], "")
+
+    def test_summarize_error(self):
+        """Test a broken map is reported instead of raised."""
+        summary = batch.summarize(self.bad_xml, cache=False)
+        self.assertIn("ParseError", summary["error"])
+
+    def test_run_batch_pool(self):
+        """Test summaries from the process pool keep their order."""
+        paths = batch.find_maps([self.tmp_dir])
+        summaries = list(batch.run_batch(paths, workers=2, chunksize=1, cache=False))
+        self.assertEqual([summary["file"] for summary in summaries], paths)
+        self.assertEqual(summaries[0]["pass"], 2765)
+        self.assertIn("error", summaries[2])
+
+    def test_write_csv(self):
+        """Test the CSV output has a column per bin."""
+        paths = batch.find_maps([self.tmp_dir])
+        out_file = io.StringIO()
+        batch.write_csv(batch.run_batch(paths, workers=1, cache=False), out_file)
+        out_file.seek(0)
+        rows = list(csv.DictReader(out_file))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]["bin_DE"], "38")
+        self.assertEqual(rows[1]["yield"], "98.47")
+        self.assertEqual(rows[2]["bin_DE"], "0")
+        self.assertNotEqual(rows[2]["error"], "")
+
+    def test_write_csv_spatial(self):
+        """Test spatial statistics are added as extra columns."""
+        paths = batch.find_maps([TEST_XML_DIR])
+        out_file = io.StringIO()
+        summaries = batch.run_batch(paths, workers=1, cache=False, spatial_stats=True)
+        batch.write_csv(summaries, out_file)
+        out_file.seek(0)
+        rows = list(csv.DictReader(out_file))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["center_yield"], rows[1]["center_yield"])
+        self.assertNotEqual(rows[0]["fail_clusters"], "")
+
+    def test_profile(self):
+        """Test stage timings are recorded and profiled."""
+        paths = batch.find_maps([TEST_XML_DIR])
+        summaries = list(batch.run_batch(paths, workers=1, cache=False, profile=True))
+        self.assertIn("parse", summaries[0]["timings"])
+        self.assertIn("gen_map", summaries[0]["timings"])
+        profile = batch.stage_profile(summaries)
+        self.assertEqual(profile["parse"]["count"], 2)
+        self.assertGreaterEqual(profile["load"]["max"], profile["load"]["mean"])
+
+        out_file = io.StringIO()
+        batch.write_csv(summaries, out_file)
+        out_file.seek(0)
+        rows = list(csv.DictReader(out_file))
+        self.assertNotEqual(rows[0]["time_parse"], "")
+
+    def test_main_json(self):
+        """Test the command line entry point writing JSON."""
+        output = os.path.join(self.tmp_dir, "summary.json")
+        with mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            ret = batch.main([self.tmp_dir, "-o", output, "-j", "1", "--no-cache"])
+        self.assertEqual(ret, 1)
+        self.assertIn("broken.xml", stderr.getvalue())
+        with open(output, encoding="utf-8") as out_file:
+            summaries = json.load(out_file)
+        self.assertEqual(summaries[0]["bins"]["AD"], 5)
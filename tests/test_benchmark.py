@@ -0,0 +1,53 @@
+"""Tests for benchmark module."""
+
+import json
+import os
+import tempfile
+import unittest
+from waferview import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test the benchmark runner."""
+
+    def test_run_case(self):
+        """Test every stage is timed."""
+        results = benchmark.run_case(20, 30, repeat=2)
+        self.assertEqual([entry["stage"] for entry in results], list(benchmark.STAGES))
+        for entry in results:
+            self.assertEqual(entry["case"], "HexaDecimal-20x30-random")
+            self.assertEqual(entry["repeat"], 2)
+            self.assertLessEqual(entry["min"], entry["median"])
+
+    def test_compare(self):
+        """Test slower stages are reported as regressions."""
+        baseline = [
+            {"case": "a", "stage": "parse", "median": 1.0},
+            {"case": "a", "stage": "stats", "median": 1.0},
+        ]
+        results = [
+            {"case": "a", "stage": "parse", "median": 1.1},
+            {"case": "a", "stage": "stats", "median": 1.5},
+            {"case": "b", "stage": "stats", "median": 9.0},
+        ]
+        self.assertEqual(
+            benchmark.compare(results, baseline), [("a", "stats", 1.0, 1.5)]
+        )
+
+    def test_main(self):
+        """Test results are written as JSON and compared to a baseline."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_file = os.path.join(tmp_dir, "bench.json")
+            argv = ["-s", "10x12", "-b", "Decimal", "-r", "1", "-o", out_file]
+            self.assertEqual(benchmark.main(argv), 0)
+            with open(out_file, encoding="utf-8") as json_file:
+                report = json.load(json_file)
+            self.assertIn("numpy", report["environment"])
+            self.assertEqual(len(report["results"]), len(benchmark.STAGES))
+
+            for entry in report["results"]:
+                entry["median"] = 0
+            with open(out_file, "w", encoding="utf-8") as json_file:
+                json.dump(report, json_file)
+            argv[-1] = os.path.join(tmp_dir, "new.json")
+            self.assertEqual(benchmark.main(argv + ["-c", out_file]), 1)
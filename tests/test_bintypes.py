@@ -0,0 +1,89 @@
+"""Tests for bintypes module."""
+
+import unittest
+from waferview.bintypes import RowDecoder
+
+
+class TestRowDecoder(unittest.TestCase):
+    """Test the RowDecoder class."""
+
+    def test_decode_hex(self):
+        """Test decoding HexaDecimal rows."""
+        decoder = RowDecoder("HexaDecimal", ["00", "DE", "FF"])
+        indices = decoder.decode(["FF00DE", "deff00"])
+        self.assertEqual(indices.tolist(), [[2, 0, 1], [1, 2, 0]])
+
+    def test_decode_decimal(self):
+        """Test decoding Decimal rows."""
+        decoder = RowDecoder("Decimal", ["000", "001", "255"])
+        indices = decoder.decode(["255000", "001001"])
+        self.assertEqual(indices.tolist(), [[2, 0], [1, 1]])
+
+    def test_decode_ascii(self):
+        """Test decoding ASCII rows."""
+        decoder = RowDecoder("ASCII", ["P", "F", "."])
+        indices = decoder.decode([".PF.", "PPFF"])
+        self.assertEqual(indices.tolist(), [[2, 0, 1, 2], [0, 0, 1, 1]])
+
+    def test_decode_integer2(self):
+        """Test decoding Integer2 rows."""
+        decoder = RowDecoder("Integer2", ["0000", "0101", "FFFF"])
+        indices = decoder.decode(["FFFF0101", "00000000"])
+        self.assertEqual(indices.tolist(), [[2, 1], [0, 0]])
+
+    def test_decode_unknown_type(self):
+        """Test unknown bin types fall back to HexaDecimal."""
+        decoder = RowDecoder("foobar", ["00", "11"])
+        self.assertEqual(decoder.width, 2)
+        self.assertEqual(decoder.decode(["0011"]).tolist(), [[0, 1]])
+
+    def test_decode_ragged(self):
+        """Test rows are padded or cut to the column count."""
+        decoder = RowDecoder("HexaDecimal", ["00", "DE", "FF"])
+        indices = decoder.decode(["00DE", "DE00DEDE", "DE0"], cols=3, fill=2)
+        self.assertEqual(indices.tolist(), [[0, 1, 2], [1, 0, 1], [1, 2, 2]])
+        indices = decoder.decode(["00", "DEDE"], fill=2)
+        self.assertEqual(indices.tolist(), [[0, 2], [1, 1]])
+
+    def test_decode_mixed_case(self):
+        """Test every decoding path reads hexadecimal codes in either case."""
+        decoder = RowDecoder("HexaDecimal", ["A1", "0b"])
+        rows = ["a1A10B", "0bA1a1"]
+        expected = [[0, 0, 1], [1, 0, 0]]
+        self.assertEqual(decoder.decode(rows).tolist(), expected)
+        self.assertEqual(decoder._decode_chunks(rows, None, 0).tolist(), expected)
+        self.assertEqual(
+            decoder.decode(["a1A10B", "0bA"], 3).tolist(), [[0, 0, 1], [1, 0, 0]]
+        )
+        with self.assertRaises(KeyError) as err:
+            decoder.decode(["a1\u00e91"])
+        self.assertEqual(err.exception.args[0], "\u00e91")
+
+        decoder = RowDecoder("ASCII", ["\u00e9", "P"])
+        self.assertEqual(
+            decoder.decode(["\u00e9P", "P\u00e9"]).tolist(), [[0, 1], [1, 0]]
+        )
+
+    def test_decode_empty(self):
+        """Test decoding without any rows."""
+        decoder = RowDecoder("HexaDecimal", ["00"])
+        self.assertEqual(decoder.decode([]).size, 0)
+
+    def test_decode_unknown_code(self):
+        """Test a code missing from the bin table raises a KeyError."""
+        decoder = RowDecoder("HexaDecimal", ["00", "11"])
+        with self.assertRaises(KeyError) as err:
+            decoder.decode(["0011", "0022"])
+        self.assertEqual(err.exception.args[0], "22")
+
+    def test_decode_bad_characters(self):
+        """Test characters that are not valid codes raise a KeyError."""
+        decoder = RowDecoder("Decimal", ["000", "001"])
+        with self.assertRaises(KeyError) as err:
+            decoder.decode(["000001", "0x1000"])
+        self.assertEqual(err.exception.args[0], "0x1")
+
+        decoder = RowDecoder("HexaDecimal", ["00", "11"])
+        with self.assertRaises(KeyError) as err:
+            decoder.decode(["00 1"])
+        self.assertEqual(err.exception.args[0], " 1")
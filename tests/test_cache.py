@@ -0,0 +1,137 @@
+"""Tests for cache module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from waferview import cache, wafermap
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+
+
+class TestMapCache(unittest.TestCase):
+    """Test the MapCache class."""
+
+    def setUp(self):
+        """Set up a cache in a temporary directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.xml_file = os.path.join(self.tmp_dir, "map.xml")
+        shutil.copy(TEST_XML, self.xml_file)
+        self.cache = cache.MapCache(os.path.join(self.tmp_dir, "cache"))
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_cold_then_warm(self):
+        """Test a decoded map is stored and reopened from the cache."""
+        self.assertIsNone(self.cache.get(self.xml_file))
+        cold = wafermap.WaferMap(self.xml_file, cache=self.cache)
+        self.assertEqual(len(self.cache.entries()), 1)
+
+        with mock.patch.object(wafermap.WaferMap, "parse") as mock_parse:
+            warm = wafermap.WaferMap(self.xml_file, cache=self.cache)
+        mock_parse.assert_not_called()
+        self.assertIsInstance(warm.die_grid, np.memmap)
+        np.testing.assert_array_equal(warm.die_grid, cold.die_grid)
+        self.assertEqual(warm.device_attr, cold.device_attr)
+        self.assertEqual(warm.bin_codes, cold.bin_codes)
+        self.assertEqual(warm.bin_table, cold.bin_table)
+        self.assertEqual(warm.format, cold.format)
+        self.assertEqual(warm.pixels, cold.pixels)
+
+    def test_modified_file_misses(self):
+        """Test changing the source file invalidates the entry."""
+        wafermap.WaferMap(self.xml_file, cache=self.cache)
+        stat = os.stat(self.xml_file)
+        os.utime(self.xml_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNone(self.cache.get(self.xml_file))
+
+    def test_lazy_load_fills_cache(self):
+        """Test a lazily loaded map is cached once its data is decoded."""
+        wmap = wafermap.WaferMap(self.xml_file, lazy=True, cache=self.cache)
+        self.assertEqual(self.cache.entries(), [])
+        wmap.die_grid
+        self.assertEqual(len(self.cache.entries()), 1)
+
+    def test_opt_out(self):
+        """Test caching can be turned off."""
+        wafermap.WaferMap(self.xml_file, cache=False)
+        self.assertIsNone(cache.get_cache(False))
+        with mock.patch.dict(os.environ, {"WAFERVIEW_NO_CACHE": "1"}):
+            self.assertIsNone(cache.get_cache(True))
+        self.assertIs(cache.get_cache(self.cache), self.cache)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entries are evicted first."""
+        paths = []
+        for num in range(3):
+            path = os.path.join(self.tmp_dir, f"map{num}.xml")
+            shutil.copy(TEST_XML, path)
+            paths.append(path)
+            wafermap.WaferMap(path, cache=self.cache)
+        entry_size = self.cache.entries()[0][1]
+        for num, path in enumerate(paths):
+            base = os.path.join(self.cache.cache_dir, self.cache.key(path))
+            os.utime(f"{base}.json", (num + 1, num + 1))
+
+        # Reading the oldest entry makes the second map least recently used
+        self.assertIsNotNone(self.cache.get(paths[0]))
+        self.cache.max_bytes = 2 * entry_size
+        self.cache.evict()
+        self.assertEqual(len(self.cache.entries()), 2)
+        self.assertIsNotNone(self.cache.get(paths[0]))
+        self.assertIsNone(self.cache.get(paths[1]))
+        self.assertIsNotNone(self.cache.get(paths[2]))
+
+    def test_put_tracks_size(self):
+        """Test stores only scan the cache when it has to be trimmed."""
+        paths = []
+        for num in range(4):
+            path = os.path.join(self.tmp_dir, f"map{num}.xml")
+            shutil.copy(TEST_XML, path)
+            paths.append(path)
+        wafermap.WaferMap(paths[0], cache=self.cache)
+        entry_size = self.cache.entries()[0][1]
+        with mock.patch.object(
+            self.cache, "entries", wraps=self.cache.entries
+        ) as entries:
+            wafermap.WaferMap(paths[1], cache=self.cache)
+            entries.assert_not_called()
+            self.cache.max_bytes = 2.5 * entry_size
+            wafermap.WaferMap(paths[2], cache=self.cache)
+            self.assertEqual(entries.call_count, 1)
+        self.assertEqual(len(self.cache.entries()), 2)
+
+    def test_changed_while_parsing(self):
+        """Test a map is cached under the stamp it had when reading began."""
+        parse = wafermap.WaferMap.parse
+
+        def parse_then_touch(wmap, *args, **kwargs):
+            parse(wmap, *args, **kwargs)
+            os.utime(self.xml_file, ns=(0, 10**9))
+
+        old_key = self.cache.key(self.xml_file)
+        with mock.patch.object(wafermap.WaferMap, "parse", parse_then_touch):
+            wafermap.WaferMap(self.xml_file, cache=self.cache)
+        self.assertIsNotNone(self.cache.get(self.xml_file, old_key))
+        self.assertIsNone(self.cache.get(self.xml_file))
+
+    def test_changed_after_header(self):
+        """Test a lazy map is cached under the stamp taken before its header."""
+        old_key = self.cache.key(self.xml_file)
+        wmap = wafermap.WaferMap.header(self.xml_file, cache=self.cache)
+        os.utime(self.xml_file, ns=(0, 10**9))
+        self.assertIsNotNone(wmap.die_grid)
+        self.assertIsNotNone(self.cache.get(self.xml_file, old_key))
+        self.assertIsNone(self.cache.get(self.xml_file))
+
+    def test_clear(self):
+        """Test clearing the cache."""
+        wafermap.WaferMap(self.xml_file, cache=self.cache)
+        self.cache.clear()
+        self.assertEqual(self.cache.entries(), [])
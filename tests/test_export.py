@@ -0,0 +1,183 @@
+"""Tests for export module."""
+
+import csv
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from waferview import export, wafermap
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+TEST_SINF = os.path.join(TEST_PATH, "xml/SINF/SINF_MIN.txt")
+
+
+class TestExport(unittest.TestCase):
+    """Test the die table exporters."""
+
+    def setUp(self):
+        """Set up a wafer map and an output directory."""
+        self.wmap = wafermap.WaferMap(TEST_XML, cache=False)
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the output directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_die_chunks(self):
+        """Test blocks cover every tested die in whole rows."""
+        chunks = list(export.die_chunks(self.wmap, chunk_dies=500))
+        self.assertGreater(len(chunks), 1)
+        row = np.concatenate([chunk["row"] for chunk in chunks])
+        col = np.concatenate([chunk["col"] for chunk in chunks])
+        bins = np.concatenate([chunk["bin"] for chunk in chunks])
+        self.assertEqual(len(row), 2808)
+        np.testing.assert_array_equal(bins, self.wmap.die_grid[row, col])
+        self.assertNotIn(self.wmap.bin_table.index("FF"), bins)
+
+        rows, cols = self.wmap.die_grid.shape
+        chunks = list(export.die_chunks(self.wmap, include_null=True))
+        self.assertEqual(sum(len(chunk["row"]) for chunk in chunks), rows * cols)
+
+    def test_csv(self):
+        """Test the CSV table holds one line per tested die."""
+        out_file = io.StringIO(newline="")
+        with export.CsvWriter(out_file, chunk_dies=500) as writer:
+            self.assertEqual(writer.write(self.wmap), 2808)
+        out_file.seek(0)
+        rows = list(csv.DictReader(out_file))
+        self.assertEqual(len(rows), 2808)
+        self.assertEqual(list(rows[0]), export.COLUMNS)
+        self.assertEqual(
+            rows[0],
+            {
+                "wafer_id": "ABCD123",
+                "lot_id": "DEADBEEF",
+                "row": "0",
+                "col": "27",
+                "x": "-12.5000",
+                "y": "147.5000",
+                "bin": "DE",
+                "desc": "Fail",
+                "result": "Fail",
+            },
+        )
+        results = [row["result"] for row in rows]
+        self.assertEqual(results.count("Pass"), 2765)
+        self.assertIn(
+            {"bin": "AD", "desc": "QC"},
+            [{"bin": row["bin"], "desc": row["desc"]} for row in rows],
+        )
+
+    def test_csv_append(self):
+        """Test a CSV table is extended without a second header."""
+        path = os.path.join(self.tmp_dir, "dies.csv")
+        export.export_map(self.wmap, path)
+        export.export_map(self.wmap, path, append=True)
+        with open(path, newline="", encoding="utf-8") as csv_file:
+            lines = list(csv.reader(csv_file))
+        self.assertEqual(len(lines), 1 + 2 * 2808)
+        self.assertEqual(lines.count(export.COLUMNS), 1)
+
+    def test_npz_batch(self):
+        """Test several wafers are written to one NPZ table."""
+        path = os.path.join(self.tmp_dir, "dies.npz")
+        with export.open_writer(path, chunk_dies=500) as writer:
+            self.assertIsInstance(writer, export.NpzWriter)
+            results = list(export.export_files([TEST_XML, TEST_SINF], writer, False))
+        self.assertEqual(results[1], {"file": TEST_SINF, "dies": 2808})
+        with np.load(path) as table:
+            self.assertEqual(len(table["row"]), 2 * 2808)
+            self.assertEqual(table["wafer_id"].tolist(), ["ABCD123", "P6AB36-01"])
+            self.assertEqual(np.bincount(table["wafer"]).tolist(), [2808, 2808])
+            self.assertEqual(int(table["passed"].sum()), 2 * 2765)
+            first = table["wafer"] == 0
+            row, col = table["row"][first], table["col"][first]
+            codes = table["bin_code"][table["bin"][first]]
+            grid_codes = np.array(self.wmap.bin_table)[self.wmap.die_grid[row, col]]
+            np.testing.assert_array_equal(codes, grid_codes)
+            second = table["bin"][~first]
+            self.assertEqual(sorted(set(table["bin_code"][second])), ["00", "AD", "DE"])
+
+    def test_npz_empty_wafer(self):
+        """Test a wafer without tested dies keeps its row in the wafer table."""
+        sinf = b"WAFER:W00\nROWCT:1\nCOLCT:2\nBCEQU:01\nRowData:__ __\n"
+        empty = wafermap.WaferMap(io.BytesIO(sinf), cache=False)
+        path = os.path.join(self.tmp_dir, "dies.npz")
+        with export.NpzWriter(path, chunk_dies=500) as writer:
+            self.assertEqual(writer.write(empty), 0)
+            self.assertEqual(writer.write(self.wmap), 2808)
+        with np.load(path) as table:
+            self.assertEqual(table["wafer_id"].tolist(), ["W00", "ABCD123"])
+            self.assertEqual(set(table["wafer"].tolist()), {1})
+
+    def test_npz_failed_wafer(self):
+        """Test the dies of a wafer that fails part way are not kept."""
+        die_chunks = export.die_chunks
+
+        def failing_chunks(*args):
+            chunks = die_chunks(*args)
+            yield next(chunks)
+            yield next(chunks)
+            raise OSError("read failed")
+
+        path = os.path.join(self.tmp_dir, "dies.npz")
+        with export.NpzWriter(path, chunk_dies=500) as writer:
+            with mock.patch.object(export, "die_chunks", failing_chunks):
+                with self.assertRaises(OSError):
+                    writer.write(self.wmap)
+            self.assertEqual(writer.dies, 0)
+            sinf = wafermap.WaferMap(TEST_SINF, cache=False)
+            self.assertEqual(writer.write(sinf), 2808)
+        with np.load(path) as table:
+            self.assertEqual(table["wafer_id"].tolist(), ["P6AB36-01"])
+            self.assertEqual(len(table["row"]), 2808)
+            self.assertEqual(set(table["wafer"].tolist()), {0})
+
+    def test_export_errors(self):
+        """Test bad files are reported and bad options refused."""
+        bad_xml = os.path.join(self.tmp_dir, "bad.xml")
+        with open(bad_xml, "w", encoding="utf-8") as xml_file:
+            xml_file.write("<Map><Device>")
+        out_file = io.StringIO(newline="")
+        with export.CsvWriter(out_file) as writer:
+            results = list(export.export_files([bad_xml, TEST_XML], writer, False))
+        self.assertIn("ParseError", results[0]["error"])
+        self.assertEqual(results[1]["dies"], 2808)
+        self.assertEqual(writer.wafers, 1)
+        with self.assertRaises(ValueError):
+            export.open_writer(os.path.join(self.tmp_dir, "dies.npz"), append=True)
+        with self.assertRaises(ValueError):
+            export.open_writer(os.path.join(self.tmp_dir, "dies.csv"), compress=True)
+        with self.assertRaises(SystemExit), mock.patch("sys.stderr", io.StringIO()):
+            export.main(
+                [TEST_XML, "-o", os.path.join(self.tmp_dir, "dies.csv"), "--compress"]
+            )
+
+    @unittest.skipUnless(
+        importlib.util.find_spec("pyarrow"), "pyarrow is not installed"
+    )
+    def test_parquet(self):
+        """Test the Parquet table holds one row per tested die."""
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+
+        path = os.path.join(self.tmp_dir, "dies.parquet")
+        self.assertEqual(export.export_map(self.wmap, path, chunk_dies=500), 2808)
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.column_names, export.COLUMNS)
+        self.assertEqual(table.num_rows, 2808)
+        self.assertEqual(table.column("result").to_pylist().count("Pass"), 2765)
+
+    def test_main(self):
+        """Test the command line writes one table for a directory."""
+        for name in ("wafer1.xml", "wafer2.xml"):
+            shutil.copy(TEST_XML, os.path.join(self.tmp_dir, name))
+        path = os.path.join(self.tmp_dir, "dies.csv")
+        self.assertEqual(export.main([self.tmp_dir, "-o", path, "--no-cache"]), 0)
+        with open(path, newline="", encoding="utf-8") as csv_file:
+            self.assertEqual(len(list(csv.DictReader(csv_file))), 2 * 2808)
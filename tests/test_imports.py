@@ -0,0 +1,99 @@
+"""Tests for the import cost of the core modules."""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+CORE_MODULES = [
+    "waferview.batch",
+    "waferview.bintypes",
+    "waferview.cache",
+    "waferview.export",
+    "waferview.parsers",
+    "waferview.render",
+    "waferview.session",
+    "waferview.sources",
+    "waferview.spatial",
+    "waferview.stack",
+    "waferview.synthetic",
+    "waferview.tracing",
+    "waferview.wafermap",
+    "waferview.watch",
+]
+
+# Modules only needed by command line entry points, worker pools, optional
+# features or the GUI, which batch workers must not pay for
+LAZY_MODULES = [
+    "argparse",
+    "bz2",
+    "concurrent.futures",
+    "gzip",
+    "importlib.metadata",
+    "logging",
+    "lzma",
+    "tempfile",
+    "waferview.gui",
+    "waferview.spatial",
+    "wx",
+]
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import time of the batch worker modules in ms, not counting NumPy
+IMPORT_BUDGET_MS = 150
+
+
+def run_python(code, *options):
+    """Run code in a fresh interpreter and return its stdout and stderr."""
+    result = subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout, result.stderr
+
+
+class TestImports(unittest.TestCase):
+    """Test the core modules import without wxPython and stay light."""
+
+    def test_core_without_wx(self):
+        """Test every core module imports with wxPython unavailable."""
+        stdout, _ = run_python(
+            "import importlib, json, sys\n"
+            "sys.modules['wx'] = None\n"
+            f"for name in {CORE_MODULES!r}:\n"
+            "    importlib.import_module(name)\n"
+            "print(json.dumps(sorted(sys.modules)))\n"
+        )
+        loaded = json.loads(stdout)
+        self.assertNotIn("waferview.gui", loaded)
+        self.assertFalse([name for name in loaded if name.startswith("wx.")])
+
+    def test_lazy_modules(self):
+        """Test the batch worker modules leave optional imports for later."""
+        stdout, _ = run_python(
+            "import json, sys\n"
+            "import waferview.batch, waferview.wafermap\n"
+            "print(json.dumps(sorted(sys.modules)))\n"
+        )
+        loaded = set(json.loads(stdout))
+        self.assertEqual(sorted(loaded.intersection(LAZY_MODULES)), [])
+
+    def test_import_budget(self):
+        """Test the batch worker modules import within the time budget."""
+        best = None
+        for _ in range(3):
+            _, stderr = run_python("import waferview.batch", "-X", "importtime")
+            cumulative = {}
+            for line in stderr.splitlines():
+                _, _, timing = line.partition("import time:")
+                fields = [field.strip() for field in timing.split("|")]
+                if len(fields) == 3 and fields[1].isdigit():
+                    cumulative[fields[2]] = int(fields[1])
+            own_ms = (cumulative["waferview.batch"] - cumulative["numpy"]) / 1000
+            best = own_ms if best is None else min(best, own_ms)
+        self.assertLess(best, IMPORT_BUDGET_MS)
@@ -0,0 +1,135 @@
+"""Tests for parsers module."""
+
+import io
+import os
+import sys
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock
+import numpy as np
+from waferview import parsers, tracing, wafermap
+from waferview.constants import CHIP_SIZE, LOT_ID, WAFER_ID, XML_BACKEND_ENV
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_MIN.xml")
+TEST_SINF = os.path.join(TEST_PATH, "xml/SINF/SINF_MIN.txt")
+
+
+def die_codes(wmap):
+    """Return the grid of bin codes with untested dies as None."""
+    codes = np.array(
+        [
+            code if wmap.bin_codes[code]["status"] is not None else None
+            for code in wmap.bin_table
+        ],
+        dtype=object,
+    )
+    return codes[wmap.die_grid]
+
+
+class TestBackends(unittest.TestCase):
+    """Test the choice of XML parser backend."""
+
+    def tearDown(self):
+        """Forget backends found with modules hidden."""
+        parsers.available_backends.cache_clear()
+
+    def test_default_fastest(self):
+        """Test the first available backend is chosen by default."""
+        with mock.patch.dict(os.environ, {XML_BACKEND_ENV: ""}):
+            self.assertEqual(parsers.xml_backend(), parsers.available_backends()[0])
+        self.assertIn("etree", parsers.available_backends())
+
+    def test_fallback_without_lxml(self):
+        """Test the standard library parser is used when lxml is missing."""
+        parsers.available_backends.cache_clear()
+        with mock.patch.dict(sys.modules, {"lxml": None, "lxml.etree": None}):
+            self.assertEqual(parsers.available_backends(), ["etree"])
+            with mock.patch.dict(os.environ, {XML_BACKEND_ENV: ""}):
+                self.assertEqual(parsers.xml_backend(), "etree")
+            with self.assertRaises(ValueError):
+                parsers.xml_backend("lxml")
+
+    def test_environment(self):
+        """Test the environment variable picks the backend."""
+        with mock.patch.dict(os.environ, {XML_BACKEND_ENV: "etree"}):
+            self.assertEqual(parsers.xml_backend(), "etree")
+            self.assertEqual(wafermap.WaferMap(TEST_XML, cache=False).backend, "etree")
+        with mock.patch.dict(os.environ, {XML_BACKEND_ENV: "expat"}):
+            with self.assertRaises(ValueError):
+                parsers.xml_backend()
+
+    def test_backends_agree(self):
+        """Test every available backend decodes the same die grid."""
+        grids = []
+        for backend in parsers.available_backends():
+            with mock.patch.dict(os.environ, {XML_BACKEND_ENV: backend}):
+                grids.append(wafermap.WaferMap(TEST_XML, cache=False).die_grid)
+        for grid in grids[1:]:
+            np.testing.assert_array_equal(grid, grids[0])
+
+    def test_parse_error(self):
+        """Test broken XML raises ParseError on every backend."""
+        for backend in parsers.available_backends():
+            reader = parsers.G85Reader(backend)
+            with self.assertRaises(ET.ParseError):
+                reader.feed(b"<Map><Device></Map>")
+                reader.close()
+
+    def test_backend_in_span(self):
+        """Test the parse span names the backend that was used."""
+        spans = {}
+        hook = lambda name, seconds, fields: spans.setdefault(name, fields)
+        tracing.add_hook(hook)
+        try:
+            wmap = wafermap.WaferMap(TEST_XML, cache=False)
+        finally:
+            tracing.remove_hook(hook)
+        self.assertEqual(spans["parse"], {"backend": wmap.backend})
+        self.assertIn("parse", wmap.timings)
+
+
+class TestFormats(unittest.TestCase):
+    """Test the format decoders build the same die grid."""
+
+    def test_detect(self):
+        """Test the decoder is picked from the start of the file."""
+        self.assertIsInstance(parsers.reader_for(b"<?xml"), parsers.G85Reader)
+        self.assertIsInstance(parsers.reader_for("\ufeff<Map>"), parsers.G85Reader)
+        self.assertIsInstance(parsers.reader_for(b"DEVICE:ABC\n"), parsers.SinfReader)
+        self.assertIsInstance(parsers.reader_for(b"garbage"), parsers.G85Reader)
+
+    def test_sinf(self):
+        """Test a SINF row map decodes like the same map in G85 XML."""
+        g85 = wafermap.WaferMap(TEST_XML, cache=False)
+        sinf = wafermap.WaferMap(TEST_SINF, cache=False)
+        self.assertTrue(sinf.is_valid)
+        self.assertEqual(sinf.format, "SINF")
+        self.assertEqual(sinf.backend, "text")
+        self.assertEqual(sinf.device_attr[WAFER_ID], "P6AB36-01")
+        self.assertEqual(sinf.device_attr[LOT_ID], "DEADBEEF")
+        self.assertEqual(sinf.device_attr[CHIP_SIZE], [5000.0, 5000.0])
+        self.assertEqual(sinf.die_grid.shape, (60, 60))
+        self.assertEqual(sinf.die_grid.dtype, np.uint8)
+        np.testing.assert_array_equal(die_codes(sinf), die_codes(g85))
+        sinf_stats = sinf.stats()
+        g85_stats = g85.stats()
+        for key in ("total_die", "pass", "fail", "yield"):
+            self.assertEqual(sinf_stats[key], g85_stats[key])
+        self.assertEqual(sinf_stats["mismatch"], {})
+
+    def test_sinf_packed(self):
+        """Test rows without spaces between codes and with @@ dies."""
+        sinf = (
+            "WAFER:W01\nROWCT:2\nCOLCT:3\nBCEQU:1\n"
+            "RowData:01@@0a\r\n"
+            "RowData:__ 01 0A\n"
+        )
+        wmap = wafermap.WaferMap(io.BytesIO(sinf.encode("ascii")), cache=False)
+        self.assertEqual(
+            die_codes(wmap).tolist(), [["01", None, "0A"], [None, "01", "0A"]]
+        )
+        self.assertTrue(wmap.bin_codes["01"]["status"])
+        self.assertFalse(wmap.bin_codes["0A"]["status"])
+        self.assertEqual(wmap.stats()["yield"], 50.0)
@@ -0,0 +1,105 @@
+"""Tests for render module."""
+
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+import numpy as np
+from waferview import render, wafermap
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+
+
+def read_png(data):
+    """Decode an unfiltered 8 bit RGB PNG written by render.write_png."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    chunks = {}
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos : pos + 4])
+        chunk_type = data[pos + 4 : pos + 8]
+        chunk = data[pos + 8 : pos + 8 + length]
+        (crc,) = struct.unpack(">I", data[pos + 8 + length : pos + 12 + length])
+        assert crc == zlib.crc32(chunk_type + chunk)
+        chunks[chunk_type] = chunk
+        pos += 12 + length
+    width, height = struct.unpack(">II", chunks[b"IHDR"][:8])
+    raw = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    return raw.reshape(height, width * 3 + 1)[:, 1:].reshape(height, width, 3)
+
+
+class TestRender(unittest.TestCase):
+    """Test headless rendering."""
+
+    def setUp(self):
+        """Set up a wafer map."""
+        self.wmap = wafermap.WaferMap(TEST_XML, cache=False)
+
+    def test_hex_to_rgb(self):
+        """Test color string conversion."""
+        self.assertEqual(render.hex_to_rgb("#66CC00"), (0x66, 0xCC, 0x00))
+
+    def test_palette(self):
+        """Test default and overridden bin colors."""
+        table = render.palette(self.wmap, {"QC": "#0000FF"})
+        self.assertEqual(self.wmap.bin_table, ["00", "DE", "AD", "FF"])
+        self.assertEqual(table[0].tolist(), [0x66, 0xCC, 0x00])
+        self.assertEqual(table[1].tolist(), [0xCC, 0x33, 0x00])
+        self.assertEqual(table[2].tolist(), [0x00, 0x00, 0xFF])
+        self.assertEqual(table[3].tolist(), [0x66, 0x66, 0x66])
+
+    def test_render_rgb(self):
+        """Test each die is drawn as a block with the first row at the bottom."""
+        rgb = render.render_rgb(self.wmap, die_size=(3, 2))
+        self.assertEqual(rgb.shape, (120, 180, 3))
+        table = render.palette(self.wmap)
+        expected = table[self.wmap.die_grid[0, 27]]
+        np.testing.assert_array_equal(rgb[118:120, 81:84], [[expected] * 3] * 2)
+
+    def test_write_png(self):
+        """Test the PNG data decodes back to the same image."""
+        rgb = render.render_rgb(self.wmap, die_size=2)
+        png_file = io.BytesIO()
+        render.write_png(png_file, rgb)
+        np.testing.assert_array_equal(read_png(png_file.getvalue()), rgb)
+
+    def test_die_rects(self):
+        """Test dies smaller than a pixel still get rectangles that tile."""
+        shape = (2000, 2000)
+        cols = np.arange(2000)
+        rows = np.zeros(2000, dtype=int)
+        rects = np.array(render.die_rects(rows, cols, shape, (10, 10, 600, 600)))
+        self.assertTrue((rects[:, 2:] >= 1).all())
+
+        # Zoomed in 8 times the dies are 2.4 pixels wide and meet edge to edge
+        matrix = (8, 0, 0, 8, -100, -50)
+        rects = np.array(
+            render.die_rects(rows, cols, shape, (10, 10, 600, 600), matrix)
+        )
+        self.assertTrue((rects[:, 2] >= 2).all())
+        np.testing.assert_array_equal(rects[1:, 0], rects[:-1, 0] + rects[:-1, 2])
+        self.assertEqual(rects[0, 0], 10 * 8 - 100)
+        self.assertEqual(rects[0, 1] + rects[0, 3], 610 * 8 - 50)
+
+    def test_output_names(self):
+        """Test maps with the same name get distinct image names."""
+        names = render.output_names(
+            ["a/lot1.xml", "b/lot1.xml", "c/LOT1.xml", "lot2.xml"]
+        )
+        self.assertEqual(list(names.values()), ["lot1", "lot1_1", "LOT1_2", "lot2"])
+
+    def test_main(self):
+        """Test the command line renderer."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            ret = render.main([TEST_XML, "-o", tmp_dir, "-j", "1", "--no-cache"])
+            self.assertEqual(ret, 0)
+            with open(os.path.join(tmp_dir, "SEMI_G85_1101_ALL.png"), "rb") as png:
+                self.assertEqual(read_png(png.read()).shape, (60, 60, 3))
+        finally:
+            shutil.rmtree(tmp_dir)
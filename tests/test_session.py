@@ -0,0 +1,89 @@
+"""Tests for session module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from waferview import session, wafermap
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+
+
+class TestMapSession(unittest.TestCase):
+    """Test the MapSession class."""
+
+    def setUp(self):
+        """Set up copies of a test map in a temporary directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for index in range(3):
+            path = os.path.join(self.tmp_dir, f"wafer{index}.xml")
+            shutil.copy(TEST_XML, path)
+            self.paths.append(path)
+        self.wmap = wafermap.WaferMap(TEST_XML, cache=False)
+        self.map_bytes = session.map_nbytes(self.wmap)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_open_close(self):
+        """Test maps are listed until closed."""
+        maps = session.MapSession()
+        self.assertEqual(maps.open(self.paths[0]), 0)
+        self.assertEqual(maps.open(self.paths[1]), 1)
+        self.assertEqual(maps.open(self.paths[0]), 0)
+        self.assertIn(self.paths[1], maps)
+        maps.load(self.paths[1], cache=False)
+        maps.close(self.paths[1])
+        self.assertNotIn(self.paths[1], maps)
+        self.assertEqual(len(maps), 1)
+        self.assertEqual(maps.cached(), [])
+
+    def test_load_reuses_map(self):
+        """Test a map is only decoded again after it is evicted."""
+        maps = session.MapSession()
+        first = maps.load(self.paths[0], cache=False)
+        with mock.patch.object(wafermap.WaferMap, "parse") as mock_parse:
+            second = maps.load(self.paths[0], cache=False)
+        mock_parse.assert_not_called()
+        self.assertIs(first, second)
+
+    def test_evict_least_recent(self):
+        """Test the least recently used maps are dropped over the limit."""
+        maps = session.MapSession(max_bytes=2 * self.map_bytes)
+        for path in self.paths[:2]:
+            maps.put(path, self.wmap)
+        maps.get(self.paths[0])
+        maps.put(self.paths[2], self.wmap)
+        self.assertEqual(maps.cached(), [self.paths[0], self.paths[2]])
+        self.assertIsNone(maps.get(self.paths[1]))
+        self.assertEqual(maps.paths, self.paths)
+        self.assertEqual(maps.nbytes, 2 * self.map_bytes)
+
+    def test_extras(self):
+        """Test rendered objects count against the limit and keep the newest map."""
+        maps = session.MapSession(max_bytes=2 * self.map_bytes)
+        maps.put(self.paths[0], self.wmap)
+        maps.put(self.paths[1], self.wmap)
+        maps.set_extra(self.paths[1], "image", "bitmap", self.map_bytes)
+        self.assertEqual(maps.cached(), [self.paths[1]])
+        self.assertEqual(maps.get_extra(self.paths[1], "image"), "bitmap")
+        self.assertIsNone(maps.get_extra(self.paths[0], "image"))
+        maps.set_extra(self.paths[0], "image", "bitmap", 1)
+        self.assertEqual(maps.cached(), [self.paths[1]])
+
+    def test_rows_released(self):
+        """Test only the die grid of a decoded map is counted."""
+        self.assertIsNone(self.wmap._map_data["Device"]["Data"]["Row"])
+        self.assertEqual(self.map_bytes, self.wmap.die_grid.nbytes)
+
+    def test_size_from_environment(self):
+        """Test the memory limit is read from the environment."""
+        with mock.patch.dict(os.environ, {session.SESSION_SIZE_ENV: "2"}):
+            self.assertEqual(session.MapSession().max_bytes, 2 * 1024 * 1024)
+        with mock.patch.dict(os.environ, {session.SESSION_SIZE_ENV: ""}):
+            self.assertEqual(session.MapSession().max_bytes, session.SESSION_SIZE)
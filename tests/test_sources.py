@@ -0,0 +1,129 @@
+"""Tests for sources module."""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from waferview import sources, wafermap
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_MIN.xml")
+
+
+class TestSources(unittest.TestCase):
+    """Test opening the supported map sources."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Read the test map once."""
+        with open(TEST_XML, "rb") as xml_file:
+            cls.data = xml_file.read()
+
+    def setUp(self):
+        """Set up a temporary directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def read_all(self, source):
+        """Return all bytes read from a source in small chunks."""
+        chunks = []
+        with sources.open_source(source) as reader:
+            while chunk := reader.read(1000):
+                chunks.append(bytes(chunk))
+        return b"".join(chunks)
+
+    def test_buffer_reader(self):
+        """Test the buffer reader returns views and seeks."""
+        reader = sources.BufferReader(b"abcdef")
+        chunk = reader.read(4)
+        self.assertIsInstance(chunk, memoryview)
+        self.assertEqual(bytes(chunk), b"abcd")
+        self.assertEqual(reader.tell(), 4)
+        self.assertEqual(bytes(reader.read()), b"ef")
+        self.assertEqual(bytes(reader.read(2)), b"")
+        reader.seek(-3, io.SEEK_END)
+        self.assertEqual(bytes(reader.read(10)), b"def")
+
+    def test_bytes(self):
+        """Test bytes, bytearray and memoryview sources."""
+        self.assertEqual(self.read_all(self.data), self.data)
+        self.assertEqual(self.read_all(bytearray(self.data)), self.data)
+        self.assertEqual(self.read_all(memoryview(self.data)), self.data)
+
+    def test_compressed_bytes(self):
+        """Test compressed data is detected from its magic bytes."""
+        for compress in (gzip.compress, bz2.compress, lzma.compress):
+            self.assertEqual(self.read_all(compress(self.data)), self.data)
+
+    def test_compressed_path(self):
+        """Test a gzip compressed file."""
+        path = os.path.join(self.tmp_dir, "map.xml.gz")
+        with gzip.open(path, "wb") as gz_file:
+            gz_file.write(self.data)
+        self.assertEqual(self.read_all(path), self.data)
+
+    def test_file_objects(self):
+        """Test peekable, seekable and unseekable binary streams."""
+        compressed = gzip.compress(self.data)
+        with open(TEST_XML, "rb") as xml_file:
+            self.assertEqual(self.read_all(xml_file), self.data)
+        self.assertEqual(self.read_all(io.BytesIO(compressed)), self.data)
+        stream = io.BytesIO(compressed)
+        with mock.patch.object(stream, "seekable", return_value=False):
+            self.assertEqual(self.read_all(stream), self.data)
+
+    def test_text_stream(self):
+        """Test text streams are passed through."""
+        stream = io.StringIO("<Map/>")
+        with sources.open_source(stream) as reader:
+            self.assertIs(reader, stream)
+            self.assertEqual(reader.read(), "<Map/>")
+
+    def test_mmap(self):
+        """Test large files are memory mapped."""
+        with mock.patch.object(sources, "MMAP_THRESHOLD", 0):
+            with sources.open_source(TEST_XML) as reader:
+                self.assertIsInstance(reader, sources.BufferReader)
+                self.assertEqual(bytes(reader.read(5)), self.data[:5])
+            self.assertTrue(reader.buffer.closed)
+            self.assertEqual(self.read_all(TEST_XML), self.data)
+            readers = []
+            close = sources.BufferReader.close
+
+            def record_close(reader):
+                close(reader)
+                readers.append(reader)
+
+            with mock.patch.object(sources.BufferReader, "close", record_close):
+                wmap = wafermap.WaferMap(TEST_XML, cache=False)
+            self.assertTrue(readers[0].buffer.closed)
+        self.assertEqual(wmap.device_attr["rows"], 60)
+
+    def test_wafer_map_sources(self):
+        """Test wafer maps load the same from every kind of source."""
+        expected = wafermap.WaferMap(TEST_XML, cache=False)
+        compressed = gzip.compress(self.data)
+        for source in (
+            self.data,
+            memoryview(compressed),
+            io.BytesIO(compressed),
+        ):
+            wmap = wafermap.WaferMap(source)
+            self.assertEqual(wmap.device_attr, expected.device_attr)
+            self.assertEqual(wmap.die_grid.tolist(), expected.die_grid.tolist())
+
+    def test_wafer_map_lazy_compressed(self):
+        """Test a lazy map reloads its die data from compressed bytes."""
+        expected = wafermap.WaferMap(TEST_XML, cache=False)
+        wmap = wafermap.WaferMap.header(gzip.compress(self.data))
+        self.assertIsNone(wmap._die_grid)
+        self.assertEqual(wmap.die_grid.tolist(), expected.die_grid.tolist())
@@ -0,0 +1,150 @@
+"""Tests for spatial module."""
+
+import os
+import types
+import unittest
+import numpy as np
+from waferview import spatial, wafermap
+from waferview.constants import CHIP_SIZE, WAFER_SIZE
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+
+
+def make_map(grid):
+    """Return a minimal wafer map with pass (0), fail (1) and null (2) dies."""
+    grid = np.array(grid)
+    return types.SimpleNamespace(
+        die_grid=grid,
+        bin_table=["00", "11", "FF"],
+        bin_codes={
+            "00": {"status": True, "desc": "Pass", "count": None},
+            "11": {"status": False, "desc": "Fail", "count": None},
+            "FF": {"status": None, "desc": "NULL", "count": None},
+        },
+        device_attr={
+            CHIP_SIZE: [1000, 1000],
+            WAFER_SIZE: float(max(grid.shape)),
+        },
+    )
+
+
+def flood_labels(mask, diagonal):
+    """Return the number of connected regions using a plain flood fill."""
+    seen = np.zeros_like(mask)
+    steps = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+    if diagonal:
+        steps += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    count = 0
+    for start in zip(*np.nonzero(mask)):
+        if seen[start]:
+            continue
+        count += 1
+        todo = [start]
+        seen[start] = True
+        while todo:
+            row, col = todo.pop()
+            for d_row, d_col in steps:
+                pos = (row + d_row, col + d_col)
+                if (
+                    0 <= pos[0] < mask.shape[0]
+                    and 0 <= pos[1] < mask.shape[1]
+                    and mask[pos]
+                    and not seen[pos]
+                ):
+                    seen[pos] = True
+                    todo.append(pos)
+    return count
+
+
+class TestSpatial(unittest.TestCase):
+    """Test spatial yield analytics."""
+
+    def test_geometry(self):
+        """Test die positions are centered on the wafer and cached."""
+        geom = spatial.geometry(2, 2, (1000, 1000), 2.0)
+        np.testing.assert_allclose(geom.x, [[-0.5, 0.5]])
+        np.testing.assert_allclose(geom.y, [[0.5], [-0.5]])
+        np.testing.assert_allclose(geom.angle, [[135, 45], [225, 315]])
+        np.testing.assert_allclose(geom.radius, np.full((2, 2), np.sqrt(0.5)))
+        np.testing.assert_allclose(geom.outer_radius, np.full((2, 2), np.sqrt(2)))
+        self.assertEqual(geom.radius.dtype, np.float32)
+        self.assertEqual(geom.wafer_radius, 1.0)
+        self.assertIs(spatial.geometry(2, 2, (1000, 1000), 2.0), geom)
+        self.assertFalse(geom.x.flags.writeable)
+
+    def test_zone_stats(self):
+        """Test zones split the tested dies of a real map."""
+        wmap = wafermap.WaferMap(TEST_XML)
+        zones = spatial.zone_stats(wmap)
+        total = wmap.stats()["total_die"]
+        self.assertEqual(
+            sum(zones[name]["total_die"] for name in ("center", "middle", "edge")),
+            total,
+        )
+        self.assertEqual(
+            sum(zones[name]["total_die"] for name in spatial.QUADRANTS), total
+        )
+        self.assertLess(zones["edge_exclusion"]["total_die"], total)
+        self.assertEqual(
+            zones["center"]["fail"] + zones["center"]["pass"],
+            zones["center"]["total_die"],
+        )
+
+    def test_zone_stats_rings(self):
+        """Test the ring and edge exclusion masks on a small map."""
+        wmap = make_map([[1, 1, 1, 1], [1, 0, 0, 1], [1, 0, 0, 1], [1, 1, 1, 1]])
+        zones = spatial.zone_stats(wmap, {"inner": (0, 0.5), "outer": (0.5, 2)}, 0)
+        self.assertEqual(zones["inner"]["yield"], 100.0)
+        self.assertEqual(zones["outer"]["yield"], 0.0)
+        self.assertEqual(zones["edge_exclusion"]["total_die"], 4)
+
+    def test_label_clusters(self):
+        """Test 4 and 8 connected labeling."""
+        mask = np.array(
+            [
+                [1, 1, 0, 0, 1],
+                [0, 1, 0, 1, 0],
+                [0, 0, 0, 1, 1],
+                [1, 0, 1, 0, 0],
+            ],
+            dtype=bool,
+        )
+        labels, count = spatial.label_clusters(mask)
+        self.assertEqual(count, 5)
+        self.assertEqual(labels[0, 0], labels[1, 1])
+        self.assertEqual(labels[1, 3], labels[2, 4])
+        self.assertTrue((labels[~mask] == 0).all())
+        _, count = spatial.label_clusters(mask, diagonal=True)
+        self.assertEqual(count, 3)
+
+    def test_label_clusters_random(self):
+        """Test labeling random masks against a flood fill."""
+        rng = np.random.default_rng(1)
+        for _ in range(20):
+            mask = rng.random((23, 31)) < 0.4
+            for diagonal in (False, True):
+                labels, count = spatial.label_clusters(mask, diagonal)
+                self.assertEqual(count, flood_labels(mask, diagonal))
+                self.assertEqual(set(np.unique(labels[mask])), set(range(1, count + 1)))
+
+    def test_fail_clusters(self):
+        """Test failing clusters are sized and sorted."""
+        wmap = make_map([[1, 1, 0, 2], [1, 0, 0, 1], [2, 0, 1, 1], [0, 0, 0, 1]])
+        _, clusters = spatial.fail_clusters(wmap)
+        self.assertEqual([cluster["size"] for cluster in clusters], [4, 3])
+        self.assertEqual(clusters[0]["rows"], (1, 3))
+        self.assertEqual(clusters[0]["cols"], (2, 3))
+        self.assertEqual(clusters[1]["center"], (1 / 3, 1 / 3))
+        _, clusters = spatial.fail_clusters(wmap, min_size=4)
+        self.assertEqual(len(clusters), 1)
+        _, clusters = spatial.fail_clusters(make_map([[0, 2]]))
+        self.assertEqual(clusters, [])
+
+    def test_summary(self):
+        """Test the flat summary used by the batch report."""
+        summary = spatial.summary(wafermap.WaferMap(TEST_XML))
+        self.assertIn("edge_yield", summary)
+        self.assertIn("edge_exclusion_yield", summary)
+        self.assertGreaterEqual(summary["largest_cluster"], 2)
@@ -0,0 +1,110 @@
+"""Tests for stack module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from waferview import stack, synthetic, wafermap
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+TEST_XML_MIN = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_MIN.xml")
+
+
+class TestStackMap(unittest.TestCase):
+    """Test the StackMap class."""
+
+    def setUp(self):
+        """Set up a lot with a wafer of a different size."""
+        self.wmap = wafermap.WaferMap(TEST_XML, cache=False)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.small_xml = os.path.join(self.tmp_dir, "small.xml")
+        with open(TEST_XML, encoding="utf-8") as xml_file:
+            xml = xml_file.read().replace('Rows="60"', 'Rows="59"')
+        with open(self.small_xml, "w", encoding="utf-8") as xml_file:
+            xml_file.write(xml)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_add(self):
+        """Test counts accumulate per die and per bin."""
+        test_stack = stack.StackMap()
+        test_stack.add(self.wmap)
+        test_stack.add(TEST_XML_MIN)
+        self.assertEqual(test_stack.wafer_count, 2)
+        self.assertEqual(test_stack.wafer_ids, ["ABCD123", "P6AB36-01"])
+        self.assertEqual((test_stack.rows, test_stack.cols), (60, 60))
+        self.assertEqual(int(test_stack.tested.sum()), 2 * 2808)
+        self.assertEqual(int(test_stack.fails.sum()), 2 * 43)
+        self.assertEqual(int(test_stack.bin_counts["DE"].sum()), 2 * 38)
+        self.assertNotIn("FF", test_stack.bin_counts)
+        fail_die = np.argwhere(self.wmap.die_grid == 1)[0]
+        self.assertEqual(test_stack.fails[tuple(fail_die)], 2)
+        self.assertEqual(test_stack.fail_rate()[tuple(fail_die)], 1.0)
+
+    def test_add_many_bins(self):
+        """Test every bin's counts match its dies on a map with many bins."""
+        path = synthetic.write_map(
+            os.path.join(self.tmp_dir, "bins.xml"),
+            40,
+            40,
+            bin_type="Decimal",
+            num_bins=30,
+            fail_rate=0.5,
+        )
+        wmap = wafermap.WaferMap(path, cache=False)
+        test_stack = stack.StackMap()
+        test_stack.add(wmap)
+        test_stack.add(wmap)
+        for index, code in enumerate(wmap.bin_table):
+            mask = wmap.die_grid == index
+            if wmap.bin_codes[code]["status"] is None or not mask.any():
+                self.assertNotIn(code, test_stack.bin_counts)
+            else:
+                np.testing.assert_array_equal(test_stack.bin_counts[code], 2 * mask)
+
+    def test_reject_mismatched_header(self):
+        """Test a wafer of another size is rejected before its data is read."""
+        test_stack = stack.StackMap(60, 60)
+        with self.assertRaises(ValueError):
+            test_stack.add(self.small_xml)
+        self.assertEqual(test_stack.wafer_count, 0)
+
+    def test_merge(self):
+        """Test merging partial stacks."""
+        first = stack.StackMap()
+        first.add(self.wmap)
+        second = stack.StackMap()
+        second.add(TEST_XML_MIN)
+        second.add(TEST_XML_MIN)
+        first.merge(second)
+        first.merge(stack.StackMap())
+        self.assertEqual(first.wafer_count, 3)
+        self.assertEqual(int(first.fails.sum()), 3 * 43)
+        self.assertEqual(int(first.bin_counts["AD"].sum()), 3 * 5)
+        with self.assertRaises(ValueError):
+            first.merge(stack.StackMap(2, 2))
+
+    def test_stack_files(self):
+        """Test stacking files in worker processes."""
+        paths = [TEST_XML, self.small_xml, TEST_XML_MIN, TEST_XML]
+        test_stack, rejected = stack.stack_files(paths, workers=2)
+        self.assertEqual(test_stack.wafer_count, 3)
+        self.assertEqual([path for path, _ in rejected], [self.small_xml])
+        self.assertEqual(int(test_stack.fails.sum()), 3 * 43)
+        serial_stack, _ = stack.stack_files(paths)
+        np.testing.assert_array_equal(serial_stack.fails, test_stack.fails)
+
+    def test_stack_files_progress(self):
+        """Test stacking reports every file and stops when cancelled."""
+        paths = [TEST_XML, self.small_xml, TEST_XML]
+        calls = []
+        stack.stack_files(paths, progress=lambda *args: calls.append(args))
+        self.assertEqual(calls, [("stack", done, 3) for done in (1, 2, 3)])
+        for workers in (1, 2):
+            with self.assertRaises(wafermap.LoadCancelled):
+                stack.stack_files(paths, workers, progress=lambda *args: False)
@@ -0,0 +1,67 @@
+"""Tests for synthetic module."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from waferview import synthetic, wafermap
+from waferview.constants import (
+    BIN_TYPE_ASCII,
+    BIN_TYPE_DECIMAL,
+    BIN_TYPE_HEX,
+    BIN_TYPE_INT2,
+)
+
+
+class TestSynthetic(unittest.TestCase):
+    """Test the synthetic map generator."""
+
+    def test_bin_codes(self):
+        """Test bin codes follow the BinType encoding."""
+        self.assertEqual(
+            synthetic.bin_codes(BIN_TYPE_HEX, 3), (["00", "01", "02"], "FF")
+        )
+        self.assertEqual(
+            synthetic.bin_codes(BIN_TYPE_DECIMAL, 2), (["000", "001"], "999")
+        )
+        self.assertEqual(
+            synthetic.bin_codes(BIN_TYPE_INT2, 2), (["0000", "0001"], "FFFF")
+        )
+        self.assertEqual(synthetic.bin_codes(BIN_TYPE_ASCII, 3), (["1", "A", "B"], "."))
+        with self.assertRaises(ValueError):
+            synthetic.bin_codes(BIN_TYPE_HEX, 256)
+
+    def test_round_trip(self):
+        """Test generated maps decode to the generated grid for every BinType."""
+        for bin_type in (BIN_TYPE_ASCII, BIN_TYPE_DECIMAL, BIN_TYPE_HEX, BIN_TYPE_INT2):
+            for pattern in synthetic.PATTERNS:
+                data = synthetic.generate_map(
+                    30, 40, bin_type=bin_type, num_bins=5, pattern=pattern
+                )
+                wmap = wafermap.WaferMap(data)
+                grid = synthetic.generate_grid(30, 40, num_bins=5, pattern=pattern)
+                self.assertEqual(wmap.die_grid.tolist(), grid.tolist())
+                self.assertEqual(wmap.stats()["mismatch"], {})
+                self.assertEqual(wmap.device_attr["rows"], 30)
+                self.assertEqual(wmap.device_attr["cols"], 40)
+
+    def test_fail_rate(self):
+        """Test the fail rate is close to the requested one."""
+        grid = synthetic.generate_grid(200, 200, num_bins=4, fail_rate=0.2)
+        tested = grid < 4
+        fail_rate = (grid[tested] > 0).mean()
+        self.assertAlmostEqual(fail_rate, 0.2, delta=0.02)
+
+    def test_unknown_pattern(self):
+        """Test an unknown pattern is rejected."""
+        with self.assertRaises(ValueError):
+            synthetic.generate_grid(10, 10, pattern="spiral")
+
+    def test_write_map(self):
+        """Test maps written in row blocks match the generated bytes."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "synthetic.xml")
+            with mock.patch.object(synthetic, "WRITE_CHUNK_ROWS", 7):
+                synthetic.write_map(path, 20, 20)
+            with open(path, "rb") as xml_file:
+                self.assertEqual(xml_file.read(), synthetic.generate_map(20, 20))
@@ -0,0 +1,56 @@
+"""Tests for tracing module."""
+
+import unittest
+from unittest import mock
+from waferview import tracing
+
+
+class Timed:
+    """Class with a timed method."""
+
+    timings = None
+
+    @tracing.timed("work")
+    def work(self, value):
+        """Return the value."""
+        return value
+
+
+class TestTracing(unittest.TestCase):
+    """Test timing spans and hooks."""
+
+    def test_span_timings(self):
+        """Test a span stores its duration."""
+        timings = {}
+        with tracing.span("stage", timings):
+            pass
+        self.assertGreaterEqual(timings["stage"], 0)
+
+    def test_hook(self):
+        """Test hooks receive finished spans, even when the block raises."""
+        spans = []
+        hook = lambda name, seconds, fields: spans.append((name, fields))
+        tracing.add_hook(hook)
+        try:
+            self.assertTrue(tracing.enabled())
+            with self.assertRaises(ValueError), tracing.span("stage", source="a.xml"):
+                raise ValueError
+        finally:
+            tracing.remove_hook(hook)
+        self.assertEqual(spans, [("stage", {"source": "a.xml"})])
+
+    def test_timed(self):
+        """Test the decorator records method time on the instance."""
+        timed = Timed()
+        self.assertEqual(timed.work(3), 3)
+        self.assertIn("work", timed.timings)
+        self.assertIsNone(Timed.timings)
+
+    def test_log(self):
+        """Test spans are logged when tracing is switched on."""
+        with mock.patch.object(tracing, "_log_spans", True):
+            with self.assertLogs("waferview.trace", "DEBUG") as logs:
+                with tracing.span("stage", source="a.xml"):
+                    pass
+        self.assertIn("stage", logs.output[0])
+        self.assertIn("source=a.xml", logs.output[0])
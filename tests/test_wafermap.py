@@ -1,8 +1,10 @@
 """Tests for wafermap module."""
 
+import io
 import unittest
+import numpy as np
 from waferview import wafermap
-from waferview.gui.constants import (
+from waferview.constants import (
     SUPPORTED_FORMATS,
     WAFER_ID,
     LOT_ID,
@@ -28,6 +30,28 @@ class TestWaferMap(unittest.TestCase):
         """Tear down a WaferMap instance."""
         self.test_wmap = None
 
+    def test_parse_stream(self):
+        """Test the parse method builds the map data without a full tree."""
+        xml = (
+            b'<Map xmlns="http://www.semi.org" WaferId="foo" FormatRevision="bar">'
+            b'<Device BinType="Decimal" NullBin="255" Rows="2" Columns="2">'
+            b'<Bin BinCode="000" BinQuality="Pass" BinCount="3"/>'
+            b'<Data MapName="baz"><Row>000255</Row><Row><![CDATA[000000]]></Row>'
+            b"</Data></Device></Map>"
+        )
+        self.test_wmap.parse(io.BytesIO(xml))
+        map_data = self.test_wmap._map_data
+        self.assertEqual(map_data["@WaferId"], "foo")
+        self.assertEqual(map_data["@FormatRevision"], "bar")
+        self.assertEqual(map_data["Device"]["@BinType"], "Decimal")
+        self.assertEqual(map_data["Device"]["@NullBin"], "255")
+        self.assertEqual(
+            map_data["Device"]["Bin"],
+            [{"@BinCode": "000", "@BinQuality": "Pass", "@BinCount": "3"}],
+        )
+        self.assertEqual(map_data["Device"]["Data"]["@MapName"], "baz")
+        self.assertEqual(map_data["Device"]["Data"]["Row"], ["000255", "000000"])
+
     def test_check_format_ok(self):
         """Test the check_format method."""
         self.test_wmap._map_data = {"@FormatRevision": SUPPORTED_FORMATS[0]}
@@ -249,6 +273,83 @@ class TestWaferMap(unittest.TestCase):
         self.assertTrue([(0, 0), (0.5, 0.5), False, None] in self.test_wmap.pixels)
         self.assertTrue([(0.5, 0), (0.5, 0.5), None, "NULL"] in self.test_wmap.pixels)
 
+    def test_gen_map_die_grid(self):
+        """Test the gen_map method builds the compact die grid."""
+        self.test_wmap.device_attr = {}
+        self.test_wmap.device_attr[CHIP_SIZE] = [1, 1]
+        self.test_wmap.device_attr["rows"] = 2
+        self.test_wmap.device_attr["cols"] = 3
+        self.test_wmap.bin_codes = {
+            "00": {"status": True, "desc": None, "count": "2"},
+            "11": {"status": False, "desc": None, "count": "1"},
+            "FF": {"status": None, "desc": "NULL", "count": None},
+        }
+        self.test_wmap._map_data = {
+            "Device": {
+                "@BinType": "HexaDecimal",
+                "@NullBin": "FF",
+                "Data": {
+                    "Row": ["FF0011", "00FFFF"],
+                },
+            }
+        }
+
+        self.test_wmap.gen_map()
+        self.assertEqual(self.test_wmap.bin_table, ["00", "11", "FF"])
+        self.assertEqual(self.test_wmap.die_grid.shape, (2, 3))
+        self.assertEqual(self.test_wmap.die_grid.tolist(), [[2, 0, 1], [0, 2, 2]])
+        self.assertEqual(len(self.test_wmap.pixels), 6)
+        self.assertEqual(
+            self.test_wmap.pixels[5], [(2 / 3, 0), (1 / 3, 0.5), None, "NULL"]
+        )
+
+    def test_stats(self):
+        """Test the stats method counts bins from the die grid."""
+        self.test_wmap.bin_table = ["00", "11", "FF"]
+        self.test_wmap.bin_codes = {
+            "00": {"status": True, "desc": None, "count": "3"},
+            "11": {"status": False, "desc": None, "count": "2"},
+            "FF": {"status": None, "desc": "NULL", "count": None},
+        }
+        self.test_wmap._die_grid = np.array([[2, 0, 1], [0, 0, 2]])
+
+        stats = self.test_wmap.stats()
+        self.assertEqual(stats["bins"], {"00": 3, "11": 1, "FF": 2})
+        self.assertEqual(stats["total_die"], 4)
+        self.assertEqual(stats["pass"], 3)
+        self.assertEqual(stats["fail"], 1)
+        self.assertEqual(stats["yield"], 75.0)
+        self.assertEqual(stats["mismatch"], {"11": (2, 1)})
+
+    def test_stats_no_tested_die(self):
+        """Test the stats method with only null dies."""
+        self.test_wmap.bin_table = ["FF"]
+        self.test_wmap.bin_codes = {
+            "FF": {"status": None, "desc": "NULL", "count": None},
+        }
+        self.test_wmap._die_grid = np.zeros((2, 2), dtype=int)
+        stats = self.test_wmap.stats()
+        self.assertEqual(stats["total_die"], 0)
+        self.assertEqual(stats["yield"], 0.0)
+
+    def test_gen_map_ragged_rows(self):
+        """Test short, long and extra rows are fitted to the declared size."""
+        self.test_wmap.device_attr = {CHIP_SIZE: [1, 1], "rows": 2, "cols": 3}
+        self.test_wmap.bin_codes = {
+            "00": {"status": True, "desc": None, "count": None},
+            "11": {"status": False, "desc": None, "count": None},
+            "FF": {"status": None, "desc": "NULL", "count": None},
+        }
+        self.test_wmap._map_data = {
+            "Device": {
+                "@BinType": "HexaDecimal",
+                "@NullBin": "FF",
+                "Data": {"Row": ["0011", "1100110", "000000"]},
+            }
+        }
+        self.test_wmap.gen_map()
+        self.assertEqual(self.test_wmap.die_grid.tolist(), [[0, 1, 2], [1, 0, 1]])
+
     def test_gen_map_bad_units(self):
         """Test the gen_map method with incorrectly spec'd bins."""
         self.test_wmap.device_attr = {}
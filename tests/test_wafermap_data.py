@@ -1,9 +1,11 @@
 """Test wafermap with dummy data."""
 
+import io
 import os
+import tempfile
 import unittest
 from waferview import wafermap
-from waferview.gui.constants import (
+from waferview.constants import (
     WAFER_ID,
     LOT_ID,
     WAFER_SIZE,
@@ -37,6 +39,7 @@ class TestWaferMapData(unittest.TestCase):
         self.assertEqual(test_wmap.bin_codes["DE"]["count"], "38")
         self.assertEqual(test_wmap.bin_codes["AD"]["count"], "5")
         self.assertEqual(len(test_wmap.pixels), 3600)
+        self.assertEqual(test_wmap.die_grid.shape, (60, 60))
 
     def test_semi_g85_1101_full(self):
         """Test G85-1101 full standard."""
@@ -56,6 +59,7 @@ class TestWaferMapData(unittest.TestCase):
         self.assertEqual(test_wmap.bin_codes["DE"]["count"], "38")
         self.assertEqual(test_wmap.bin_codes["AD"]["count"], "5")
         self.assertEqual(len(test_wmap.pixels), 3600)
+        self.assertEqual(test_wmap.die_grid.shape, (60, 60))
 
         exp_attr = {
             WAFER_ID: "ABCD123",
@@ -68,3 +72,121 @@ class TestWaferMapData(unittest.TestCase):
             "cols": 60,
         }
         self.assertDictEqual(test_wmap.device_attr, exp_attr)
+
+        stats = test_wmap.stats()
+        self.assertEqual(stats["bins"], {"00": 2765, "DE": 38, "AD": 5, "FF": 792})
+        self.assertEqual(stats["total_die"], 2808)
+        self.assertEqual(stats["pass"], 2765)
+        self.assertEqual(stats["fail"], 43)
+        self.assertEqual(stats["yield"], 98.47)
+        self.assertEqual(stats["mismatch"], {})
+
+    def test_semi_g85_1101_lazy(self):
+        """Test lazily loading only the G85-1101 header."""
+        TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+        test_wmap = wafermap.WaferMap.header(TEST_XML, cache=False)
+        self.assertTrue(test_wmap.is_valid)
+        self.assertEqual(test_wmap.device_attr[WAFER_ID], "ABCD123")
+        self.assertEqual(test_wmap.bin_codes["00"]["count"], "2765")
+        self.assertEqual(test_wmap.bin_codes["DE"]["count"], "38")
+        self.assertIsNone(test_wmap._die_grid)
+        self.assertEqual(test_wmap.die_grid.shape, (60, 60))
+        self.assertEqual(len(test_wmap.pixels), 3600)
+        self.assertEqual(test_wmap.pixels, wafermap.WaferMap(TEST_XML).pixels)
+
+    def test_semi_g85_1101_lazy_stops_at_data(self):
+        """Test the lazy header read stops before the die data."""
+        TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+        with open(TEST_XML, "rb") as xml_file:
+            source = io.BytesIO(xml_file.read())
+        test_wmap = wafermap.WaferMap(source, lazy=True)
+        self.assertEqual(test_wmap.device_attr["rows"], 60)
+        self.assertLess(source.tell(), len(source.getvalue()))
+
+    def test_semi_g85_1101_progress(self):
+        """Test progress is reported for the parse and decode stages."""
+        TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+        calls = []
+        test_wmap = wafermap.WaferMap(
+            TEST_XML, cache=False, progress=lambda *args: calls.append(args)
+        )
+        size = os.path.getsize(TEST_XML)
+        self.assertEqual(calls[0][0], "parse")
+        self.assertIn(("parse", size, size), calls)
+        self.assertEqual(calls[-1], ("decode", 60, 60))
+        self.assertEqual(
+            test_wmap.die_grid.tolist(),
+            wafermap.WaferMap(TEST_XML, cache=False).die_grid.tolist(),
+        )
+
+    def test_semi_g85_1101_cancel(self):
+        """Test a progress callback returning False cancels loading."""
+        TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+        with self.assertRaises(wafermap.LoadCancelled):
+            wafermap.WaferMap(
+                TEST_XML, cache=False, progress=lambda stage, *_: stage != "decode"
+            )
+
+    def test_semi_g85_1101_timings(self):
+        """Test the time of each load stage is recorded."""
+        TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+        test_wmap = wafermap.WaferMap(TEST_XML, cache=False)
+        for stage in ("load", "parse", "check_format", "get_codes", "gen_map"):
+            self.assertIn(stage, test_wmap.timings)
+        self.assertGreaterEqual(test_wmap.timings["load"], test_wmap.timings["parse"])
+
+    def test_semi_g85_1101_die_info(self):
+        """Test looking up single dies."""
+        TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+        test_wmap = wafermap.WaferMap(TEST_XML, cache=False)
+        self.assertEqual(
+            test_wmap.die_info(0, 0),
+            {"row": 0, "col": 0, "code": "FF", "desc": "NULL", "result": "NULL"},
+        )
+        self.assertEqual(test_wmap.die_info(0, 27)["code"], "DE")
+        self.assertEqual(test_wmap.die_info(0, 27)["result"], "Fail")
+        self.assertEqual(test_wmap.die_info(0, 29)["desc"], "QC")
+        self.assertEqual(test_wmap.die_info(1, 30)["result"], "Pass")
+
+    def test_semi_g85_1101_growing(self):
+        """Test a map being written is decoded a few rows at a time."""
+        TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+        with open(TEST_XML, "rb") as xml_file:
+            data = xml_file.read()
+        expected = wafermap.WaferMap(TEST_XML, cache=False)
+        data_start = data.index(b"<Data")
+        # Cut inside a row so its end arrives with the next write
+        row_cut = data.index(b"<Row>", data_start) + 200
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "growing.xml")
+            with open(path, "wb") as map_file:
+                map_file.write(data[:data_start])
+            test_wmap = wafermap.WaferMap.growing(path, cache=False)
+            self.assertIsNone(test_wmap.die_grid)
+
+            with open(path, "ab") as map_file:
+                map_file.write(data[data_start:row_cut])
+            start, stop = test_wmap.refresh()
+            self.assertEqual(start, 0)
+            self.assertFalse(test_wmap.complete)
+            self.assertEqual(
+                test_wmap.die_grid[:stop].tolist(),
+                expected.die_grid[:stop].tolist(),
+            )
+            self.assertEqual(test_wmap.refresh(), (stop, stop))
+            partial = test_wmap.stats()
+            self.assertEqual(sum(partial["bins"].values()), 60 * 60)
+            self.assertLess(partial["total_die"], expected.stats()["total_die"])
+
+            with open(path, "ab") as map_file:
+                map_file.write(data[row_cut:])
+            self.assertEqual(test_wmap.refresh(), (stop, 60))
+            self.assertTrue(test_wmap.complete)
+            self.assertEqual(test_wmap.die_grid.tolist(), expected.die_grid.tolist())
+            self.assertEqual(test_wmap.stats(), expected.stats())
+            self.assertEqual(test_wmap.device_attr, expected.device_attr)
+
+            with open(path, "wb") as map_file:
+                map_file.write(data[:row_cut])
+            test_wmap.refresh()
+            self.assertFalse(test_wmap.complete)
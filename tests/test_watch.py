@@ -0,0 +1,137 @@
+"""Tests for watch module."""
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+from waferview import watch
+
+
+TEST_PATH = os.path.split(os.path.abspath(__file__))[0]
+TEST_XML = os.path.join(TEST_PATH, "xml/SEMI_G85/SEMI_G85_1101_ALL.xml")
+
+
+def inotify_available():
+    """Return True if the platform supports inotify."""
+    try:
+        watch._libc()
+    except OSError:
+        return False
+    return True
+
+
+class TestDirectoryWatcher(unittest.TestCase):
+    """Test the DirectoryWatcher class."""
+
+    def setUp(self):
+        """Set up an empty directory to watch."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def add_map(self, name):
+        """Copy the test map into the watched directory."""
+        path = os.path.join(self.tmp_dir, name)
+        shutil.copy(TEST_XML, path)
+        return path
+
+    def poll_until(self, watcher, count=1, timeout=5):
+        """Poll until ``count`` maps are ready or the timeout passes."""
+        ready = []
+        deadline = time.monotonic() + timeout
+        while len(ready) < count and time.monotonic() < deadline:
+            ready.extend(watcher.poll(0.05))
+        return ready
+
+    def test_polling(self):
+        """Test new and changed maps are found by polling."""
+        with watch.DirectoryWatcher(
+            [self.tmp_dir], settle=0, interval=0, use_inotify=False
+        ) as watcher:
+            self.assertFalse(watcher.inotify)
+            path = self.add_map("wafer1.xml")
+            self.add_map("notes.txt")
+            self.assertEqual(self.poll_until(watcher), [path])
+            self.assertEqual(watcher.poll(0), [])
+            with open(path, "a", encoding="utf-8") as xml_file:
+                xml_file.write("\n")
+            self.assertEqual(self.poll_until(watcher), [path])
+
+    def test_settle(self):
+        """Test a map is held back until it stops changing."""
+        with watch.DirectoryWatcher(
+            [self.tmp_dir], settle=60, interval=0, use_inotify=False
+        ) as watcher:
+            path = self.add_map("wafer1.xml")
+            self.assertEqual(watcher.poll(0), [])
+            self.assertIn(path, watcher.pending)
+            watcher.settle = 0
+            self.assertEqual(watcher.ready(), [path])
+
+    def test_existing(self):
+        """Test maps already present are reported when asked for."""
+        path = self.add_map("wafer1.xml")
+        with watch.DirectoryWatcher(
+            [self.tmp_dir], interval=0, use_inotify=False
+        ) as watcher:
+            self.assertEqual(watcher.poll(0), [])
+        with watch.DirectoryWatcher(
+            [self.tmp_dir], interval=0, existing=True, use_inotify=False
+        ) as watcher:
+            self.assertEqual(watcher.poll(0), [path])
+
+    def test_no_inotify(self):
+        """Test watching falls back to polling where inotify is missing."""
+        with mock.patch.object(watch.sys, "platform", "win32"):
+            with self.assertRaises(OSError):
+                watch._libc()
+            with watch.DirectoryWatcher([self.tmp_dir], interval=0) as watcher:
+                self.assertFalse(watcher.inotify)
+
+    @unittest.skipUnless(inotify_available(), "inotify is not available")
+    def test_inotify(self):
+        """Test closed and renamed maps are reported at once by inotify."""
+        with watch.DirectoryWatcher([self.tmp_dir], settle=60) as watcher:
+            self.assertTrue(watcher.inotify)
+            path = self.add_map("wafer1.xml")
+            self.assertEqual(self.poll_until(watcher), [path])
+            partial = self.add_map("wafer2.xml.part")
+            renamed = os.path.join(self.tmp_dir, "wafer2.xml")
+            os.rename(partial, renamed)
+            self.assertEqual(self.poll_until(watcher), [renamed])
+
+    def test_ingest(self):
+        """Test ready maps are summarized."""
+        with watch.DirectoryWatcher(
+            [self.tmp_dir], settle=0, interval=0, use_inotify=False
+        ) as watcher:
+            path = self.add_map("wafer1.xml")
+            summaries = watch.ingest(watcher, workers=1, cache=False)
+            summary = next(summaries)
+            summaries.close()
+        self.assertEqual(summary["file"], path)
+        self.assertEqual(summary["total_die"], 2808)
+
+    def test_summary_writer(self):
+        """Test summaries are appended as CSV rows and JSON lines."""
+        summary = {"file": "wafer1.xml", "total_die": 10, "bins": {"00": 9, "01": 1}}
+        out_file = io.StringIO()
+        writer = watch.SummaryWriter(out_file)
+        writer.write(summary)
+        rows = list(csv.DictReader(io.StringIO(out_file.getvalue())))
+        self.assertEqual(rows[0]["total_die"], "10")
+        self.assertEqual(rows[0]["bins"], "00:9 01:1")
+
+        out_file = io.StringIO()
+        writer = watch.SummaryWriter(out_file, "jsonl")
+        writer.write(summary)
+        writer.write(summary)
+        lines = out_file.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [summary, summary])
@@ -0,0 +1,272 @@
+"""Headless summaries of whole lots or directories of wafer maps."""
+
+import csv
+import json
+import os
+import sys
+from waferview import wafermap
+from waferview.sources import COMPRESSED_SUFFIXES
+from waferview.tracing import span
+from waferview.constants import (
+    WAFER_ID,
+    LOT_ID,
+    PRODUCT_ID,
+    QUADRANTS,
+    RADIAL_ZONES,
+)
+
+SUMMARY_KEYS = [
+    "file",
+    WAFER_ID,
+    LOT_ID,
+    PRODUCT_ID,
+    "rows",
+    "cols",
+    "total_die",
+    "pass",
+    "fail",
+    "yield",
+    "count_mismatch",
+    "error",
+]
+
+SPATIAL_KEYS = [
+    *(f"{name}_yield" for name in RADIAL_ZONES),
+    *(f"{name}_yield" for name in QUADRANTS),
+    "edge_exclusion_yield",
+    "fail_clusters",
+    "largest_cluster",
+]
+
+
+def is_map(name, extension=".xml"):
+    """Return True if a file name is a map, possibly compressed."""
+    suffixes = tuple(extension + suffix for suffix in COMPRESSED_SUFFIXES)
+    return name.lower().endswith((extension, *suffixes))
+
+
+def find_maps(paths, extension=".xml"):
+    """Return every map file in the given files and directories.
+
+    Compressed maps such as ``.xml.gz`` files are found as well.
+    """
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(
+                os.path.join(root, name)
+                for name in sorted(files)
+                if is_map(name, extension)
+            )
+    return found
+
+
+def summarize(path, cache=True, spatial_stats=False, profile=False):
+    """Return the yield summary of a single map file.
+
+    With ``spatial_stats`` set the zone yields and failure cluster counts
+    from ``waferview.spatial`` are included, and with ``profile`` set the
+    seconds spent in each stage are returned under ``timings`` and the
+    parser backend that read the file under ``parser``. Any error
+    is reported in the ``error`` entry instead of being raised so one bad
+    file never stops a batch.
+    """
+    summary = {"file": path}
+    wmap = None
+    try:
+        wmap = wafermap.WaferMap(path, cache=cache)
+        stats = wmap.stats()
+        summary.update(
+            {
+                WAFER_ID: wmap.device_attr[WAFER_ID],
+                LOT_ID: wmap.device_attr[LOT_ID],
+                PRODUCT_ID: wmap.device_attr[PRODUCT_ID],
+                "rows": wmap.device_attr["rows"],
+                "cols": wmap.device_attr["cols"],
+                "total_die": stats["total_die"],
+                "pass": stats["pass"],
+                "fail": stats["fail"],
+                "yield": stats["yield"],
+                "count_mismatch": " ".join(
+                    f"{code}:{declared}!={counted}"
+                    for code, (declared, counted) in stats["mismatch"].items()
+                ),
+                "bins": {
+                    code: count
+                    for code, count in stats["bins"].items()
+                    if wmap.bin_codes[code]["status"] is not None
+                },
+            }
+        )
+        if spatial_stats:
+            from waferview import spatial  # pylint: disable=import-outside-toplevel
+
+            with span("spatial", wmap.timings):
+                summary.update(spatial.summary(wmap))
+    except Exception as err:  # pylint: disable=broad-except
+        summary["error"] = f"{type(err).__name__}: {err}"
+    if profile and wmap is not None:
+        summary["timings"] = dict(wmap.timings)
+        summary["parser"] = wmap.backend or "cache"
+    return summary
+
+
+def run_batch(
+    paths, workers=None, chunksize=16, cache=True, spatial_stats=False, profile=False
+):
+    """Summarize map files on a process pool, yielding results in order.
+
+    ``workers`` defaults to the number of CPUs; with a single worker the
+    files are processed in this process.
+    """
+    if workers == 1:
+        for path in paths:
+            yield summarize(path, cache, spatial_stats, profile)
+        return
+
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            summarize,
+            paths,
+            [cache] * len(paths),
+            [spatial_stats] * len(paths),
+            [profile] * len(paths),
+            chunksize=chunksize,
+        )
+
+
+def write_csv(summaries, out_file):
+    """Write summaries as CSV with one ``bin_<code>`` column per bin."""
+    summaries = list(summaries)
+    codes = sorted({code for summary in summaries for code in summary.get("bins", {})})
+    stages = list(
+        dict.fromkeys(
+            stage for summary in summaries for stage in summary.get("timings", {})
+        )
+    )
+    keys = SUMMARY_KEYS
+    if any(SPATIAL_KEYS[0] in summary for summary in summaries):
+        keys = SUMMARY_KEYS + SPATIAL_KEYS
+    if any("parser" in summary for summary in summaries):
+        keys = keys + ["parser"]
+    writer = csv.writer(out_file)
+    writer.writerow(
+        keys + [f"bin_{code}" for code in codes] + [f"time_{stage}" for stage in stages]
+    )
+    for summary in summaries:
+        bins = summary.get("bins", {})
+        timings = summary.get("timings", {})
+        writer.writerow(
+            [summary.get(key, "") for key in keys]
+            + [bins.get(code, 0) for code in codes]
+            + [timings.get(stage, "") for stage in stages]
+        )
+
+
+def stage_profile(summaries):
+    """Return the count, total, mean and max seconds of every stage."""
+    profile = {}
+    for summary in summaries:
+        for stage, seconds in summary.get("timings", {}).items():
+            entry = profile.setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+    for entry in profile.values():
+        entry["mean"] = entry["total"] / entry["count"]
+    return profile
+
+
+def write_json(summaries, out_file):
+    """Write summaries as a JSON list."""
+    json.dump(list(summaries), out_file, indent=2)
+    out_file.write("\n")
+
+
+def main(argv=None):
+    """Run the batch summarizer from the command line."""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog="waferview-batch", description="Summarize wafer map yield in bulk."
+    )
+    parser.add_argument("paths", nargs="+", help="map files or directories")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["csv", "json"],
+        help="output format (default: from output extension, else csv)",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="worker processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=16, help="files sent to a worker at once"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="do not use the decoded map cache"
+    )
+    parser.add_argument(
+        "--spatial",
+        action="store_true",
+        help="add zone, edge exclusion and failure cluster statistics",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="record the time of each stage per file and print a stage profile",
+    )
+    args = parser.parse_args(argv)
+
+    out_format = args.format
+    if out_format is None:
+        out_format = "json" if str(args.output).lower().endswith(".json") else "csv"
+    writer = write_json if out_format == "json" else write_csv
+
+    paths = find_maps(args.paths)
+    summaries = list(
+        run_batch(
+            paths,
+            args.workers,
+            args.chunksize,
+            cache=not args.no_cache,
+            spatial_stats=args.spatial,
+            profile=args.profile,
+        )
+    )
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as out_file:
+            writer(summaries, out_file)
+    else:
+        writer(summaries, sys.stdout)
+
+    if args.profile:
+        parsers = sorted(
+            {summary["parser"] for summary in summaries if "parser" in summary}
+        )
+        print(f"parser backends: {', '.join(parsers)}", file=sys.stderr)
+        print(
+            "stage              files   total s    mean ms     max ms", file=sys.stderr
+        )
+        for stage, entry in stage_profile(summaries).items():
+            print(
+                f"{stage:<16} {entry['count']:>7} {entry['total']:>9.3f} "
+                f"{entry['mean'] * 1000:>10.2f} {entry['max'] * 1000:>10.2f}",
+                file=sys.stderr,
+            )
+
+    errors = [summary for summary in summaries if "error" in summary]
+    for summary in errors:
+        print(f"{summary['file']}: {summary['error']}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Benchmarks of the map pipeline on synthetic wafer maps."""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+from waferview import parsers, render, synthetic, wafermap
+from waferview.constants import BIN_TYPE_HEX
+
+STAGES = ("parse", "get_codes", "gen_map", "stats", "render")
+
+# Relative slowdown of a stage's median time reported as a regression
+REGRESSION_THRESHOLD = 0.2
+
+
+def time_stages(path, repeat=3):
+    """Return the run times in seconds of every stage for one map file.
+
+    Each stage is run ``repeat`` times on a map prepared by the stages
+    before it, without the decoded map cache.
+    """
+    times = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        wmap = wafermap.WaferMap.__new__(wafermap.WaferMap)
+        start = time.perf_counter()
+        wmap.parse(path)
+        times["parse"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        wmap.check_format()
+        wmap.get_attributes()
+        wmap.get_codes()
+        times["get_codes"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        wmap.gen_map()
+        times["gen_map"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        wmap.stats()
+        times["stats"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        render.write_png(io.BytesIO(), render.render_rgb(wmap))
+        times["render"].append(time.perf_counter() - start)
+    return times
+
+
+def run_case(rows, cols, bin_type=BIN_TYPE_HEX, pattern="random", repeat=3, **kwargs):
+    """Benchmark a synthetic map size, returning one result per stage."""
+    name = f"{bin_type}-{rows}x{cols}-{pattern}"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = synthetic.write_map(
+            os.path.join(tmp_dir, f"{name}.xml"),
+            rows,
+            cols,
+            bin_type=bin_type,
+            pattern=pattern,
+            **kwargs,
+        )
+        size = os.path.getsize(path)
+        times = time_stages(path, repeat)
+    return [
+        {
+            "case": name,
+            "stage": stage,
+            "rows": rows,
+            "cols": cols,
+            "bin_type": bin_type,
+            "pattern": pattern,
+            "file_bytes": size,
+            "repeat": repeat,
+            "min": min(values),
+            "median": statistics.median(values),
+            "mean": statistics.fmean(values),
+        }
+        for stage, values in times.items()
+    ]
+
+
+def environment():
+    """Return the versions the results were measured with."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "xml_backend": parsers.xml_backend(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return the results more than ``threshold`` slower than a baseline.
+
+    Each entry is ``(case, stage, baseline_median, median)``.
+    """
+    previous = {(entry["case"], entry["stage"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["case"], entry["stage"]))
+        if old is not None and entry["median"] > old["median"] * (1 + threshold):
+            regressions.append(
+                (entry["case"], entry["stage"], old["median"], entry["median"])
+            )
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="waferview-bench",
+        description="Time parsing, decoding, statistics and rendering.",
+    )
+    parser.add_argument(
+        "-s",
+        "--size",
+        action="append",
+        help="map size as ROWSxCOLS, may be repeated (default: 500x500, 2000x2000)",
+    )
+    parser.add_argument(
+        "-b",
+        "--bin-type",
+        action="append",
+        help=f"BinType, may be repeated (default: {BIN_TYPE_HEX})",
+    )
+    parser.add_argument(
+        "-p",
+        "--pattern",
+        default="random",
+        choices=synthetic.PATTERNS,
+        help="fail pattern",
+    )
+    parser.add_argument("--bins", type=int, default=8, help="number of bins")
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.05, help="fraction of failing dies"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="runs per stage")
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    parser.add_argument(
+        "-c", "--compare", help="baseline results file to check for regressions"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="slowdown reported as a regression (default: 0.2 for 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.size or ["500x500", "2000x2000"]:
+        rows, _, cols = size.lower().partition("x")
+        for bin_type in args.bin_type or [BIN_TYPE_HEX]:
+            results.extend(
+                run_case(
+                    int(rows),
+                    int(cols or rows),
+                    bin_type,
+                    args.pattern,
+                    args.repeat,
+                    num_bins=args.bins,
+                    fail_rate=args.fail_rate,
+                )
+            )
+    report = {"environment": environment(), "results": results}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out_file:
+            json.dump(report, out_file, indent=2)
+            out_file.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    for entry in results:
+        median = entry["median"] * 1000
+        print(
+            f"{entry['case']:>32} {entry['stage']:>10} {median:10.1f} ms",
+            file=sys.stderr,
+        )
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for case, stage, old, new in regressions:
+            change = f"{old * 1000:.1f} ms -> {new * 1000:.1f} ms"
+            print(f"REGRESSION {case} {stage}: {change}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
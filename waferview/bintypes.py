@@ -0,0 +1,185 @@
+"""Bulk decoders for the SEMI G85 BinType row encodings."""
+
+import re
+import numpy as np
+from waferview.constants import (
+    BIN_TYPE_ASCII,
+    BIN_TYPE_DECIMAL,
+    BIN_TYPE_HEX,
+    BIN_TYPE_INT2,
+)
+
+# Characters used per die for each bin type
+CODE_WIDTH = {
+    BIN_TYPE_ASCII: 1,
+    BIN_TYPE_DECIMAL: 3,
+    BIN_TYPE_HEX: 2,
+    BIN_TYPE_INT2: 4,
+}
+
+# Number of distinct code values for each bin type
+CODE_RANGE = {
+    BIN_TYPE_ASCII: 256,
+    BIN_TYPE_DECIMAL: 1000,
+    BIN_TYPE_HEX: 256,
+    BIN_TYPE_INT2: 65536,
+}
+
+
+class RowDecoder:
+    """Decode G85 row strings into indices of a bin table.
+
+    Every bin code is converted to its integer value and mapped to a bin
+    index through a dense lookup table, so a whole block of rows is decoded
+    with a handful of array operations. Unknown BinTypes are treated as
+    HexaDecimal, which matches how maps were always read.
+
+    Integer2 is read as four hexadecimal characters (one 16 bit value) per
+    die.
+    """
+
+    def __init__(self, bin_type, bin_table):
+        """Initialize the decoder for a bin type and list of bin codes."""
+        if bin_type not in CODE_WIDTH:
+            bin_type = BIN_TYPE_HEX
+        self.bin_type = bin_type
+        self.width = CODE_WIDTH[bin_type]
+        self.bin_index = {code: index for index, code in enumerate(bin_table)}
+        code_range = CODE_RANGE[bin_type]
+        # The extra trailing entry catches characters that are not valid codes
+        self.lookup = np.full(code_range + 1, -1, dtype=np.int32)
+        for code, index in self.bin_index.items():
+            value = self.code_value(code)
+            if value is not None and 0 <= value < code_range:
+                self.lookup[value] = index
+
+    def code_value(self, code):
+        """Return the integer value of a single bin code string.
+
+        Codes are read exactly as the bulk decoder reads them, so
+        hexadecimal codes match in either case and codes with characters
+        other than the type's digits have no value.
+        """
+        if not isinstance(code, str):
+            return None
+        if self.bin_type == BIN_TYPE_ASCII:
+            return ord(code) if len(code) == 1 else None
+        base = 10 if self.bin_type == BIN_TYPE_DECIMAL else 16
+        if not code or any(char not in _DIGITS[base] for char in code):
+            return None
+        return int(code, base)
+
+    def code_index(self, code):
+        """Return the bin index of a single code, or raise a KeyError."""
+        value = self.code_value(code)
+        if value is None or not 0 <= value < len(self.lookup) - 1:
+            raise KeyError(code)
+        index = int(self.lookup[value])
+        if index < 0:
+            raise KeyError(code)
+        return index
+
+    def decode(self, rows, cols=None, fill=0):
+        """Return a ``len(rows) x cols`` array of bin indices.
+
+        Rows shorter than ``cols`` codes (by default the longest row) are
+        padded with the bin index ``fill`` and longer rows are cut short, as
+        is a partial code at the end of a row. Raises a KeyError naming the
+        first code that is not in the bin table.
+        """
+        if not rows:
+            return np.zeros((0, 0 if cols is None else cols), dtype=np.int32)
+        row_len = len(rows[0])
+        if (
+            row_len % self.width
+            or any(len(row) != row_len for row in rows)
+            or (cols is not None and row_len != cols * self.width)
+        ):
+            return self._decode_ragged(rows, cols, fill)
+        try:
+            data = "".join(rows).encode("ascii")
+        except UnicodeEncodeError:
+            return self._decode_chunks(rows, cols, fill)
+
+        cols = row_len // self.width
+        values = self._values(data).reshape(len(rows), cols)
+        indices = self.lookup[values]
+        bad = np.flatnonzero(indices < 0)
+        if bad.size:
+            row_num, col_num = divmod(int(bad[0]), cols)
+            start = col_num * self.width
+            raise KeyError(rows[row_num][start : start + self.width])
+        return indices
+
+    def _values(self, data):
+        """Convert encoded row bytes into a flat array of code values."""
+        invalid = len(self.lookup) - 1
+        if self.bin_type in (BIN_TYPE_HEX, BIN_TYPE_INT2):
+            try:
+                packed = bytes.fromhex(data.decode("ascii"))
+            except ValueError:
+                packed = b""
+            if 2 * len(packed) == len(data):
+                dtype = np.uint8 if self.bin_type == BIN_TYPE_HEX else ">u2"
+                return np.frombuffer(packed, dtype=dtype)
+
+            # Not plain hex, so check each character to flag the bad codes
+            digits = _HEX_DIGITS[np.frombuffer(data, dtype=np.uint8)]
+            digits = digits.reshape(-1, self.width).astype(np.int32)
+            values = np.zeros(len(digits), dtype=np.int32)
+            for place in range(self.width):
+                values = values * 16 + digits[:, place]
+            values[(digits < 0).any(axis=1)] = invalid
+            return values
+
+        raw = np.frombuffer(data, dtype=np.uint8)
+        if self.bin_type == BIN_TYPE_ASCII:
+            return raw
+
+        digits = raw.reshape(-1, self.width)
+        values = (
+            digits[:, 0].astype(np.int16) * 100
+            + digits[:, 1].astype(np.int16) * 10
+            + digits[:, 2]
+            - 111 * ord("0")
+        )
+        not_digit = (raw < ord("0")) | (raw > ord("9"))
+        if not_digit.any():
+            values[not_digit.reshape(-1, self.width).any(axis=1)] = invalid
+        return values
+
+    def _decode_ragged(self, rows, cols, fill):
+        """Decode rows of differing lengths into a padded array."""
+        if cols is None:
+            cols = max(len(row) for row in rows) // self.width
+        indices = np.full((len(rows), cols), fill, dtype=np.int32)
+        for row_num, row in enumerate(rows):
+            count = min(len(row) // self.width, cols)
+            if count:
+                indices[row_num, :count] = self.decode([row[: count * self.width]])[0]
+        return indices
+
+    def _decode_chunks(self, rows, cols, fill):
+        """Decode rows one code at a time for non-ASCII row data."""
+        if cols is None:
+            cols = max(len(row) for row in rows) // self.width
+        find_str = "." * self.width
+        indices = np.full((len(rows), cols), fill, dtype=np.int32)
+        for row_num, row in enumerate(rows):
+            codes = re.findall(find_str, row)[:cols]
+            indices[row_num, : len(codes)] = [self.code_index(code) for code in codes]
+        return indices
+
+
+def _hex_table():
+    """Return a lookup of ASCII byte to hexadecimal digit value."""
+    table = np.full(256, -1, dtype=np.int8)
+    for char in "0123456789abcdefABCDEF":
+        table[ord(char)] = int(char, 16)
+    return table
+
+
+_HEX_DIGITS = _hex_table()
+
+# Characters of a code in each number base
+_DIGITS = {10: frozenset("0123456789"), 16: frozenset("0123456789abcdefABCDEF")}
@@ -0,0 +1,187 @@
+"""On-disk cache of decoded wafer maps."""
+
+import functools
+import hashlib
+import json
+import os
+import numpy as np
+from waferview.constants import (
+    CACHE_DIR_ENV,
+    CACHE_DISABLE_ENV,
+    CACHE_EVICT_TO,
+    CACHE_SIZE,
+    CACHE_VERSION,
+)
+
+
+class MapCache:
+    """Least recently used cache of decoded wafer maps.
+
+    Each entry is a small JSON header (attributes and bin table) next to the
+    die grid saved as a ``.npy`` file, so a cached map is opened as a
+    read-only memory map instead of being parsed again. Entries are keyed on
+    the absolute path, size and modification time of the source file, and
+    the least recently used ones are removed once ``max_bytes`` is exceeded.
+
+    The cache size is counted once and then tracked as entries are stored,
+    so the directory is only scanned again when it has to be trimmed.
+    Other processes sharing the directory are only noticed at that point.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=CACHE_SIZE):
+        """Initialize the cache in ``cache_dir``."""
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._size = None
+
+    def key(self, path):
+        """Return the cache key for a map file."""
+        stat = os.stat(path)
+        ident = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def get(self, path, key=None):
+        """Return the cached entry for a map file, or None on a miss.
+
+        ``key`` may be given if it was already computed with ``key``.
+        """
+        try:
+            base = os.path.join(self.cache_dir, key or self.key(path))
+            with open(f"{base}.json", encoding="utf-8") as header_file:
+                entry = json.load(header_file)
+            if entry.get("version") != CACHE_VERSION:
+                return None
+            entry["die_grid"] = np.load(f"{base}.npy", mmap_mode="r")
+            # Mark the entry as recently used
+            os.utime(f"{base}.json")
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, path, wmap, key=None):
+        """Store a decoded wafer map and evict old entries if needed.
+
+        ``key`` should be taken before the map was read, so a file that
+        changes while it is parsed is not stored under its new stamp.
+        """
+        import tempfile  # pylint: disable=import-outside-toplevel
+
+        base = os.path.join(self.cache_dir, key or self.key(path))
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self.entries())
+        self._size -= _entry_size(base)
+        entry = {
+            "version": CACHE_VERSION,
+            "format": wmap.format,
+            "is_valid": wmap.is_valid,
+            "device_attr": wmap.device_attr,
+            "bin_codes": wmap.bin_codes,
+            "bin_table": wmap.bin_table,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to temporary files first so readers never see partial entries
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False) as tmp:
+            np.save(tmp, np.ascontiguousarray(wmap.die_grid))
+        os.replace(tmp.name, f"{base}.npy")
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.cache_dir, delete=False
+        ) as tmp:
+            json.dump(entry, tmp)
+        os.replace(tmp.name, f"{base}.json")
+        self._size += _entry_size(base)
+        if self._size > self.max_bytes:
+            self.evict(self.max_bytes * CACHE_EVICT_TO)
+
+    def entries(self):
+        """Return ``(last_used, size, base)`` for every entry, oldest first."""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            base = os.path.join(self.cache_dir, name[: -len(".json")])
+            try:
+                header_stat = os.stat(f"{base}.json")
+                size = header_stat.st_size + os.path.getsize(f"{base}.npy")
+            except OSError:
+                continue
+            entries.append((header_stat.st_mtime, size, base))
+        return sorted(entries)
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used entries until under the size limit.
+
+        The limit is ``max_bytes`` if given, else the cache's own.
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, base in entries:
+            if total <= max_bytes:
+                break
+            _remove_entry(base)
+            total -= size
+        self._size = total
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for _, _, base in self.entries():
+            _remove_entry(base)
+        self._size = 0
+
+
+def default_cache_dir():
+    """Return the cache directory used when none is given."""
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return cache_dir
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "waferview")
+
+
+def get_cache(cache=True):
+    """Return the cache to use for a ``cache`` argument.
+
+    ``True`` selects the shared default cache unless it is disabled through
+    the environment, ``False`` or None disable caching and a ``MapCache``
+    instance is used as-is.
+    """
+    if isinstance(cache, MapCache):
+        return cache
+    if not cache or os.environ.get(CACHE_DISABLE_ENV):
+        return None
+    return default_cache()
+
+
+@functools.cache
+def default_cache():
+    """Return the shared cache in the default location."""
+    return MapCache()
+
+
+def _entry_size(base):
+    """Return the size in bytes of a cache entry, or 0 if there is none."""
+    size = 0
+    for ext in (".json", ".npy"):
+        try:
+            size += os.path.getsize(f"{base}{ext}")
+        except OSError:
+            pass
+    return size
+
+
+def _remove_entry(base):
+    """Delete the files of a single cache entry."""
+    for ext in (".json", ".npy"):
+        try:
+            os.remove(f"{base}{ext}")
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,92 @@
+"""Define constants for the wafer map core, usable without the GUI."""
+
+# Supported wafer map formats
+SUPPORTED_FORMATS = [
+    "SEMI G85-1101",
+    "SINF",
+]
+
+# XML parser backends, fastest first; the environment variable picks one
+XML_BACKENDS = ["lxml", "etree"]
+XML_BACKEND_ENV = "WAFERVIEW_XML_BACKEND"
+
+# Bin code encodings used in the Device BinType attribute
+BIN_TYPE_ASCII = "ASCII"
+BIN_TYPE_DECIMAL = "Decimal"
+BIN_TYPE_HEX = "HexaDecimal"
+BIN_TYPE_INT2 = "Integer2"
+
+# Bytes read per chunk while streaming a map file
+READ_SIZE = 64 * 1024
+HEADER_READ_SIZE = 4 * 1024
+
+# Rows decoded at once when reporting load progress
+DECODE_CHUNK_ROWS = 256
+
+# Dies written at once by the die table exporters
+EXPORT_CHUNK_DIES = 64 * 1024
+
+# Chunks of files per worker process when stacking a lot
+STACK_CHUNKS_PER_WORKER = 4
+
+# Uncompressed map files at least this large are memory mapped
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+# Spatial analysis zones as fractions of the wafer radius, and the edge
+# exclusion in mm
+RADIAL_ZONES = {
+    "center": (0, 1 / 3),
+    "middle": (1 / 3, 2 / 3),
+    "edge": (2 / 3, float("inf")),
+}
+EDGE_EXCLUSION = 3
+
+# Wafer quadrants as angle ranges in degrees counter clockwise from +x
+QUADRANTS = {
+    "quadrant_1": (0, 90),
+    "quadrant_2": (90, 180),
+    "quadrant_3": (180, 270),
+    "quadrant_4": (270, 360),
+}
+
+# Decoded map cache
+CACHE_SIZE = 512 * 1024 * 1024
+CACHE_VERSION = 1
+CACHE_DIR_ENV = "WAFERVIEW_CACHE_DIR"
+CACHE_DISABLE_ENV = "WAFERVIEW_NO_CACHE"
+# Fraction of the cache size kept when a store pushes the cache over it, so
+# the next stores do not have to scan the cache again
+CACHE_EVICT_TO = 0.9
+
+# Memory kept for the decoded maps and bitmaps of the wafers open in a
+# session; the environment variable overrides it in megabytes
+SESSION_SIZE = 1024 * 1024 * 1024
+SESSION_SIZE_ENV = "WAFERVIEW_SESSION_MB"
+
+# Watched directories are polled this often in seconds when inotify is not
+# available, and files are read once unchanged for the settle time
+WATCH_INTERVAL = 1.0
+WATCH_SETTLE = 2.0
+
+# Set to log the time of every load, decode and paint stage
+TRACE_ENV = "WAFERVIEW_TRACE"
+
+# Map colors
+NULL_COLOR = "#666666"
+PASS_COLOR = "#66CC00"
+FAIL_COLOR = "#CC3300"
+
+# Wafer data keys
+WAFER_ID = "wafer_id"
+LOT_ID = "lot_id"
+WAFER_SIZE = "wafer_size"
+CHIP_SIZE = "chip_size"
+PRODUCT_ID = "product_id"
+CREATE_DATE = "created"
+ALL_KEYS = [WAFER_ID, LOT_ID, CHIP_SIZE, PRODUCT_ID, CREATE_DATE]
+
+# Various constants
+PASS = "Pass"
+FAIL = "Fail"
+NULL = "NULL"
+DEFAULT_WAFER_SIZE = 300
@@ -0,0 +1,479 @@
+"""Export the dies of wafer maps as a table.
+
+The die table has one line per die with the wafer and lot, the grid
+``row`` and ``col``, the die center ``x`` and ``y`` in mm from the wafer
+center, the bin code and description and the ``result`` (Pass, Fail or
+NULL). It is built from the die grid in blocks of rows, so memory stays
+bounded by ``chunk_dies`` however large the maps are, and one writer can
+append any number of wafers to a single file.
+"""
+
+import csv
+import io
+import os
+import shutil
+import sys
+import numpy as np
+from waferview import wafermap
+from waferview.batch import find_maps
+from waferview.constants import (
+    CHIP_SIZE,
+    EXPORT_CHUNK_DIES,
+    FAIL,
+    LOT_ID,
+    NULL,
+    PASS,
+    WAFER_ID,
+)
+
+COLUMNS = ["wafer_id", "lot_id", "row", "col", "x", "y", "bin", "desc", "result"]
+
+FORMATS = {
+    ".csv": "csv",
+    ".npz": "npz",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+def die_chunks(wmap, chunk_dies=EXPORT_CHUNK_DIES, include_null=False):
+    """Yield the die table of a map as blocks of column arrays.
+
+    Every block covers whole rows of the grid and holds ``row``, ``col``,
+    ``x``, ``y`` and ``bin``, the index of each die's code in
+    ``bin_table``. Untested dies are left out unless ``include_null`` is
+    set. Die centers use the same layout as ``spatial.geometry``.
+    """
+    grid = wmap.die_grid
+    rows, cols = grid.shape
+    chip_x, chip_y = (size / 1000 for size in wmap.device_attr[CHIP_SIZE])
+    x = (np.arange(cols) + 0.5 - cols / 2) * chip_x
+    tested = np.array(
+        [wmap.bin_codes[code]["status"] is not None for code in wmap.bin_table]
+    )
+    step = max(1, chunk_dies // max(cols, 1))
+    for start in range(0, rows, step):
+        block = grid[start : start + step]
+        if include_null:
+            row, col = np.indices(block.shape).reshape(2, -1)
+        else:
+            row, col = np.nonzero(tested[block])
+        if not len(row):
+            continue
+        bins = block[row, col]
+        row = (row + start).astype(np.int32)
+        yield {
+            "row": row,
+            "col": col.astype(np.int32),
+            "x": x[col],
+            "y": (rows / 2 - row - 0.5) * chip_y,
+            "bin": bins,
+        }
+
+
+def bin_info(wmap):
+    """Return the ``(code, desc, result)`` of every bin in ``bin_table``."""
+    info = []
+    for code in wmap.bin_table:
+        status = wmap.bin_codes[code]["status"]
+        result = NULL if status is None else PASS if status else FAIL
+        info.append((code, wmap.bin_codes[code]["desc"], result))
+    return info
+
+
+class DieTableWriter:
+    """Base class of the die table writers.
+
+    Subclasses write one block with ``write_chunk`` and finish the file in
+    ``close``; ``start_wafer`` is called once per map, even one without
+    dies. Writers are context managers.
+    """
+
+    def __init__(self, chunk_dies=EXPORT_CHUNK_DIES, include_null=False):
+        """Initialize the writer options."""
+        self.chunk_dies = chunk_dies
+        self.include_null = include_null
+        self.dies = 0
+        self.wafers = 0
+
+    def __enter__(self):
+        """Return the writer."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Finish the file."""
+        self.close()
+
+    def write(self, wmap):
+        """Append the dies of a map and return how many were written."""
+        start = self.dies
+        bins = bin_info(wmap)
+        wafer = (wmap.device_attr[WAFER_ID], wmap.device_attr[LOT_ID])
+        self.start_wafer(wafer, bins)
+        try:
+            for chunk in die_chunks(wmap, self.chunk_dies, self.include_null):
+                self.write_chunk(wafer, bins, chunk)
+                self.dies += len(chunk["row"])
+        except BaseException:
+            self.discard_wafer(start)
+            raise
+        self.wafers += 1
+        return self.dies - start
+
+    def start_wafer(self, wafer, bins):
+        """Prepare for the dies of a new wafer."""
+
+    def write_chunk(self, wafer, bins, chunk):
+        """Write one block of dies of a wafer."""
+        raise NotImplementedError
+
+    def discard_wafer(self, dies):
+        """Drop a failed wafer written from die ``dies`` on, where possible."""
+
+    def close(self):
+        """Finish the file."""
+
+
+class CsvWriter(DieTableWriter):
+    """Write the die table as CSV.
+
+    The text shared by many dies (the wafer, every bin and every die
+    position) is formatted once per wafer or block, so each line is only
+    joined from prepared strings. A header is added to empty files, so an
+    existing table can be opened in append mode and extended.
+    """
+
+    def __init__(self, out_file, append=False, **kwargs):
+        """Initialize the writer on a path or a text file.
+
+        Paths are opened for appending with ``append`` set and overwritten
+        otherwise; files must be opened with ``newline=""``.
+        """
+        super().__init__(**kwargs)
+        self.path = None
+        if isinstance(out_file, (str, os.PathLike)):
+            self.path = out_file
+            out_file = open(  # pylint: disable=consider-using-with
+                out_file, "a" if append else "w", newline="", encoding="utf-8"
+            )
+        self.out_file = out_file
+        self._wafer = None
+        if not out_file.seekable() or out_file.tell() == 0:
+            csv.writer(out_file).writerow(COLUMNS)
+
+    def write_chunk(self, wafer, bins, chunk):
+        """Write one block of dies as CSV lines."""
+        if self._wafer is None or self._wafer[0] != (wafer, bins):
+            self._wafer = (
+                (wafer, bins),
+                _csv_fields(wafer),
+                [_csv_fields(info) for info in bins],
+            )
+        _, prefix, suffix = self._wafer
+        row_text = {
+            row: (f"{prefix},{row},", f",{y:.4f},")
+            for row, y in _unique(chunk["row"], chunk["y"])
+        }
+        col_text = {
+            col: f"{col},{x:.4f}" for col, x in _unique(chunk["col"], chunk["x"])
+        }
+        lines = []
+        for row, col, index in zip(
+            chunk["row"].tolist(), chunk["col"].tolist(), chunk["bin"].tolist()
+        ):
+            start, end = row_text[row]
+            lines.append(start + col_text[col] + end + suffix[index])
+        lines.append("")
+        self.out_file.write("\r\n".join(lines))
+
+    def close(self):
+        """Flush the file, closing it if it was opened from a path."""
+        if self.path is None:
+            self.out_file.flush()
+        elif not self.out_file.closed:
+            self.out_file.close()
+
+
+class NpzWriter(DieTableWriter):
+    """Write the die table as NumPy arrays in an ``.npz`` file.
+
+    Each column is spooled to a temporary file as blocks arrive and copied
+    into the archive on ``close``. Dies reference the wafer and bin tables
+    by index: ``wafer`` indexes ``wafer_id`` and ``lot_id`` and ``bin``
+    indexes ``bin_code``, ``bin_desc`` and ``bin_result``, which are shared
+    by all wafers. ``passed`` flags the passing dies.
+    """
+
+    DTYPES = {
+        "wafer": np.int32,
+        "row": np.int32,
+        "col": np.int32,
+        "x": np.float64,
+        "y": np.float64,
+        "bin": np.int32,
+        "passed": np.bool_,
+    }
+
+    def __init__(self, path, compress=False, **kwargs):
+        """Initialize the writer for an ``.npz`` path."""
+        import tempfile  # pylint: disable=import-outside-toplevel
+
+        super().__init__(**kwargs)
+        self.path = path
+        self.compress = compress
+        self.columns = {name: tempfile.TemporaryFile() for name in self.DTYPES}
+        self.wafer_table = []
+        self.bin_table = {}
+        self._bins = None
+
+    def start_wafer(self, wafer, bins):
+        """Add the wafer to the wafer table, so wafers without dies keep a row."""
+        self.wafer_table.append(wafer)
+
+    def discard_wafer(self, dies):
+        """Cut the column files and wafer table back to before a failed wafer."""
+        for name, dtype in self.DTYPES.items():
+            column = self.columns[name]
+            column.truncate(dies * np.dtype(dtype).itemsize)
+            column.seek(0, os.SEEK_END)
+        del self.wafer_table[self.wafers :]
+        self.dies = dies
+
+    def write_chunk(self, wafer, bins, chunk):
+        """Append one block of dies to the column files."""
+        if self._bins is None or self._bins[0] != bins:
+            lookup = np.array(
+                [self.bin_table.setdefault(info, len(self.bin_table)) for info in bins],
+                dtype=np.int32,
+            )
+            passed = np.array([result == PASS for _, _, result in bins])
+            self._bins = (bins, lookup, passed)
+        _, lookup, passed = self._bins
+        values = dict(chunk)
+        values["wafer"] = np.full(len(chunk["row"]), self.wafers)
+        values["bin"] = lookup[chunk["bin"]]
+        values["passed"] = passed[chunk["bin"]]
+        for name, dtype in self.DTYPES.items():
+            self.columns[name].write(values[name].astype(dtype, copy=False).tobytes())
+
+    def close(self):
+        """Write the archive and remove the column files."""
+        import zipfile  # pylint: disable=import-outside-toplevel
+
+        if self.columns is None:
+            return
+        compression = zipfile.ZIP_DEFLATED if self.compress else zipfile.ZIP_STORED
+        wafers = self.wafer_table
+        bins = list(self.bin_table)
+        tables = {
+            "wafer_id": [wafer_id or "" for wafer_id, _ in wafers],
+            "lot_id": [lot_id or "" for _, lot_id in wafers],
+            "bin_code": [code for code, _, _ in bins],
+            "bin_desc": [desc for _, desc, _ in bins],
+            "bin_result": [result for _, _, result in bins],
+        }
+        try:
+            with zipfile.ZipFile(self.path, "w", compression) as archive:
+                for name, dtype in self.DTYPES.items():
+                    column = self.columns[name]
+                    column.seek(0)
+                    with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                        header = {
+                            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                            "fortran_order": False,
+                            "shape": (self.dies,),
+                        }
+                        np.lib.format.write_array_header_2_0(member, header)
+                        shutil.copyfileobj(column, member)
+                for name, values in tables.items():
+                    with archive.open(f"{name}.npy", "w") as member:
+                        np.lib.format.write_array(member, np.array(values, dtype=str))
+        finally:
+            for column in self.columns.values():
+                column.close()
+            self.columns = None
+
+
+class ArrowWriter(DieTableWriter):
+    """Write the die table as Parquet or Arrow IPC with pyarrow.
+
+    Every block becomes a row group (Parquet) or record batch (Arrow). The
+    text columns are built from the wafer and bin tables by index, without
+    a Python string per die.
+    """
+
+    def __init__(self, path, out_format="parquet", **kwargs):
+        """Initialize the writer, raising ImportError without pyarrow."""
+        try:
+            import pyarrow  # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise ImportError(
+                f"Writing {out_format} die tables requires the pyarrow package"
+            ) from err
+
+        super().__init__(**kwargs)
+        self.pa = pyarrow
+        self.schema = pyarrow.schema(
+            [
+                ("wafer_id", pyarrow.string()),
+                ("lot_id", pyarrow.string()),
+                ("row", pyarrow.int32()),
+                ("col", pyarrow.int32()),
+                ("x", pyarrow.float64()),
+                ("y", pyarrow.float64()),
+                ("bin", pyarrow.string()),
+                ("desc", pyarrow.string()),
+                ("result", pyarrow.string()),
+            ]
+        )
+        if out_format == "parquet":
+            import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc  # pylint: disable=import-outside-toplevel
+
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write_chunk(self, wafer, bins, chunk):
+        """Write one block of dies as a row group or record batch."""
+        count = len(chunk["row"])
+        same = np.zeros(count, dtype=np.int32)
+        index = chunk["bin"].astype(np.int32)
+        columns = [
+            self._strings(same, [wafer[0]]),
+            self._strings(same, [wafer[1]]),
+        ]
+        columns += [self.pa.array(chunk[name]) for name in ("row", "col", "x", "y")]
+        columns += [self._strings(index, values) for values in zip(*bins)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def _strings(self, indices, values):
+        """Return a string column taking ``values`` at ``indices``."""
+        return self.pa.DictionaryArray.from_arrays(
+            self.pa.array(indices), self.pa.array(list(values), self.pa.string())
+        ).dictionary_decode()
+
+    def close(self):
+        """Finish the file."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def open_writer(path, out_format=None, append=False, **kwargs):
+    """Return a die table writer for a path.
+
+    ``out_format`` is one of ``csv``, ``npz``, ``parquet`` or ``arrow`` and
+    defaults to the one matching the path's extension, else CSV. Only CSV
+    tables can be extended with ``append`` and only NPZ tables compressed
+    with ``compress``. Other keyword arguments are passed to the writer.
+    """
+    if out_format is None:
+        out_format = FORMATS.get(os.path.splitext(str(path))[1].lower(), "csv")
+    if append and out_format != "csv":
+        raise ValueError(f"{out_format} die tables cannot be appended to")
+    compress = kwargs.pop("compress", False)
+    if compress and out_format != "npz":
+        raise ValueError(f"{out_format} die tables cannot be compressed")
+    if out_format == "csv":
+        return CsvWriter(path, append=append, **kwargs)
+    if out_format == "npz":
+        return NpzWriter(path, compress=compress, **kwargs)
+    if out_format in ("parquet", "arrow"):
+        return ArrowWriter(path, out_format, **kwargs)
+    raise ValueError(f"Unknown die table format {out_format!r}")
+
+
+def export_map(wmap, path, out_format=None, **kwargs):
+    """Write the die table of one map and return the number of dies."""
+    with open_writer(path, out_format, **kwargs) as writer:
+        return writer.write(wmap)
+
+
+def export_files(paths, writer, cache=True):
+    """Append the dies of map files to a writer, one map at a time.
+
+    Yields ``{"file": path, "dies": count}`` for every map, or an ``error``
+    entry instead of raising so one bad file never stops a batch. Only one
+    decoded map is held at a time.
+    """
+    for path in paths:
+        try:
+            dies = writer.write(wafermap.WaferMap(path, cache=cache))
+        except Exception as err:  # pylint: disable=broad-except
+            yield {"file": path, "error": f"{type(err).__name__}: {err}"}
+        else:
+            yield {"file": path, "dies": dies}
+
+
+def main(argv=None):
+    """Export the die tables of map files from the command line."""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog="waferview-export",
+        description="Write the dies of wafer maps to one CSV, NPZ or Parquet table.",
+    )
+    parser.add_argument("paths", nargs="+", help="map files or directories")
+    parser.add_argument("-o", "--output", required=True, help="output file")
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["csv", "npz", "parquet", "arrow"],
+        help="output format (default: from output extension, else csv)",
+    )
+    parser.add_argument(
+        "-a", "--append", action="store_true", help="append to an existing CSV table"
+    )
+    parser.add_argument(
+        "--include-null", action="store_true", help="also export untested dies"
+    )
+    parser.add_argument(
+        "--compress", action="store_true", help="compress the arrays of NPZ tables"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="do not use the decoded map cache"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        writer = open_writer(
+            args.output,
+            args.format,
+            args.append,
+            include_null=args.include_null,
+            compress=args.compress,
+        )
+    except (ImportError, ValueError) as err:
+        parser.error(str(err))
+
+    errors = 0
+    with writer:
+        for result in export_files(find_maps(args.paths), writer, not args.no_cache):
+            if "error" in result:
+                errors += 1
+                print(f"{result['file']}: {result['error']}", file=sys.stderr)
+    print(
+        f"Wrote {writer.dies} dies of {writer.wafers} wafers to {args.output}",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+def _csv_fields(values):
+    """Return values formatted as consecutive CSV fields."""
+    text = io.StringIO()
+    csv.writer(text, lineterminator="").writerow(values)
+    return text.getvalue()
+
+
+def _unique(keys, values):
+    """Return ``(key, value)`` pairs for the first occurrence of each key."""
+    keys, first = np.unique(keys, return_index=True)
+    return zip(keys.tolist(), values[first].tolist())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,39 @@
 """Define constants for GUI."""
 
-# Supported wafer map formats
-SUPPORTED_FORMATS = [
-    "SEMI G85-1101",
-]
+# The core constants are available here too
+from waferview.constants import *  # noqa: F401,F403
+
+# File dialog filter for plain and compressed map files
+MAP_WILDCARD = (
+    "XML files (*.xml;*.xml.gz;*.xml.bz2;*.xml.xz;*.xml.zst)"
+    "|*.xml;*.xml.gz;*.xml.bz2;*.xml.xz;*.xml.zst|All files (*.*)|*.*"
+)
+# Maps still being written are only read uncompressed
+GROWING_WILDCARD = "XML files (*.xml)|*.xml|All files (*.*)|*.*"
+
+# Share of the GUI progress bar given to each stage of loading a map
+PROGRESS_RANGE = 100
+PROGRESS_STAGES = {
+    "parse": (0, 70),
+    "decode": (70, 95),
+    "legend": (95, 100),
+    "stack": (0, 100),
+}
+PROGRESS_MESSAGES = {
+    "parse": "Reading map",
+    "decode": "Decoding die data",
+    "legend": "Building legend",
+    "stack": "Stacking wafers",
+}
+
+# Minimum time between die lookups while the mouse moves over the map
+HOVER_INTERVAL_MS = 50
+
+# Newest watched map is shown at most this often
+WATCH_SHOW_MS = 250
+
+# Maps still being written are checked for new rows this often in seconds
+FOLLOW_INTERVAL = 1.0
 
 # GUI control
 WINDOW_SIZE = (1100, 900)
@@ -21,21 +51,8 @@ DATA_SCALE = 0.4
 GRID_SCALE = 0.3
 LEGEND_SCALE = 0.7
 BORDER_SIZE = 10
-NULL_COLOR = "#666666"
-PASS_COLOR = "#66CC00"
-FAIL_COLOR = "#CC3300"
-
-# Wafer data keys
-WAFER_ID = "wafer_id"
-LOT_ID = "lot_id"
-WAFER_SIZE = "wafer_size"
-CHIP_SIZE = "chip_size"
-PRODUCT_ID = "product_id"
-CREATE_DATE = "created"
-ALL_KEYS = [WAFER_ID, LOT_ID, CHIP_SIZE, PRODUCT_ID, CREATE_DATE]
-
-# Various constants
-PASS = "Pass"
-FAIL = "Fail"
-NULL = "NULL"
-DEFAULT_WAFER_SIZE = 300
+HEAT_LEVELS = 8
+
+# Dies smaller than this many screen pixels are drawn as a scaled image
+# instead of one rectangle each
+LOD_DIE_PIXELS = 4
@@ -1,13 +1,28 @@
 """GUI module."""
-import importlib.metadata
+import functools
 import os
+import threading
 import wx
-import wx.adv
 import wx.lib.scrolledpanel as scrolled
 from waferview.gui import semimap
 from waferview.gui import constants
+from waferview.session import MapSession
+from waferview.watch import DirectoryWatcher, ingest
 
-__version__ = importlib.metadata.version("wafer-view")
+
+def __getattr__(name):
+    """Look up the package version only when it is asked for."""
+    if name == "__version__":
+        return version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@functools.cache
+def version():
+    """Return the installed package version."""
+    import importlib.metadata  # pylint: disable=import-outside-toplevel
+
+    return importlib.metadata.version("wafer-view")
 
 
 def run():
@@ -24,15 +39,23 @@ class AppTop(wx.Frame):
     def __init__(self, title):
         """Initialize the app."""
         wx.Frame.__init__(self, None, title=title)
+        self.session = MapSession()
+        self.watch_stop = None
+        self.watch_latest = None
+        self.watch_timer = None
+        self.watch_count = 0
         self.window()
         self.initialize()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
 
     def initialize(self):
         """Create all panels and frames for the GUI."""
         self.create_panels()
         self.create_menu()
+        self.CreateStatusBar()
         self.create_status()
         self.create_controls()
+        self.create_wafer_list()
         self.create_viewer()
         self.left_panel.SetSizer(self.sizers["left"])
         self.right_panel.SetSizer(self.sizers["right"])
@@ -72,6 +95,7 @@ class AppTop(wx.Frame):
         self.grid_size = (dataX, int(self.panel_size[1] * constants.GRID_SCALE))
         self.legend_size = (dataX, int(self.panel_size[1] * constants.LEGEND_SCALE))
         self.control_size = (dataX, 50)
+        self.list_size = (dataX, 80)
 
         self.legend_pos = (
             constants.BORDER_SIZE + 5,
@@ -127,7 +151,7 @@ class AppTop(wx.Frame):
 
         # Create sizers for other panels
         self.sizers = {
-            "left": wx.FlexGridSizer(rows=3, cols=1, vgap=1, hgap=1),
+            "left": wx.FlexGridSizer(rows=4, cols=1, vgap=1, hgap=1),
             "right": wx.BoxSizer(),
             "grid": wx.BoxSizer(),
         }
@@ -141,24 +165,11 @@ class AppTop(wx.Frame):
         self.SetMenuBar(self.menubar)
 
     def create_viewer(self):
-        """Create the wafer map viewer."""
-        try:
-            pixels = self.viewer.pixel_elements
-            colors = self.viewer.color_map
-            scale = self.viewer.scale
-            self.viewer.Destroy()
-        except AttributeError:
-            pixels = {}
-            colors = {}
+        """Create the wafer map viewer, which every shown map is swapped into."""
         self.create_legend()
         self.viewer = semimap.Viewer(
             self, self.right_panel, self.viewer_size[0], self.viewer_size[1]
         )
-        try:
-            self.viewer.scale = scale
-        except UnboundLocalError:
-            self.viewer.pixel_elements = pixels
-        self.viewer.color_map = colors
         self.sizers["right"].Add(self.viewer, 1, wx.EXPAND | wx.ALL)
         self.viewer.Bind(wx.EVT_KEY_DOWN, self.process_keypress)
 
@@ -237,12 +248,131 @@ class AppTop(wx.Frame):
             ord("0"): ("zoom", 0),
         }
 
+    def create_wafer_list(self):
+        """Create the list of wafers open in the session."""
+        self.wafer_list = wx.ListBox(
+            self.left_panel, size=self.list_size, style=wx.LB_SINGLE
+        )
+        self.wafer_list.Bind(wx.EVT_LISTBOX, self.select_wafer)
+        self.sizers["left"].Add(self.wafer_list, 1, wx.EXPAND | wx.ALL, border=1)
+
+    def update_wafer_list(self, selected=None):
+        """Show the open wafers, selecting the one at index ``selected``."""
+        self.wafer_list.Set([os.path.basename(path) for path in self.session.paths])
+        if selected is not None:
+            self.wafer_list.SetSelection(selected)
+
+    def open_maps(self, file_names):
+        """Add maps to the session and show the first one."""
+        indices = [self.session.open(file_name) for file_name in file_names]
+        self.update_wafer_list(indices[0])
+        self.show_map(self.session.paths[indices[0]])
+
+    def show_map(self, file_name):
+        """Show an open map, reusing its decoded data while it is cached."""
+        self.viewer.generate_map(file_name)
+
+    def follow_map(self, file_name):
+        """Show a map that is still being written as its rows arrive."""
+        self.wafer_list.SetSelection(wx.NOT_FOUND)
+        self.viewer.follow_map(file_name)
+
+    def select_wafer(self, event):
+        """Show the wafer picked in the wafer list."""
+        index = self.wafer_list.GetSelection()
+        if index == wx.NOT_FOUND:
+            return
+        path = self.session.paths[index]
+        if path != self.viewer.path:
+            self.show_map(path)
+
+    def step_wafer(self, event, step):
+        """Show the next or previous open wafer."""
+        if not self.session.paths:
+            return
+        index = self.wafer_list.GetSelection()
+        index = 0 if index == wx.NOT_FOUND else (index + step) % len(self.session)
+        self.wafer_list.SetSelection(index)
+        self.show_map(self.session.paths[index])
+
+    def close_wafer(self, event):
+        """Close the shown wafer and show the next open one."""
+        index = self.wafer_list.GetSelection()
+        if index == wx.NOT_FOUND:
+            return
+        self.session.close(self.session.paths[index])
+        if not self.session.paths:
+            self.update_wafer_list()
+            self.viewer.clear_map()
+            return
+        index = min(index, len(self.session) - 1)
+        self.update_wafer_list(index)
+        self.show_map(self.session.paths[index])
+
+    def watch_directory(self, directory):
+        """Show maps written to a directory as they arrive.
+
+        Maps are summarized on a process pool, which also fills the decoded
+        map cache, and the newest one is then shown from the cache.
+        """
+        self.stop_watch()
+        watcher = DirectoryWatcher([directory])
+        self.watch_stop = threading.Event()
+        self.watch_count = 0
+        threading.Thread(
+            target=self.run_watch, args=(watcher, self.watch_stop), daemon=True
+        ).start()
+        method = "inotify" if watcher.inotify else "polling"
+        self.SetStatusText(f"Watching {directory} ({method})")
+
+    def run_watch(self, watcher, stop):
+        """Pass summaries of watched maps to the GUI; runs on a worker thread."""
+        try:
+            for summary in ingest(watcher, stop=stop):
+                wx.CallAfter(self.watched_map, summary)
+        finally:
+            watcher.close()
+
+    def stop_watch(self, event=None):
+        """Stop watching a directory."""
+        if self.watch_stop is not None:
+            self.watch_stop.set()
+            self.watch_stop = None
+            self.SetStatusText("")
+
+    def watched_map(self, summary):
+        """List a newly written map and show the newest one shortly after."""
+        if not self or self.watch_stop is None:
+            return
+        path = summary["file"]
+        if "error" in summary:
+            self.SetStatusText(f"{os.path.basename(path)}: {summary['error']}")
+            return
+        self.session.open(path)
+        self.update_wafer_list(self.wafer_list.GetSelection())
+        self.watch_count += 1
+        self.watch_latest = path
+        self.SetStatusText(f"{self.watch_count} maps received, newest {path}")
+        # Bursts of maps only show the last one instead of every map in turn
+        if self.watch_timer is None:
+            self.watch_timer = wx.CallLater(constants.WATCH_SHOW_MS, self.show_latest)
+
+    def show_latest(self):
+        """Show the newest watched map."""
+        self.watch_timer = None
+        if not self or self.watch_latest not in self.session:
+            return
+        self.wafer_list.SetSelection(self.session.open(self.watch_latest))
+        self.show_map(self.watch_latest)
+
+    def on_close(self, event):
+        """Stop background work before the window closes."""
+        self.stop_watch()
+        self.viewer.stop_follow()
+        event.Skip()
+
     def create_legend(self):
         """Create the legend section."""
-        try:
-            self.legend_panel.Destroy()
-        except AttributeError:
-            pass
         self.legend_panel = scrolled.ScrolledPanel(
             self.left_panel,
             size=self.legend_size,
@@ -306,10 +436,50 @@ class MenuBar(wx.MenuBar):
         filemenu = wx.Menu()
         self.Append(filemenu, "&File")
         filemenu.Append(wx.ID_OPEN, "O&pen\tCtrl-O")
+        self.stack_id = wx.NewIdRef()
+        filemenu.Append(
+            self.stack_id, "Open &Lot Stack\tCtrl-L", "Stack several wafer maps"
+        )
+        self.next_id = wx.NewIdRef()
+        self.previous_id = wx.NewIdRef()
+        self.watch_id = wx.NewIdRef()
+        self.stop_watch_id = wx.NewIdRef()
+        self.follow_id = wx.NewIdRef()
+        filemenu.Append(
+            self.follow_id,
+            "&Follow Growing Map\tCtrl-G",
+            "Show a map that is still being written",
+        )
+        filemenu.Append(
+            self.watch_id,
+            "&Watch Directory\tCtrl-D",
+            "Show maps as they are written to a directory",
+        )
+        filemenu.Append(self.stop_watch_id, "S&top Watching", "Stop watching")
+        filemenu.Append(wx.ID_CLOSE, "&Close Wafer\tCtrl-W", "Close the shown wafer")
+        filemenu.Append(self.next_id, "&Next Wafer\tCtrl-PgDn", "Show the next wafer")
+        filemenu.Append(
+            self.previous_id, "P&revious Wafer\tCtrl-PgUp", "Show the previous wafer"
+        )
         filemenu.Append(wx.ID_EXIT, "E&xit\tAlt-X", "Close window and exit program")
         filemenu.Append(wx.ID_SAVE, "S&ave\tCtrl-S", "Save wafermap image")
         self.parent.Bind(wx.EVT_MENU, self.save_image, id=wx.ID_SAVE)
         self.parent.Bind(wx.EVT_MENU, self.file_browser, id=wx.ID_OPEN)
+        self.parent.Bind(wx.EVT_MENU, self.stack_browser, id=self.stack_id)
+        self.parent.Bind(wx.EVT_MENU, self.follow_browser, id=self.follow_id)
+        self.parent.Bind(wx.EVT_MENU, self.watch_browser, id=self.watch_id)
+        self.parent.Bind(wx.EVT_MENU, self.parent.stop_watch, id=self.stop_watch_id)
+        self.parent.Bind(wx.EVT_MENU, self.parent.close_wafer, id=wx.ID_CLOSE)
+        self.parent.Bind(
+            wx.EVT_MENU,
+            lambda event: self.parent.step_wafer(event, 1),
+            id=self.next_id,
+        )
+        self.parent.Bind(
+            wx.EVT_MENU,
+            lambda event: self.parent.step_wafer(event, -1),
+            id=self.previous_id,
+        )
 
         helpmenu = wx.Menu()
         self.Append(helpmenu, "&Help")
@@ -318,9 +488,11 @@ class MenuBar(wx.MenuBar):
 
     def about_screen(self, event):
         """Open the About dialog on event."""
+        import wx.adv  # pylint: disable=import-outside-toplevel
+
         about = wx.adv.AboutDialogInfo()
         about.SetName("Wafer-View")
-        about.SetVersion(__version__)
+        about.SetVersion(version())
         about.SetLicense("Apache 2.0 <https://github.com/fronzbot/wafer-view/LICENSE>")
         about.SetDescription("Open source wafer map viewer utility")
         about.SetCopyright("(C) 2023")
@@ -340,16 +512,7 @@ class MenuBar(wx.MenuBar):
                 return
             dir_name = dir_dialog.GetPath()
 
-        dc = self.parent.viewer.OnPaint(None)
-        size = self.parent.viewer.GetSize()
-        bmp = wx.Bitmap(size.width, size.height)
-        memdc = wx.MemoryDC()
-        memdc.SelectObject(bmp)
-
-        memdc.Blit(0, 0, size.width, size.height, dc, 0, 0)
-        memdc.SelectObject(wx.NullBitmap)
-
-        img = bmp.ConvertToImage()
+        img = self.parent.viewer.snapshot().ConvertToImage()
         file_name = os.path.join(dir_name, "wafermap.bmp")
         img.SaveFile(file_name, wx.BITMAP_TYPE_PNG)
 
@@ -368,13 +531,55 @@ class MenuBar(wx.MenuBar):
             message="Choose file",
             defaultDir=".",
             defaultFile="",
-            wildcard="XML files (*.xml)|*.xml",
+            wildcard=constants.MAP_WILDCARD,
+            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST | wx.FD_MULTIPLE,
+        ) as file_dialog:
+            if file_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            file_names = file_dialog.GetPaths()
+            self.file_name = file_names[0]
+
+        # Selected files join the session and the first one is shown
+        self.parent.open_maps(file_names)
+
+    def follow_browser(self, event):
+        """Choose a map that is still being written on event."""
+        with wx.FileDialog(
+            self,
+            message="Choose growing map",
+            defaultDir=".",
+            defaultFile="",
+            wildcard=constants.GROWING_WILDCARD,
             style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST,
         ) as file_dialog:
             if file_dialog.ShowModal() == wx.ID_CANCEL:
                 return
-            self.file_name = file_dialog.GetPath()
+            self.parent.follow_map(file_dialog.GetPath())
+
+    def watch_browser(self, event):
+        """Choose a directory to watch for new maps on event."""
+        with wx.DirDialog(
+            self,
+            message="Choose directory to watch",
+            defaultPath=".",
+        ) as dir_dialog:
+            if dir_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            self.parent.watch_directory(dir_dialog.GetPath())
+
+    def stack_browser(self, event):
+        """Open several maps on event and show them as a stacked heat map."""
+        with wx.FileDialog(
+            self,
+            message="Choose wafer maps to stack",
+            defaultDir=".",
+            defaultFile="",
+            wildcard=constants.MAP_WILDCARD,
+            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST | wx.FD_MULTIPLE,
+        ) as file_dialog:
+            if file_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            file_names = file_dialog.GetPaths()
 
-        # Once a file is selected, we need to generate the map and viewer
-        self.parent.create_viewer()
-        self.parent.viewer.generate_map(self.file_name)
+        self.parent.wafer_list.SetSelection(wx.NOT_FOUND)
+        self.parent.viewer.stack_maps(file_names)
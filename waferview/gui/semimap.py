@@ -1,9 +1,15 @@
 """GUI elements for wafer map."""
 
+import os
+import threading
+import numpy as np
 import wx
 import wx.grid
 from waferview import wafermap
 from waferview.gui import constants
+from waferview.render import die_rects, hex_to_rgb
+from waferview.stack import stack_files
+from waferview.tracing import span
 
 
 class Viewer(wx.Panel):
@@ -13,14 +19,38 @@ class Viewer(wx.Panel):
         """Initialize the viewer panel."""
         width, height = parent.GetSize()
         wx.Panel.__init__(self, parent, size=(width, height))
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
         self.Bind(wx.EVT_PAINT, self.OnPaint)
+        self.Bind(wx.EVT_SIZE, self.OnSize)
+        self.Bind(wx.EVT_MOTION, self.OnMotion)
+        self.Bind(wx.EVT_LEFT_DOWN, self.OnLeftDown)
         self.SetBackgroundColour(constants.NULL_COLOR)
         self.top = top
+        self.session = top.session
+        self.path = None
         self.grid = top.data_grid
         self.legend_sizer = top.sizers["legend"]
         self.legend_parent = top.legend_panel
-        self.pixel_elements = {}
+        self.key_counts = {}
         self.color_map = {}
+        self.key_grid = None
+        self.grid_keys = []
+        self.palette = None
+        self.wmap = None
+        self.stack = None
+        self.hover_pos = None
+        self.hover_die = None
+        self.hover_timer = None
+        self.follow_stop = None
+        self.follow_path = None
+        self.progress_dialog = None
+        self.cancel_event = None
+        self.legend_entries = {}
+        self.timings = {}
+        self.buffer = None
+        self.buffer_view = None
+        self.image = None
+        self.image_layout = None
         scale_val = 0.95 * min(width, height)
         self.zoom_factor = 1
         self.xorigin = 0
@@ -31,95 +61,737 @@ class Viewer(wx.Panel):
         self.transform = wx.AffineMatrix2D()
 
     def OnPaint(self, event=None):
-        """Handle painting events."""
+        """Handle painting events.
+
+        The map is drawn once into a cached bitmap and every paint only blits
+        that bitmap, so panning and zooming cost the same for any number of
+        dies.
+        """
+        with span("paint", self.timings):
+            dc = wx.AutoBufferedPaintDC(self)
+            self.draw(dc)
+
+    def OnSize(self, event):
+        """Redraw the cached map at the new panel size."""
+        self.invalidate()
+        event.Skip()
+
+    def draw(self, dc):
+        """Draw the cached map on a device context with the view transform.
+
+        While a die covers fewer than ``LOD_DIE_PIXELS`` screen pixels the
+        dies inside the viewport are drawn as one image of that part of the
+        die grid scaled to its on-screen size. The image is kept while the
+        same dies are visible at the same zoom, so panning only moves it,
+        and the part on the panel is drawn. Once zoomed in further the dies
+        are drawn as rectangles into a buffer kept until the view changes.
+        """
+        dc.SetBackground(wx.Brush(wx.Colour(constants.NULL_COLOR)))
+        dc.Clear()
+        _, _, width, _ = self.screen_rect()
+        die_pixels = width / self.key_grid.shape[1] if self.key_grid is not None else 0
+        if die_pixels and die_pixels < constants.LOD_DIE_PIXELS:
+            layout, (left, top) = self.image_view()
+            client_width, client_height = self.GetClientSize()
+            clip = wx.Rect(left, top, *layout[1]).Intersect(
+                wx.Rect(0, 0, client_width, client_height)
+            )
+            if clip.IsEmpty():
+                return
+            if self.image is None or self.image_layout != layout:
+                self.image = self.render_image(layout)
+                self.image_layout = layout
+                self.remember_image()
+            part = wx.Rect(clip.x - left, clip.y - top, clip.width, clip.height)
+            dc.DrawBitmap(self.image.GetSubBitmap(part), clip.x, clip.y)
+            return
+
+        if not die_pixels:
+            return
+        view = self.view_state()
+        if self.buffer is None or self.buffer_view != view:
+            self.buffer = self.render_buffer()
+            self.buffer_view = view
+        dc.DrawBitmap(self.buffer, 0, 0)
+
+    def screen_rect(self):
+        """Return the ``(left, top, width, height)`` of the map on screen."""
+        corners = [
+            self.transform.TransformPoint(wx.Point2DDouble(xloc, yloc))
+            for xloc, yloc in (
+                (self.xoffset, self.yoffset),
+                (self.xoffset + self.scale[0], self.yoffset + self.scale[1]),
+            )
+        ]
+        return (
+            corners[0].x,
+            corners[0].y,
+            corners[1].x - corners[0].x,
+            corners[1].y - corners[0].y,
+        )
+
+    def image_view(self):
+        """Return the layout of the image of the dies inside the viewport.
+
+        The layout is the visible ``((rows, cols), (width, height))`` slices
+        of the die grid and their size on screen, which is all the image
+        depends on. It is returned with the ``(left, top)`` panel position
+        of the image, in whole pixels.
+        """
+        left, top, width, height = self.screen_rect()
+        grid_rows, grid_cols = self.key_grid.shape
+        rows, cols = self.visible_slices()
+        size = (
+            round((cols.stop - cols.start) / grid_cols * width),
+            round((rows.stop - rows.start) / grid_rows * height),
+        )
+        # Row 0 is at the bottom of the map
+        position = (
+            round(left + cols.start / grid_cols * width),
+            round(top + (1 - rows.stop / grid_rows) * height),
+        )
+        return ((rows, cols), size), position
+
+    def build_palette(self):
+        """Set the RGB color of every grid key from the color map."""
+        null_color = wx.Colour(constants.NULL_COLOR)
+        self.palette = np.array(
+            [self.color_map.get(key, null_color).Get(False) for key in self.grid_keys],
+            dtype=np.uint8,
+        ).reshape(-1, 3)
+
+    def grid_rgb(self, rows=slice(None), cols=slice(None)):
+        """Return a block of the grid as RGB pixels, first row at the bottom."""
+        return np.ascontiguousarray(self.palette[self.key_grid[rows, cols][::-1]])
+
+    def render_image(self, layout):
+        """Return the visible dies drawn as a bitmap laid out by ``image_view``."""
+        width, height = layout[1]
+        with span("render_image", self.timings, width=width, height=height):
+            return self._render_image(layout)
+
+    def _render_image(self, layout):
+        """Scale the visible block of the die grid to a bitmap."""
+        (rows, cols), (width, height) = layout
+        grid_rows, grid_cols = rows.stop - rows.start, cols.stop - cols.start
+        rgb = self.grid_rgb(rows, cols)
+        # The image shares the array's memory, so it is scaled while in scope
+        image = wx.ImageFromBuffer(grid_cols, grid_rows, rgb)
+        quality = wx.IMAGE_QUALITY_NORMAL
+        if width < grid_cols or height < grid_rows:
+            quality = wx.IMAGE_QUALITY_BOX_AVERAGE
+        return wx.Bitmap(image.Scale(width, height, quality))
+
+    def remember_image(self):
+        """Keep the rendered die grid image with the map in the session."""
+        if self.path is None or self.wmap is None:
+            return
+        width, height = self.image.GetSize()
+        self.session.set_extra(
+            self.path,
+            "image",
+            (self.image, self.image_layout, self.palette.copy()),
+            width * height * 4,
+        )
+
+    def restore_image(self):
+        """Reuse the session's image of the map if drawn with the same colors.
+
+        ``draw`` only keeps the image if the same dies are still visible at
+        the same zoom.
+        """
+        if self.path is None:
+            return
+        stored = self.session.get_extra(self.path, "image")
+        if stored is not None and np.array_equal(stored[2], self.palette):
+            self.image, self.image_layout = stored[:2]
+
+    def update_rows(self, start, stop):
+        """Redraw the dies of rows ``start`` to ``stop`` on the cached bitmaps.
+
+        Only the band of the image holding the visible part of those rows is
+        scaled and drawn, and only their visible rectangles are added to the
+        buffer.
+        """
+        if self.image is not None:
+            (rows, cols), (width, height) = self.image_layout
+            first, last = max(start, rows.start), min(stop, rows.stop)
+            count = rows.stop - rows.start
+            band_top = round((rows.stop - last) / max(count, 1) * height)
+            band_bottom = round((rows.stop - first) / max(count, 1) * height)
+            if last > first and band_bottom > band_top:
+                rgb = self.grid_rgb(slice(first, last), cols)
+                band = wx.ImageFromBuffer(cols.stop - cols.start, last - first, rgb)
+                band = band.Scale(
+                    width, band_bottom - band_top, wx.IMAGE_QUALITY_BOX_AVERAGE
+                )
+                dc = wx.MemoryDC(self.image)
+                dc.DrawBitmap(wx.Bitmap(band), 0, band_top)
+                dc.SelectObject(wx.NullBitmap)
+        if self.buffer is not None:
+            visible_rows, visible_cols = self.visible_slices()
+            visible_rows = slice(
+                max(visible_rows.start, start), max(min(visible_rows.stop, stop), start)
+            )
+            dc = wx.MemoryDC(self.buffer)
+            for key in self.key_counts:
+                self.draw_rects(dc, key, (visible_rows, visible_cols))
+            dc.SelectObject(wx.NullBitmap)
         self.Refresh()
-        self.Update()
-        dc = wx.PaintDC(self)
-        dc.SetTransformMatrix(self.transform)
+
+    def render_buffer(self):
+        """Return a bitmap of the dies visible with the current transform."""
+        with span("render_buffer", self.timings):
+            return self._render_buffer()
+
+    def _render_buffer(self):
+        """Draw the visible die rectangles to a bitmap."""
+        width, height = self.GetClientSize()
+        bitmap = wx.Bitmap(max(width, 1), max(height, 1))
+        dc = wx.MemoryDC(bitmap)
+        dc.SetBackground(wx.Brush(wx.Colour(constants.NULL_COLOR)))
         dc.Clear()
+        visible = self.visible_slices()
+        for key in self.key_counts:
+            self.draw_rects(dc, key, visible)
+        dc.SelectObject(wx.NullBitmap)
+        return bitmap
+
+    def draw_rects(self, dc, key, visible):
+        """Draw the die rectangles of one legend key inside the visible slices."""
+        try:
+            color = self.color_map[key]
+        except KeyError:
+            color = wx.Colour(constants.NULL_COLOR)
+
+        rows, cols = visible
+        indices = [index for index, name in enumerate(self.grid_keys) if name == key]
+        mask = np.isin(self.key_grid[rows, cols], indices)
         dc.SetPen(
             wx.Pen(wx.Colour(constants.NULL_COLOR), width=0, style=wx.PENSTYLE_SOLID)
         )
-        for key, rects in self.pixel_elements.items():
-            try:
-                color = self.color_map[key]
-            except KeyError:
-                color = wx.Colour(constants.NULL_COLOR)
+        dc.SetBrush(wx.Brush(color, style=wx.BRUSHSTYLE_SOLID))
+        dc.DrawRectangleList(self.die_rects(mask, rows.start, cols.start))
 
-            dc.SetBrush(wx.Brush(color, style=wx.BRUSHSTYLE_SOLID))
-            dc.DrawRectangleList(rects)
+    def view_state(self):
+        """Return the transform and panel size the rectangle buffer depends on."""
+        matrix, translation = self.transform.Get()
+        return (
+            matrix.m_11,
+            matrix.m_12,
+            matrix.m_21,
+            matrix.m_22,
+            translation.x,
+            translation.y,
+            tuple(self.GetClientSize()),
+        )
 
-        return dc
+    def visible_slices(self):
+        """Return ``(rows, cols)`` slices of the dies inside the viewport.
 
-    def generate_map(self, filename):
-        """Generate the wafermap bitmap objects."""
-        self.wmap = wafermap.WaferMap(filename)
-        self.pixel_elements = {}
+        The panel corners are mapped back to grid positions with the inverse
+        transform; since the dies sit on a regular grid the visible rows and
+        columns follow directly, with one die of margin on every side.
+        """
+        rows, cols = self.key_grid.shape
+        width, height = self.GetClientSize()
+        corners = [self.grid_position(0, 0), self.grid_position(width, height)]
+        row_pos = sorted(corner[0] for corner in corners)
+        col_pos = sorted(corner[1] for corner in corners)
+        first_row = max(int(np.floor(row_pos[0])) - 1, 0)
+        last_row = min(int(np.ceil(row_pos[1])) + 1, rows)
+        first_col = max(int(np.floor(col_pos[0])) - 1, 0)
+        last_col = min(int(np.ceil(col_pos[1])) + 1, cols)
+        return (
+            slice(first_row, max(last_row, first_row)),
+            slice(first_col, max(last_col, first_col)),
+        )
+
+    def grid_position(self, xloc, yloc):
+        """Return the fractional ``(row, col)`` of the die grid at a panel point.
+
+        The point is mapped through the inverse transform, scale and offsets;
+        row 0 is at the bottom of the map.
+        """
+        rows, cols = self.key_grid.shape
+        inverse = wx.AffineMatrix2D()
+        inverse.Set(*self.transform.Get())
+        inverse.Invert()
+        point = inverse.TransformPoint(wx.Point2DDouble(xloc, yloc))
+        return (
+            rows - (point.y - self.yoffset) / self.scale[1] * rows,
+            (point.x - self.xoffset) / self.scale[0] * cols,
+        )
+
+    def pick(self, xloc, yloc):
+        """Return the ``(row, col)`` of the die at a panel point, or None."""
+        if self.key_grid is None:
+            return None
+        row_pos, col_pos = self.grid_position(xloc, yloc)
+        row, col = int(np.floor(row_pos)), int(np.floor(col_pos))
+        rows, cols = self.key_grid.shape
+        if 0 <= row < rows and 0 <= col < cols:
+            return row, col
+        return None
+
+    def die_text(self, row, col):
+        """Return a one line description of a die."""
+        if self.wmap is not None:
+            info = self.wmap.die_info(row, col)
+            return (
+                f"Row {row}, Col {col}: bin {info['code']} ({info['desc']}), "
+                f"{info['result']}"
+            )
+        tested = int(self.stack.tested[row, col])
+        if not tested:
+            return f"Row {row}, Col {col}: not tested"
+        fails = int(self.stack.fails[row, col])
+        return f"Row {row}, Col {col}: {fails} of {tested} wafers failed"
+
+    def OnMotion(self, event):
+        """Show the die under the cursor, at most once per hover interval."""
+        self.hover_pos = event.GetPosition()
+        if self.hover_timer is None:
+            self.hover_timer = wx.CallLater(
+                constants.HOVER_INTERVAL_MS, self.show_hover
+            )
+        event.Skip()
+
+    def show_hover(self):
+        """Update the tooltip and status bar for the last cursor position."""
+        self.hover_timer = None
+        if not self:
+            return
+        die = self.pick(*self.hover_pos)
+        if die == self.hover_die:
+            return
+        self.hover_die = die
+        text = self.die_text(*die) if die is not None else ""
+        self.SetToolTip(text)
+        self.top.SetStatusText(text)
+
+    def OnLeftDown(self, event):
+        """Show the details of the clicked die in the status bar."""
+        die = self.pick(*event.GetPosition())
+        if die is not None:
+            self.top.SetStatusText(f"Selected {self.die_text(*die)}")
+        event.Skip()
+
+    def invalidate(self):
+        """Drop the cached map bitmaps after their data or colors change."""
+        self.buffer = None
+        self.image = None
+        self.image_layout = None
+        self.Refresh()
+
+    def snapshot(self):
+        """Return a bitmap of the map as currently shown in the viewer."""
+        width, height = self.GetClientSize()
+        bitmap = wx.Bitmap(max(width, 1), max(height, 1))
+        dc = wx.MemoryDC(bitmap)
+        self.draw(dc)
+        dc.SelectObject(wx.NullBitmap)
+        return bitmap
+
+    def clear_map(self):
+        """Drop the shown map so the viewer can show another one.
+
+        Work still running for the previous map is stopped and its results
+        ignored, its legend entries are removed and the view is reset to
+        fit the panel.
+        """
+        self.stop_follow()
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        if self.progress_dialog:
+            self.progress_dialog.Destroy()
+        for entry in self.legend_entries.values():
+            entry.Destroy()
+        self.legend_parent.Layout()
+        self.cancel_event = None
+        self.progress_dialog = None
+        self.legend_entries = {}
+        self.path = None
+        self.follow_path = None
+        self.follow_stop = None
+        self.wmap = None
+        self.stack = None
+        self.key_grid = None
+        self.key_counts = {}
         self.color_map = {}
-        prog_max = self.wmap.device_attr["rows"]
-        prog_incr = self.wmap.device_attr["cols"]
-        col_count = 0
-        row_count = 0
-        self.pass_count = 0
-        self.total_count = 0
-        dialog = wx.ProgressDialog(
+        self.grid_keys = []
+        self.palette = None
+        self.timings = {}
+        self.hover_die = None
+        self.transform = wx.AffineMatrix2D()
+        self.invalidate()
+
+    def generate_map(self, filename):
+        """Load a wafer map on a worker thread and show it once decoded.
+
+        The window stays responsive while the map loads. A progress dialog
+        follows the parse, decode and legend stages and its Cancel button
+        stops the worker. Maps still held by the session are shown at once.
+        """
+        self.clear_map()
+        self.path = filename
+        wmap = self.session.get(filename)
+        if wmap is not None:
+            legend = self.session.get_extra(filename, "legend")
+            if legend is None:
+                stats = wmap.stats()
+                legend = (stats, *legend_keys(wmap, stats))
+            self.progress_dialog = None
+            self.finish_loading((wmap, *legend))
+            return
+
+        self.start_worker(self.load_map, filename, "parse")
+
+    def start_worker(self, target, argument, stage):
+        """Run ``target(argument, cancel_event)`` on a worker thread.
+
+        A progress dialog opens at ``stage`` and its Cancel button sets the
+        worker's cancel event.
+        """
+        self.cancel_event = threading.Event()
+        self.progress_dialog = wx.ProgressDialog(
             "Generating Visualization",
-            "Time Remaining",
-            prog_max,
-            style=wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME,
+            constants.PROGRESS_MESSAGES[stage],
+            constants.PROGRESS_RANGE,
+            parent=self.top,
+            style=wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_AUTO_HIDE,
+        )
+        self.progress_value = -1
+        self.loader = threading.Thread(
+            target=target,
+            args=(argument, self.cancel_event),
+            daemon=True,
         )
-        for pixel in self.wmap.pixels:
-            loc = (
-                int(pixel[0][0] * self.scale[0] + self.xoffset),
-                int(pixel[0][1] * self.scale[1] + self.yoffset),
+        self.loader.start()
+
+    def progress_callback(self, cancel_event):
+        """Return a progress callback that forwards worker progress to the UI."""
+
+        def progress(stage, done, total):
+            start, stop = constants.PROGRESS_STAGES[stage]
+            value = start
+            if total:
+                value += (stop - start) * done // total
+            if value != self.progress_value or not total:
+                self.progress_value = value
+                wx.CallAfter(
+                    self.update_progress, cancel_event, stage, value, bool(total)
+                )
+            return not cancel_event.is_set()
+
+        return progress
+
+    def load_map(self, filename, cancel_event):
+        """Decode a map and count its legend keys; runs on the worker thread."""
+        progress = self.progress_callback(cancel_event)
+        try:
+            wmap = wafermap.WaferMap(filename, progress=progress)
+            stats = wmap.stats()
+            with span("legend_keys", wmap.timings):
+                key_counts, bin_colors = legend_keys(wmap, stats, progress)
+        except wafermap.LoadCancelled:
+            wx.CallAfter(self.load_done, cancel_event)
+        except Exception as err:  # pylint: disable=broad-except
+            wx.CallAfter(
+                self.load_done, cancel_event, error=f"{type(err).__name__}: {err}"
             )
-            size = (int(pixel[1][0] * self.scale[0]), int(pixel[1][1] * self.scale[1]))
-            color = wx.Colour(constants.NULL_COLOR)
-            if pixel[2]:
-                color = wx.Colour(constants.PASS_COLOR)
-                self.pass_count += 1
-                self.total_count += 1
-            elif not pixel[2] and pixel[2] is not None:
-                self.total_count += 1
-                try:
-                    color = wx.Colour(self.color_map[pixel[3]])
-                except KeyError:
-                    color = wx.Colour(constants.FAIL_COLOR)
-
-            self.color_map[pixel[3]] = color
-            rectangle = [loc[0], loc[1], size[0], size[1]]
+        else:
+            wx.CallAfter(
+                self.load_done, cancel_event, (wmap, stats, key_counts, bin_colors)
+            )
+
+    def load_done(self, cancel_event, result=None, error=None):
+        """Finish a load unless the viewer has moved on to another map."""
+        if self and cancel_event in (self.cancel_event, self.follow_stop):
+            self.finish_loading(result, error)
+
+    def update_progress(self, cancel_event, stage, value, known):
+        """Show worker progress, cancelling the load if the user aborts."""
+        if not self or not self.progress_dialog:
+            return
+        if cancel_event is not self.cancel_event:
+            return
+        message = constants.PROGRESS_MESSAGES[stage]
+        if known:
+            keep_going, _ = self.progress_dialog.Update(value, message)
+        else:
+            keep_going, _ = self.progress_dialog.Pulse(message)
+        if not keep_going:
+            self.cancel_event.set()
+
+    def finish_loading(self, result=None, error=None):
+        """Show a loaded map, or report why loading stopped."""
+        if self.progress_dialog:
+            self.progress_dialog.Destroy()
+        if not self:
+            # The viewer was closed while the map was loading
+            return
+        if error is not None:
+            wx.MessageDialog(
+                None,
+                error,
+                caption="Wafer map could not be loaded",
+                style=wx.OK | wx.ICON_ERROR,
+            ).ShowModal()
+        if result is None:
+            return
+
+        self.wmap, self.stats, self.key_counts, bin_colors = result
+        if self.path is not None:
+            if self.session.get(self.path) is not self.wmap:
+                self.session.put(self.path, self.wmap)
+            if self.session.get_extra(self.path, "legend") is None:
+                self.session.set_extra(
+                    self.path, "legend", (self.stats, self.key_counts, bin_colors), 0
+                )
+            bin_colors = self.session.get_extra(self.path, "colors") or bin_colors
+        self.timings = dict(self.wmap.timings)
+        self.key_grid = self.wmap.die_grid
+        self.grid_keys = [
+            self.wmap.bin_codes[code]["desc"] for code in self.wmap.bin_table
+        ]
+        self.color_map = {desc: wx.Colour(color) for desc, color in bin_colors.items()}
+        self.build_palette()
+        for key in ("total_die", "pass", "fail", "yield"):
+            self.wmap.device_attr[key] = self.stats[key]
+        self.update_data()
+        self.generate_legend()
+        self.invalidate()
+        self.restore_image()
+
+    def follow_map(self, filename):
+        """Show a map that is still being written, adding rows as they arrive.
+
+        A worker thread reads the map until its first rows are decoded and
+        hands it over. From then on the rows appended since the last check
+        are read on the UI thread, which draws from the same die grid, and
+        only those rows are redrawn, until the map is complete or the viewer
+        is replaced.
+        """
+        self.clear_map()
+        self.follow_path = filename
+        self.follow_stop = threading.Event()
+        threading.Thread(
+            target=self.follow_rows, args=(filename, self.follow_stop), daemon=True
+        ).start()
+
+    def follow_rows(self, filename, stop):
+        """Decode the first rows of a growing map; runs on the worker thread."""
+        try:
+            wmap = wafermap.WaferMap.growing(filename)
+            while wmap.die_grid is None and not stop.is_set():
+                stop.wait(constants.FOLLOW_INTERVAL)
+                wmap.refresh()
+        except Exception as err:  # pylint: disable=broad-except
+            wx.CallAfter(self.load_done, stop, error=f"{type(err).__name__}: {err}")
+        else:
+            # The worker no longer touches the map once it is handed over
+            wx.CallAfter(self.refresh_rows, wmap, stop, (0, wmap.rows_read))
+
+    def refresh_rows(self, wmap, stop, rows=None):
+        """Show the rows appended to a growing map and check again later.
 
+        ``rows`` is the ``(start, stop)`` range already decoded, else the map
+        is refreshed here so its die grid never changes while it is drawn.
+        """
+        if not self or stop.is_set():
+            return
+        if rows is None:
             try:
-                self.pixel_elements[pixel[3]].append(rectangle)
-            except KeyError:
-                self.pixel_elements[pixel[3]] = [rectangle]
-            col_count += 1
-            if col_count > prog_incr:
-                col_count = 0
-                row_count += 1
-                dialog.Update(row_count)
-
-        dialog.Destroy()
-        self.wmap.device_attr["total_die"] = self.total_count
-        self.wmap.device_attr["pass"] = self.pass_count
-        self.wmap.device_attr["fail"] = self.total_count - self.pass_count
-        self.wmap.device_attr["yield"] = round(
-            self.pass_count / self.total_count * 100.0, 2
-        )
+                rows = wmap.refresh()
+            except Exception as err:  # pylint: disable=broad-except
+                self.finish_loading(error=f"{type(err).__name__}: {err}")
+                return
+        if rows[1] > rows[0] or wmap.complete or self.wmap is not wmap:
+            self.rows_added(wmap, *rows)
+        if not wmap.complete:
+            wx.CallLater(
+                round(constants.FOLLOW_INTERVAL * 1000), self.refresh_rows, wmap, stop
+            )
+
+    def rows_added(self, wmap, start, stop):
+        """Show newly decoded rows of a growing map and update its counts."""
+        if not self:
+            return
+        if self.follow_stop is None or self.follow_stop.is_set():
+            return
+        stats = wmap.stats()
+        key_counts, bin_colors = legend_keys(wmap, stats, include_empty=True)
+        for key in ("total_die", "pass", "fail", "yield"):
+            wmap.device_attr[key] = stats[key]
+        if self.wmap is not wmap:
+            # First rows: set up the legend and colors for every bin
+            self.progress_dialog = None
+            self.finish_loading((wmap, stats, key_counts, bin_colors))
+            return
+        self.stats = stats
+        self.key_counts = key_counts
+        for key, count in key_counts.items():
+            self.legend_entries[key].set_count(count)
         self.update_data()
+        if wmap.complete:
+            self.top.SetStatusText(f"{self.follow_path} complete")
+        self.update_rows(start, stop)
+
+    def stop_follow(self):
+        """Stop reading new rows of a growing map."""
+        if self.follow_stop is not None:
+            self.follow_stop.set()
+
+    def stack_maps(self, file_names):
+        """Stack wafer maps on a worker thread and show the heat map.
+
+        As with ``generate_map`` the window stays responsive and the
+        progress dialog can cancel the worker.
+        """
+        self.clear_map()
+        self.start_worker(self.load_stack, file_names, "stack")
+
+    def load_stack(self, file_names, cancel_event):
+        """Stack maps in worker processes; runs on the worker thread."""
+        progress = self.progress_callback(cancel_event)
+        try:
+            result = stack_files(file_names, workers=None, progress=progress)
+        except wafermap.LoadCancelled:
+            wx.CallAfter(self.stack_done, cancel_event)
+        except Exception as err:  # pylint: disable=broad-except
+            wx.CallAfter(
+                self.stack_done, cancel_event, error=f"{type(err).__name__}: {err}"
+            )
+        else:
+            wx.CallAfter(self.stack_done, cancel_event, result)
+
+    def stack_done(self, cancel_event, result=None, error=None):
+        """Show a stacked lot and the wafers left out of it."""
+        if not self or cancel_event is not self.cancel_event:
+            return
+        if result is None:
+            self.finish_loading(error=error)
+            return
+        if self.progress_dialog:
+            self.progress_dialog.Destroy()
+        self.progress_dialog = None
+        stack, rejected = result
+        if rejected:
+            wx.MessageDialog(
+                None,
+                "\n".join(f"{os.path.basename(path)}: {err}" for path, err in rejected),
+                caption="Some wafers were not stacked",
+                style=wx.OK | wx.ICON_WARNING,
+            ).ShowModal()
+        if stack.wafer_count:
+            self.generate_stack_map(stack)
+
+    def generate_stack_map(self, stack):
+        """Generate a fail count heat map of a stacked lot."""
+        self.clear_map()
+        self.stack = stack
+        tested = stack.tested > 0
+        self.key_grid = np.zeros(tested.shape, dtype=np.uint8)
+        fails = stack.fails.astype(np.int64)
+        edges = np.unique(
+            np.linspace(0, stack.wafer_count + 1, constants.HEAT_LEVELS + 1).astype(int)
+        )
+        low = np.array(hex_to_rgb(constants.PASS_COLOR))
+        high = np.array(hex_to_rgb(constants.FAIL_COLOR))
+        for level, (start, stop) in enumerate(zip(edges[:-1], edges[1:])):
+            mask = tested & (fails >= start) & (fails < stop)
+            if not mask.any():
+                continue
+            key = f"{start} fails" if stop - start == 1 else f"{start}-{stop - 1} fails"
+            weight = level / max(len(edges) - 2, 1)
+            red, green, blue = (low + (high - low) * weight).astype(int).tolist()
+            self.color_map[key] = wx.Colour(red, green, blue)
+            self.key_counts[key] = int(np.count_nonzero(mask))
+            self.key_grid[mask] = len(self.grid_keys)
+            self.grid_keys.append(key)
+
+        if not tested.all():
+            self.color_map[constants.NULL] = wx.Colour(constants.NULL_COLOR)
+            self.key_counts[constants.NULL] = int(np.count_nonzero(~tested))
+            self.key_grid[~tested] = len(self.grid_keys)
+            self.grid_keys.append(constants.NULL)
+
+        self.build_palette()
+        total_count = int(stack.tested.sum())
+        fail_count = int(stack.fails.sum())
+        pass_count = total_count - fail_count
+        device_attr = {key: "" for key in self.grid.row_map}
+        device_attr.update(stack.device_attr)
+        device_attr.update(
+            {
+                constants.WAFER_ID: f"{stack.wafer_count} wafers stacked",
+                "total_die": total_count,
+                "pass": pass_count,
+                "fail": fail_count,
+                "yield": round(pass_count / max(total_count, 1) * 100.0, 2),
+            }
+        )
+        self.update_data(device_attr)
         self.generate_legend()
+        self.invalidate()
+
+    def die_rects(self, mask, first_row=0, first_col=0):
+        """Return the panel rectangles of the dies selected by a mask.
+
+        ``mask`` may cover a block of the die grid starting at ``first_row``
+        and ``first_col``. The rectangles already include the view
+        transform, so they are drawn on a device context without one.
+        """
+        row_idx, col_idx = np.nonzero(mask)
+        return die_rects(
+            row_idx + first_row,
+            col_idx + first_col,
+            self.key_grid.shape,
+            (self.xoffset, self.yoffset, *self.scale),
+            self.view_state()[:6],
+        )
 
     def update_pixels(self, key, new_color):
-        """Update pixels in viewer."""
-        self.color_map[key] = wx.Colour(new_color)
+        """Recolor the dies of one legend key.
+
+        Only the key's palette entries change: the die grid image is
+        recolored from the palette and the key's rectangles are redrawn on
+        the cached buffer.
+        """
+        color = wx.Colour(new_color)
+        self.color_map[key] = color
+        if self.palette is not None:
+            indices = [
+                index for index, name in enumerate(self.grid_keys) if name == key
+            ]
+            self.palette[indices] = color.Get(False)
+        self.image = None
+        self.restore_image()
+        if self.buffer is not None and key in self.key_counts:
+            dc = wx.MemoryDC(self.buffer)
+            self.draw_rects(dc, key, self.visible_slices())
+            dc.SelectObject(wx.NullBitmap)
         self.Refresh()
-        self.Update()
 
-    def update_data(self):
+    def remember_color(self, key, color):
+        """Keep a legend color chosen for the map in the session."""
+        if self.path is None:
+            return
+        legend = self.session.get_extra(self.path, "legend")
+        if legend is None:
+            return
+        colors = dict(self.session.get_extra(self.path, "colors") or legend[2])
+        colors[key] = wx.Colour(color).GetAsString(wx.C2S_HTML_SYNTAX)
+        self.session.set_extra(self.path, "colors", colors, 0)
+
+    def update_data(self, device_attr=None):
         """Update data based on wafermap."""
+        if device_attr is None:
+            device_attr = self.wmap.device_attr
         for row, loc in self.grid.row_map.items():
-            value = self.wmap.device_attr[row]
-            if row == constants.CHIP_SIZE:
+            value = device_attr[row]
+            if row == constants.CHIP_SIZE and value:
                 value = f"{value[0]}, {value[1]}"
             elif row == "yield":
                 value = f"{value} %"
@@ -127,18 +799,22 @@ class Viewer(wx.Panel):
 
     def generate_legend(self):
         """Generate the color legend based on the wafer map."""
+        with span("legend", self.timings):
+            self._generate_legend()
+
+    def _generate_legend(self):
+        """Add a legend entry for every key of the color map."""
+        self.legend_entries = {}
         for legend_key, color in self.color_map.items():
-            self.legend_sizer.Add(
-                LegendEntry(
-                    self,
-                    self.pixel_elements[legend_key],
-                    self.legend_parent,
-                    legend_key,
-                    color,
-                ),
-                1,
-                wx.EXPAND | wx.ALIGN_TOP,
+            entry = LegendEntry(
+                self,
+                self.key_counts[legend_key],
+                self.legend_parent,
+                legend_key,
+                color,
             )
+            self.legend_entries[legend_key] = entry
+            self.legend_sizer.Add(entry, 1, wx.EXPAND | wx.ALIGN_TOP)
 
         self.top.legend_panel.SetSizer(self.legend_sizer)
         self.top.legend_panel.SetupScrolling()
@@ -174,12 +850,13 @@ class DataGrid(wx.grid.Grid):
 class LegendEntry(wx.Panel):
     """Legend entry."""
 
-    def __init__(self, viewer, pixels, parent, text, color):
+    def __init__(self, viewer, count, parent, text, color):
         """Initialize the wafer map legend."""
         wx.Panel.__init__(self, parent)
         self.viewer = viewer
-        self.pixels = pixels
-        self.text = f"{text} ({len(pixels)})"
+        self.count = count
+        self.key = text
+        self.text = f"{text} ({count})"
         if text == "NULL":
             self.text = text
         self.color = color
@@ -212,6 +889,13 @@ class LegendEntry(wx.Panel):
         self.Bind(wx.EVT_COLOURPICKER_CHANGED, self.update_color)
         self.sizer.Add(self.color_panel, 1, wx.EXPAND | wx.ALL)
 
+    def set_count(self, count):
+        """Show a new die count for the entry."""
+        self.count = count
+        if self.key != "NULL":
+            self.text = f"{self.key} ({count})"
+            self.check_box.SetLabel(self.text)
+
     def toggle_highlight(self, event):
         """Re-draw the bitmaps when checkbox is toggled."""
         if self.check_box.GetValue():
@@ -219,10 +903,38 @@ class LegendEntry(wx.Panel):
         else:
             color = constants.NULL_COLOR
 
-        self.viewer.update_pixels(self.text, color)
+        self.viewer.update_pixels(self.key, color)
 
     def update_color(self, event):
         """Re-draw the bitmaps when the color is changed."""
         color = wx.Colour(self.color_box.GetColour())
         self.color = color
-        self.viewer.update_pixels(self.text, color)
+        self.viewer.remember_color(self.key, color)
+        self.viewer.update_pixels(self.key, color)
+
+
+def legend_keys(wmap, stats, progress=None, include_empty=False):
+    """Return the die count and color of every bin description in a map.
+
+    Bins sharing a description share one legend key; passing bins are
+    drawn in the pass color, failing bins in the fail color and null bins
+    in the null color. Bins without dies are left out unless
+    ``include_empty`` is set.
+    """
+    key_counts = {}
+    bin_colors = {}
+    for index, code in enumerate(wmap.bin_table):
+        if progress is not None:
+            progress("legend", index + 1, len(wmap.bin_table))
+        if not stats["bins"][code] and not include_empty:
+            continue
+        status = wmap.bin_codes[code]["status"]
+        desc = wmap.bin_codes[code]["desc"]
+        color = constants.NULL_COLOR
+        if status:
+            color = constants.PASS_COLOR
+        elif status is not None:
+            color = bin_colors.get(desc, constants.FAIL_COLOR)
+        bin_colors[desc] = color
+        key_counts[desc] = key_counts.get(desc, 0) + stats["bins"][code]
+    return key_counts, bin_colors
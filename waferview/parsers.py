@@ -0,0 +1,295 @@
+"""Parser backends and the format decoders that read wafer map files.
+
+Every decoder is fed raw chunks of a map file and builds the same
+``map_data`` layout, mirroring the attribute naming ``xmltodict`` produced,
+so ``WaferMap`` turns every format into the same compact die grid. New
+formats are added with ``register_format``.
+"""
+
+import functools
+import os
+import re
+import xml.etree.ElementTree as ET
+from waferview.constants import (
+    BIN_TYPE_INT2,
+    FAIL,
+    PASS,
+    XML_BACKEND_ENV,
+    XML_BACKENDS,
+)
+
+_formats = []
+
+
+def register_format(reader_class):
+    """Register a format decoder class, usable as a class decorator.
+
+    The class is built with the name of an XML backend, reports whether a
+    file is in its format from the first bytes with ``detect(head)`` and
+    provides ``feed``, ``close``, ``map_data``, ``rows``, ``in_data``,
+    ``complete`` and ``backend``.
+    """
+    _formats.append(reader_class)
+    return reader_class
+
+
+def reader_for(head, backend=None):
+    """Return a new decoder for the format of a file starting with ``head``.
+
+    Files no decoder recognizes are read as G85 XML, so they fail with the
+    XML parser's error.
+    """
+    if isinstance(head, str):
+        head = head.encode("utf-8", errors="replace")
+    head = bytes(head[:1024])
+    for reader_class in _formats:
+        if reader_class.detect(head):
+            return reader_class(backend)
+    return G85Reader(backend)
+
+
+@functools.cache
+def available_backends():
+    """Return the names of the XML backends that can be imported."""
+    names = []
+    for name in XML_BACKENDS:
+        if name == "lxml":
+            try:
+                import lxml.etree  # noqa: F401 pylint: disable=import-outside-toplevel,unused-import
+            except ImportError:
+                continue
+        names.append(name)
+    return names
+
+
+def xml_backend(name=None):
+    """Return the XML backend to use.
+
+    This is ``name`` if given, else the ``WAFERVIEW_XML_BACKEND``
+    environment variable if set, else the fastest installed backend.
+    Raises ValueError for a backend that is not available.
+    """
+    if name is None:
+        name = os.environ.get(XML_BACKEND_ENV) or available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(
+            f"XML backend {name!r} is not available, "
+            f"use one of {', '.join(available_backends())}"
+        )
+    return name
+
+
+def pull_parser(backend):
+    """Return an incremental ``start``/``end`` event parser of a backend."""
+    if backend == "lxml":
+        return _LxmlPullParser()
+    return ET.XMLPullParser(events=("start", "end"))
+
+
+class _LxmlPullParser:
+    """An lxml pull parser with the interface of ``ET.XMLPullParser``.
+
+    ``huge_tree`` lifts lxml's limits on text size and tree depth, which the
+    row data of the largest maps exceeds. Syntax errors are raised as
+    ``ET.ParseError`` so both backends fail the same way.
+    """
+
+    def __init__(self):
+        """Initialize the parser."""
+        from lxml import etree  # pylint: disable=import-outside-toplevel
+
+        self.errors = etree.XMLSyntaxError
+        self.parser = etree.XMLPullParser(events=("start", "end"), huge_tree=True)
+
+    def feed(self, chunk):
+        """Feed raw XML data."""
+        if isinstance(chunk, memoryview):
+            chunk = chunk.tobytes()
+        try:
+            self.parser.feed(chunk)
+        except self.errors as err:
+            raise ET.ParseError(str(err)) from err
+
+    def close(self):
+        """Finish parsing once all data has been fed."""
+        try:
+            self.parser.close()
+        except self.errors as err:
+            raise ET.ParseError(str(err)) from err
+
+    def read_events(self):
+        """Return the events parsed so far."""
+        return self.parser.read_events()
+
+
+@register_format
+class G85Reader:
+    """Build wafer map data from the XML events of a SEMI G85 map."""
+
+    def __init__(self, backend=None):
+        """Initialize an empty reader on an XML backend."""
+        self.backend = xml_backend(backend)
+        self.parser = pull_parser(self.backend)
+        self.device = {"Bin": []}
+        self.map_data = {"Device": self.device}
+        self.rows = []
+        self.in_data = False
+        self.complete = False
+        self._data = None
+
+    @staticmethod
+    def detect(head):
+        """Return True if the file starts like an XML document."""
+        return head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<")
+
+    def feed(self, chunk):
+        """Feed raw XML data and consume every completed event."""
+        self.parser.feed(chunk)
+        self.read_events()
+
+    def close(self):
+        """Finish parsing once all data has been fed."""
+        self.parser.close()
+        self.read_events()
+
+    def read_events(self):
+        """Move parsed elements into the map data."""
+        for event, elem in self.parser.read_events():
+            # Strip namespace from XML file
+            _, _, tag = elem.tag.rpartition("}")
+            if event == "start":
+                if tag == "Map":
+                    self.map_data.update(_attributes(elem))
+                elif tag == "Device":
+                    self.device.update(_attributes(elem))
+                elif tag == "Data":
+                    self.in_data = True
+                    self._data = elem
+                    self.device["Data"] = _attributes(elem)
+                    self.device["Data"]["Row"] = self.rows
+                continue
+            if tag == "Bin":
+                self.device["Bin"].append(_attributes(elem))
+            elif tag == "Row":
+                self.rows.append(elem.text or "")
+                # Drop the finished row from its parent to keep memory flat
+                self._data.remove(elem)
+            elif tag == "Map":
+                self.complete = True
+            elif tag not in ("Data", "Device"):
+                continue
+            elem.clear()
+
+
+@register_format
+class SinfReader:
+    """Build wafer map data from an ASCII row map in the SINF layout.
+
+    The header is a list of ``KEY:value`` lines and every row of dies is a
+    ``RowData:`` line of two character hexadecimal bin codes, either
+    separated by spaces or run together. ``__`` and ``@@`` mark positions
+    without a tested die. Bins listed in ``BCEQU`` pass and all others fail.
+
+    Rows are stored as Integer2 codes with ``FFFF`` as the null bin so the
+    null positions can never clash with a real bin code.
+    """
+
+    FORMAT = "SINF"
+    NULL_BIN = "FFFF"
+    NULL_CODES = frozenset(["__", "@@"])
+    HEADER = re.compile(
+        rb"\A\s*(?:DEVICE|LOT|WAFER|FNLOC|ROWCT|COLCT|BCEQU|REFP[XY]|DUTMS"
+        rb"|[XY]DIES|RowData)\s*:",
+        re.IGNORECASE,
+    )
+
+    def __init__(self, backend=None):  # pylint: disable=unused-argument
+        """Initialize an empty reader; the XML backend is not used."""
+        self.backend = "text"
+        self.header = {}
+        self.codes = set()
+        self.rows = []
+        self.map_data = {}
+        # Bins are only known once every row is read
+        self.in_data = False
+        self.complete = False
+        self._pending = b""
+
+    @classmethod
+    def detect(cls, head):
+        """Return True if the file starts with a SINF header line."""
+        return cls.HEADER.match(head) is not None
+
+    def feed(self, chunk):
+        """Feed raw text and read every complete line."""
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        lines = (self._pending + bytes(chunk)).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self.read_line(line)
+
+    def close(self):
+        """Read the last line and build the map data."""
+        self.read_line(self._pending)
+        self._pending = b""
+        self.build()
+        self.in_data = True
+        self.complete = True
+
+    def read_line(self, line):
+        """Add one header or row line."""
+        key, sep, value = line.decode("ascii", errors="replace").partition(":")
+        key = key.strip().upper()
+        if not sep:
+            return
+        if key != "ROWDATA":
+            self.header[key] = value.strip()
+            return
+        codes = value.upper().split()
+        if len(codes) == 1 and len(codes[0]) > 2:
+            codes = [codes[0][pos : pos + 2] for pos in range(0, len(codes[0]), 2)]
+        self.codes.update(codes)
+        self.rows.append(
+            "".join(
+                self.NULL_BIN if code in self.NULL_CODES else code.rjust(4, "0")
+                for code in codes
+            )
+        )
+
+    def build(self):
+        """Fill ``map_data`` from the header and the codes seen in the rows."""
+        header = self.header
+        pass_codes = {code.zfill(2) for code in header.get("BCEQU", "").upper().split()}
+        scale = {"MM": 1000.0, "UM": 1.0}.get(header.get("DUTMS", "").upper())
+        cols = max((len(row) // 4 for row in self.rows), default=1)
+        device = {
+            "@BinType": BIN_TYPE_INT2,
+            "@NullBin": self.NULL_BIN,
+            "@LotId": header.get("LOT"),
+            "@ProductId": header.get("DEVICE"),
+            "@Rows": header.get("ROWCT") or len(self.rows) or 1,
+            "@Columns": header.get("COLCT") or cols,
+            "Bin": [
+                {
+                    "@BinCode": code,
+                    "@BinQuality": PASS if code in pass_codes else FAIL,
+                    "@BinCount": None,
+                }
+                for code in sorted(self.codes - self.NULL_CODES)
+            ],
+            "Data": {"Row": self.rows},
+        }
+        if scale is not None and "XDIES" in header and "YDIES" in header:
+            device["@DeviceSizeX"] = float(header["XDIES"]) * scale
+            device["@DeviceSizeY"] = float(header["YDIES"]) * scale
+        self.map_data = {
+            "@FormatRevision": self.FORMAT,
+            "@WaferId": header.get("WAFER"),
+            "Device": device,
+        }
+
+
+def _attributes(elem):
+    """Return element attributes keyed the way xmltodict names them."""
+    return {f"@{key}": value for key, value in elem.attrib.items()}
@@ -0,0 +1,189 @@
+"""Headless rendering of wafer maps to PNG images."""
+
+import os
+import struct
+import sys
+import zlib
+import numpy as np
+from waferview import wafermap
+from waferview.batch import find_maps
+from waferview.constants import NULL_COLOR, PASS_COLOR, FAIL_COLOR
+
+
+def hex_to_rgb(color):
+    """Return an ``(r, g, b)`` tuple for a ``#RRGGBB`` color string."""
+    color = color.lstrip("#")
+    return tuple(int(color[pos : pos + 2], 16) for pos in (0, 2, 4))
+
+
+def palette(wmap, colors=None):
+    """Return an ``n_bins x 3`` array with the color of each bin.
+
+    Pass, fail and null bins get the default GUI colors. ``colors`` may
+    override them per bin code or bin description with ``#RRGGBB`` strings.
+    """
+    colors = colors or {}
+    table = np.empty((len(wmap.bin_table), 3), dtype=np.uint8)
+    for index, code in enumerate(wmap.bin_table):
+        bin_data = wmap.bin_codes[code]
+        color = NULL_COLOR
+        if bin_data["status"]:
+            color = PASS_COLOR
+        elif bin_data["status"] is not None:
+            color = FAIL_COLOR
+        color = colors.get(code, colors.get(bin_data["desc"], color))
+        table[index] = hex_to_rgb(color)
+    return table
+
+
+def render_rgb(wmap, colors=None, die_size=1):
+    """Return the wafer map as a ``height x width x 3`` RGB array.
+
+    Every die is drawn as a block of ``die_size`` pixels, which may be an
+    integer or a ``(width, height)`` pair. As in the viewer, the first row
+    of the map is drawn at the bottom.
+    """
+    if isinstance(die_size, int):
+        die_size = (die_size, die_size)
+    rgb = palette(wmap, colors)[wmap.die_grid[::-1]]
+    if die_size != (1, 1):
+        rgb = np.repeat(np.repeat(rgb, die_size[1], axis=0), die_size[0], axis=1)
+    return rgb
+
+
+def die_rects(row_idx, col_idx, shape, bounds, matrix=(1, 0, 0, 1, 0, 0)):
+    """Return the ``[x, y, width, height]`` device rectangles of dies.
+
+    ``shape`` is the die grid's ``(rows, cols)`` and ``bounds`` the
+    ``(left, top, width, height)`` of the whole map before the view
+    transform, given as the ``(m11, m12, m21, m22, dx, dy)`` of an axis
+    aligned matrix. Die edges are placed in device space with float math
+    and rounded one by one, so neighboring dies meet without gaps at any
+    zoom and every die is at least one pixel wide and high. As in the
+    viewer, the first row of the map is at the bottom.
+    """
+    rows, cols = shape
+    left, top, width, height = bounds
+    x_scale, _, _, y_scale, x_shift, y_shift = matrix
+
+    def x_edge(col):
+        return np.rint((col / cols * width + left) * x_scale + x_shift).astype(int)
+
+    def y_edge(row):
+        return np.rint(((1 - row / rows) * height + top) * y_scale + y_shift).astype(
+            int
+        )
+
+    xloc = x_edge(col_idx)
+    yloc = y_edge(row_idx + 1)
+    return np.column_stack(
+        [
+            xloc,
+            yloc,
+            np.maximum(x_edge(col_idx + 1) - xloc, 1),
+            np.maximum(y_edge(row_idx) - yloc, 1),
+        ]
+    ).tolist()
+
+
+def write_png(png_file, rgb, compression=6):
+    """Write an RGB array to a PNG file path or binary file object."""
+    height, width, _ = rgb.shape
+    # Every scanline starts with a zero byte to select no filtering
+    scanlines = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgb.reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    data = b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", header),
+            _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression)),
+            _png_chunk(b"IEND", b""),
+        ]
+    )
+    if isinstance(png_file, (str, os.PathLike)):
+        with open(png_file, "wb") as out_file:
+            out_file.write(data)
+    else:
+        png_file.write(data)
+
+
+def render_file(xmlfile, png_file, colors=None, die_size=1, cache=True):
+    """Render a single map file to a PNG file."""
+    wmap = wafermap.WaferMap(xmlfile, cache=cache)
+    write_png(png_file, render_rgb(wmap, colors, die_size))
+    return png_file
+
+
+def output_names(paths):
+    """Return a distinct output file stem for every map path.
+
+    Stems are the file names without extension; maps with the same name in
+    different directories get ``_1``, ``_2`` and so on added in order, so
+    their images never overwrite each other.
+    """
+    names = {}
+    used = set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = stem
+        count = 0
+        while name.casefold() in used:
+            count += 1
+            name = f"{stem}_{count}"
+        used.add(name.casefold())
+        names[path] = name
+    return names
+
+
+def main(argv=None):
+    """Render map files to PNG images from the command line."""
+    import argparse  # pylint: disable=import-outside-toplevel
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog="waferview-render", description="Render wafer maps to PNG images."
+    )
+    parser.add_argument("paths", nargs="+", help="map files or directories")
+    parser.add_argument(
+        "-o", "--output-dir", default=".", help="directory for the images"
+    )
+    parser.add_argument(
+        "-s", "--die-size", type=int, default=1, help="pixels per die side"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="worker processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="do not use the decoded map cache"
+    )
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {}
+        for path, name in output_names(find_maps(args.paths)).items():
+            png_file = os.path.join(args.output_dir, f"{name}.png")
+            future = executor.submit(
+                render_file, path, png_file, None, args.die_size, not args.no_cache
+            )
+            futures[future] = path
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                print(future.result())
+            except Exception as err:  # pylint: disable=broad-except
+                failed += 1
+                error = f"{type(err).__name__}: {err}"
+                print(f"{futures[future]}: {error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _png_chunk(chunk_type, data):
+    """Return a PNG chunk with its length and CRC."""
+    crc = zlib.crc32(data, zlib.crc32(chunk_type))
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Wafer maps kept open together in a viewing session."""
+
+import collections
+import os
+import threading
+from waferview import wafermap
+from waferview.constants import SESSION_SIZE, SESSION_SIZE_ENV
+
+
+class MapSession:
+    """Open wafer maps with a memory bounded cache of their decoded data.
+
+    Every opened path stays listed in ``paths`` until it is closed, but only
+    the most recently used decoded maps, and the bitmaps or other objects
+    rendered from them, are kept in memory. Once their estimated size passes
+    ``max_bytes`` the least recently used maps are dropped and are decoded
+    again (usually from the on-disk map cache) when shown next. The most
+    recently used map is always kept, however large.
+
+    Entries may be read and stored from several threads.
+    """
+
+    def __init__(self, max_bytes=None, loader=wafermap.WaferMap):
+        """Initialize an empty session.
+
+        ``loader`` is called with a path and any keyword arguments given to
+        ``load`` and returns the decoded map.
+        """
+        if max_bytes is None:
+            max_bytes = default_session_size()
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.paths = []
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        """Return the number of open maps."""
+        return len(self.paths)
+
+    def __contains__(self, path):
+        """Return True if a map is open in the session."""
+        return os.path.abspath(path) in self.paths
+
+    def open(self, path):
+        """Add a map to the session and return its index in ``paths``."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if path not in self.paths:
+                self.paths.append(path)
+            return self.paths.index(path)
+
+    def close(self, path):
+        """Remove a map from the session and free its cached data."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self.paths:
+                self.paths.remove(path)
+            self._entries.pop(path, None)
+
+    def get(self, path):
+        """Return the cached map of a path, or None if it is not in memory."""
+        entry = self._entry(path)
+        return None if entry is None else entry.wmap
+
+    def load(self, path, **kwargs):
+        """Return the map of a path, decoding and caching it if needed."""
+        wmap = self.get(path)
+        if wmap is None:
+            wmap = self.loader(path, **kwargs)
+            self.put(path, wmap)
+        return wmap
+
+    def put(self, path, wmap):
+        """Cache a decoded map, replacing any older data for the path."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if path not in self.paths:
+                self.paths.append(path)
+            self._entries[path] = _Entry(wmap)
+            self._entries.move_to_end(path)
+            self.evict()
+
+    def get_extra(self, path, name):
+        """Return an object stored with a cached map, or None."""
+        entry = self._entry(path)
+        if entry is None or name not in entry.extras:
+            return None
+        return entry.extras[name][0]
+
+    def set_extra(self, path, name, value, nbytes):
+        """Store an object such as a rendered bitmap with a cached map.
+
+        ``nbytes`` is its approximate size, counted against ``max_bytes``.
+        Nothing is stored if the map itself is no longer cached.
+        """
+        entry = self._entry(path)
+        if entry is None:
+            return
+        with self._lock:
+            entry.extras[name] = (value, nbytes)
+            self.evict()
+
+    @property
+    def nbytes(self):
+        """Return the estimated memory held by the cached maps."""
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def cached(self):
+        """Return the paths of the maps in memory, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def evict(self):
+        """Drop least recently used maps until under the memory limit."""
+        with self._lock:
+            total = self.nbytes
+            while total > self.max_bytes and len(self._entries) > 1:
+                _, entry = self._entries.popitem(last=False)
+                total -= entry.nbytes
+
+    def _entry(self, path):
+        """Return the cache entry of a path and mark it recently used."""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+            return entry
+
+
+class _Entry:
+    """A cached map and the objects rendered from it."""
+
+    def __init__(self, wmap):
+        """Initialize the entry of a decoded map."""
+        self.wmap = wmap
+        self.map_bytes = map_nbytes(wmap)
+        self.extras = {}
+
+    @property
+    def nbytes(self):
+        """Return the estimated size of the map and its extras."""
+        return self.map_bytes + sum(nbytes for _, nbytes in self.extras.values())
+
+
+def map_nbytes(wmap):
+    """Return the approximate memory held by a decoded wafer map.
+
+    This counts the die grid and, until they are decoded, the text of the
+    rows.
+    """
+    nbytes = 0
+    if wmap._die_grid is not None:
+        nbytes += wmap._die_grid.nbytes
+    map_data = getattr(wmap, "_map_data", None)
+    if map_data:
+        rows = map_data.get("Device", {}).get("Data", {}).get("Row") or []
+        nbytes += sum(len(row) for row in rows)
+    return nbytes
+
+
+def default_session_size():
+    """Return the session memory limit, from the environment if set."""
+    size = os.environ.get(SESSION_SIZE_ENV)
+    if size:
+        return int(float(size) * 1024 * 1024)
+    return SESSION_SIZE
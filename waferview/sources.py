@@ -0,0 +1,191 @@
+"""Readers for the different inputs a wafer map can be loaded from."""
+
+import contextlib
+import io
+import mmap
+import os
+from waferview.constants import MMAP_THRESHOLD
+
+GZIP_MAGIC = b"\x1f\x8b"
+BZIP2_MAGIC = b"BZh"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+MAGIC_SIZE = 6
+
+# File name suffixes of the compressed formats read transparently
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+
+class BufferReader:
+    """File-like reader over a bytes-like buffer that avoids copies.
+
+    ``read`` returns memoryview slices of the buffer, which the XML parser
+    consumes directly, so neither in-memory bytes nor memory-mapped files
+    are copied into intermediate buffers.
+    """
+
+    def __init__(self, buffer):
+        """Initialize the reader at the start of ``buffer``."""
+        self.buffer = buffer
+        self.view = memoryview(buffer).cast("B")
+        self.pos = 0
+
+    def close(self):
+        """Release the buffer and close it if it is a memory map.
+
+        A map with chunks still referenced elsewhere cannot be closed yet
+        and is left for garbage collection.
+        """
+        self.view.release()
+        if isinstance(self.buffer, mmap.mmap):
+            try:
+                self.buffer.close()
+            except BufferError:
+                pass
+
+    def read(self, size=-1):
+        """Return up to ``size`` bytes, or everything left if negative."""
+        start = self.pos
+        if size is None or size < 0:
+            self.pos = len(self.view)
+        else:
+            self.pos = min(start + size, len(self.view))
+        return self.view[start : self.pos]
+
+    def tell(self):
+        """Return the current position."""
+        return self.pos
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        """Move to a new position."""
+        if whence == io.SEEK_CUR:
+            pos += self.pos
+        elif whence == io.SEEK_END:
+            pos += len(self.view)
+        self.pos = max(0, min(pos, len(self.view)))
+        return self.pos
+
+
+class _PrefixedReader:
+    """Reader that replays bytes already taken from a stream."""
+
+    def __init__(self, prefix, stream):
+        """Initialize the reader with the bytes read ahead of ``stream``."""
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        """Return up to ``size`` bytes."""
+        if not self.prefix:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data = self.prefix + self.stream.read()
+            self.prefix = self.prefix[:0]
+            return data
+        data = self.prefix[:size]
+        self.prefix = self.prefix[size:]
+        return data
+
+
+@contextlib.contextmanager
+def open_source(source):
+    """Open any supported map source as a binary (or text) reader.
+
+    ``source`` may be a path, an open file object, or bytes, bytearray or
+    memoryview data. Gzip, bzip2, xz and zstandard (with the ``zstandard``
+    package installed) compressed data is detected by its magic bytes and
+    decompressed in chunks as it is read. Uncompressed files of at least
+    ``MMAP_THRESHOLD`` bytes are memory mapped.
+    """
+    with contextlib.ExitStack() as stack:
+        if isinstance(source, (str, os.PathLike)):
+            raw = stack.enter_context(open(source, "rb"))
+            magic = raw.read(MAGIC_SIZE)
+            raw.seek(0)
+            if _decompressor(magic) is None:
+                size = os.fstat(raw.fileno()).st_size
+                if size >= MMAP_THRESHOLD:
+                    mapped = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+                    # Closed before the file so it is not held open, which
+                    # keeps it locked on Windows
+                    reader = BufferReader(mapped)
+                    stack.callback(reader.close)
+                    yield reader
+                    return
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            raw = BufferReader(source)
+            magic = bytes(raw.view[:MAGIC_SIZE])
+        else:
+            raw = source
+            if hasattr(source, "peek"):
+                magic = source.peek(MAGIC_SIZE)[:MAGIC_SIZE]
+            elif _seekable(source):
+                start = source.tell()
+                magic = source.read(MAGIC_SIZE)
+                source.seek(start)
+            else:
+                magic = source.read(MAGIC_SIZE)
+                raw = _PrefixedReader(magic, source)
+            if not isinstance(magic, bytes):
+                # Text streams are never compressed
+                yield raw
+                return
+
+        decompressor = _decompressor(magic)
+        if decompressor is not None:
+            raw = stack.enter_context(decompressor(raw))
+        yield raw
+
+
+def source_size(source):
+    """Return the number of bytes ``open_source`` will read, if known.
+
+    The size is unknown (None) for compressed data and for file objects.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        if _decompressor(bytes(view[:MAGIC_SIZE])) is None:
+            return view.nbytes
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as raw:
+            if _decompressor(raw.read(MAGIC_SIZE)) is None:
+                return os.fstat(raw.fileno()).st_size
+    return None
+
+
+def _decompressor(magic):
+    """Return a function opening a decompressing reader, if compressed."""
+    if magic.startswith(GZIP_MAGIC):
+        import gzip  # pylint: disable=import-outside-toplevel
+
+        return lambda raw: gzip.GzipFile(fileobj=raw, mode="rb")
+    if magic.startswith(BZIP2_MAGIC):
+        import bz2  # pylint: disable=import-outside-toplevel
+
+        return lambda raw: bz2.BZ2File(raw, mode="rb")
+    if magic.startswith(XZ_MAGIC):
+        import lzma  # pylint: disable=import-outside-toplevel
+
+        return lambda raw: lzma.LZMAFile(raw, mode="rb")
+    if magic.startswith(ZSTD_MAGIC):
+        return _zstd_reader
+    return None
+
+
+def _zstd_reader(raw):
+    """Return a zstandard decompressing reader."""
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError as err:
+        raise ImportError(
+            "Reading zstandard compressed maps requires the zstandard package"
+        ) from err
+    return zstandard.ZstdDecompressor().stream_reader(raw)
+
+
+def _seekable(stream):
+    """Return True if the stream supports seeking."""
+    try:
+        return stream.seekable()
+    except AttributeError:
+        return hasattr(stream, "seek")
@@ -0,0 +1,235 @@
+"""Spatial yield analytics over the die grid."""
+
+import collections
+import functools
+import numpy as np
+from waferview.constants import (
+    CHIP_SIZE,
+    WAFER_SIZE,
+    RADIAL_ZONES,
+    EDGE_EXCLUSION,
+    QUADRANTS,
+)
+
+
+class DieGeometry(
+    collections.namedtuple("DieGeometry", ["x", "y", "chip", "wafer_radius"])
+):
+    """Die centers of a map geometry.
+
+    ``x`` is a ``1 x cols`` and ``y`` a ``rows x 1`` array of die centers in
+    mm, which broadcast against the die grid, and ``chip`` is the die
+    ``(width, height)`` in mm. The full grids below are derived from them on
+    demand as float32 so no grid sized array stays cached.
+    """
+
+    __slots__ = ()
+
+    @property
+    def radius(self):
+        """Return the distance of every die center from the wafer center."""
+        return np.hypot(self.x, self.y)
+
+    @property
+    def angle(self):
+        """Return the angle of every die in degrees counter clockwise from x."""
+        return np.degrees(np.arctan2(self.y, self.x)) % 360
+
+    @property
+    def outer_radius(self):
+        """Return the distance to every die's corner farthest from the center."""
+        chip_x, chip_y = self.chip
+        return np.hypot(np.abs(self.x) + chip_x / 2, np.abs(self.y) + chip_y / 2)
+
+
+@functools.lru_cache(maxsize=4)
+def geometry(rows, cols, chip_size, wafer_size):
+    """Return the die geometry of a map.
+
+    The map is assumed to be centered on the wafer. Results are cached by
+    geometry and hold read-only arrays.
+    """
+    chip_x, chip_y = (size / 1000 for size in chip_size)
+    x = ((np.arange(cols) + 0.5 - cols / 2) * chip_x).astype(np.float32)
+    y = ((rows / 2 - np.arange(rows) - 0.5) * chip_y).astype(np.float32)
+    x, y = x.reshape(1, cols), y.reshape(rows, 1)
+    for array in (x, y):
+        array.setflags(write=False)
+    return DieGeometry(x, y, (chip_x, chip_y), wafer_size / 2)
+
+
+def die_geometry(wmap):
+    """Return the cached die geometry of a wafer map."""
+    rows, cols = wmap.die_grid.shape
+    return geometry(
+        rows,
+        cols,
+        tuple(wmap.device_attr[CHIP_SIZE]),
+        wmap.device_attr[WAFER_SIZE],
+    )
+
+
+def status_masks(wmap):
+    """Return ``(tested, passed)`` masks of the die grid."""
+    status = [wmap.bin_codes[code]["status"] for code in wmap.bin_table]
+    tested = np.array([value is not None for value in status], dtype=bool)
+    passed = np.array([bool(value) for value in status], dtype=bool)
+    grid = wmap.die_grid
+    return tested[grid], passed[grid]
+
+
+def zone_stats(wmap, zones=None, edge_exclusion=EDGE_EXCLUSION):
+    """Return die counts and yield for each zone of the wafer.
+
+    Zones are the radial rings in ``zones`` (fractions of the wafer radius,
+    ``RADIAL_ZONES`` by default), the four quadrants and ``edge_exclusion``,
+    which holds the dies lying completely within ``edge_exclusion`` mm of the
+    wafer edge excluded.
+    """
+    if zones is None:
+        zones = RADIAL_ZONES
+    geom = die_geometry(wmap)
+    tested, passed = status_masks(wmap)
+    relative = geom.radius / geom.wafer_radius
+    angle = geom.angle
+
+    masks = {}
+    for name, (start, stop) in zones.items():
+        masks[name] = (relative >= start) & (relative < stop)
+    for name, (start, stop) in QUADRANTS.items():
+        masks[name] = (angle >= start) & (angle < stop)
+    masks["edge_exclusion"] = geom.outer_radius <= geom.wafer_radius - edge_exclusion
+
+    stats = {}
+    for name, mask in masks.items():
+        total_count = int(np.count_nonzero(tested & mask))
+        pass_count = int(np.count_nonzero(passed & mask))
+        yield_pct = 0.0
+        if total_count:
+            yield_pct = round(pass_count / total_count * 100.0, 2)
+        stats[name] = {
+            "total_die": total_count,
+            "pass": pass_count,
+            "fail": total_count - pass_count,
+            "yield": yield_pct,
+        }
+    return stats
+
+
+def label_clusters(mask, diagonal=False):
+    """Label connected regions of a boolean mask.
+
+    Runs of set dies in each row are found with array operations and joined
+    with the overlapping runs of the next row through a union-find, so the
+    work is linear in the number of dies. With ``diagonal`` set dies touching
+    at a corner are connected as well. Returns ``(labels, count)`` where
+    ``labels`` is 0 outside the mask and 1 to ``count`` inside it.
+    """
+    rows, cols = mask.shape
+    padded = np.zeros((rows, cols + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    run_row, run_start = np.nonzero(edges == 1)
+    _, run_stop = np.nonzero(edges == -1)
+    row_first = np.searchsorted(run_row, np.arange(rows + 1)).tolist()
+    run_row, run_start, run_stop = (
+        run_row.tolist(),
+        run_start.tolist(),
+        run_stop.tolist(),
+    )
+
+    parent = list(range(len(run_row)))
+
+    def find(run):
+        while parent[run] != run:
+            parent[run] = parent[parent[run]]
+            run = parent[run]
+        return run
+
+    reach = 1 if diagonal else 0
+    for row in range(rows - 1):
+        above = row_first[row]
+        above_end = row_first[row + 1]
+        below = above_end
+        below_end = row_first[row + 2]
+        # Sweep both rows of runs, which are sorted by start column
+        while above < above_end and below < below_end:
+            if (
+                run_start[above] < run_stop[below] + reach
+                and run_start[below] < run_stop[above] + reach
+            ):
+                root_above, root_below = find(above), find(below)
+                if root_above != root_below:
+                    parent[root_below] = root_above
+            if run_stop[above] < run_stop[below]:
+                above += 1
+            else:
+                below += 1
+
+    labels = np.zeros((rows, cols), dtype=np.int32)
+    if not parent:
+        return labels, 0
+    roots = np.array([find(run) for run in range(len(parent))])
+    _, run_label = np.unique(roots, return_inverse=True)
+    run_length = np.array(run_stop) - np.array(run_start)
+    # Runs are in row-major order, the same order as the set dies
+    labels.ravel()[np.flatnonzero(mask)] = np.repeat(run_label + 1, run_length)
+    return labels, int(run_label.max()) + 1
+
+
+def fail_clusters(wmap, min_size=2, diagonal=False):
+    """Return ``(labels, clusters)`` for connected failing dies.
+
+    ``clusters`` lists every cluster of at least ``min_size`` dies, largest
+    first, with its label, die count, bounding rows and columns and center.
+    """
+    tested, passed = status_masks(wmap)
+    labels, _ = label_clusters(tested & ~passed, diagonal)
+    cols = labels.shape[1]
+    positions = np.flatnonzero(labels)
+    if not positions.size:
+        return labels, []
+
+    # Group the failing dies by label to reduce each cluster in one pass
+    die_labels = labels.ravel()[positions]
+    order = np.argsort(die_labels, kind="stable")
+    die_labels = die_labels[order]
+    row_idx, col_idx = np.divmod(positions[order], cols)
+    starts = np.flatnonzero(np.diff(die_labels, prepend=0))
+    sizes = np.diff(np.append(starts, die_labels.size))
+
+    keep = sizes >= min_size
+    clusters = []
+    for values in zip(
+        die_labels[starts][keep].tolist(),
+        sizes[keep].tolist(),
+        np.minimum.reduceat(row_idx, starts)[keep].tolist(),
+        np.maximum.reduceat(row_idx, starts)[keep].tolist(),
+        np.minimum.reduceat(col_idx, starts)[keep].tolist(),
+        np.maximum.reduceat(col_idx, starts)[keep].tolist(),
+        (np.add.reduceat(row_idx, starts) / sizes)[keep].tolist(),
+        (np.add.reduceat(col_idx, starts) / sizes)[keep].tolist(),
+    ):
+        label, size, row_min, row_max, col_min, col_max, row_mid, col_mid = values
+        clusters.append(
+            {
+                "label": label,
+                "size": size,
+                "rows": (row_min, row_max),
+                "cols": (col_min, col_max),
+                "center": (row_mid, col_mid),
+            }
+        )
+    clusters.sort(key=lambda cluster: cluster["size"], reverse=True)
+    return labels, clusters
+
+
+def summary(wmap):
+    """Return flat zone yields and cluster counts for batch reports."""
+    result = {
+        f"{name}_yield": stats["yield"] for name, stats in zone_stats(wmap).items()
+    }
+    _, clusters = fail_clusters(wmap)
+    result["fail_clusters"] = len(clusters)
+    result["largest_cluster"] = clusters[0]["size"] if clusters else 0
+    return result
@@ -0,0 +1,220 @@
+"""Stacked (lot composite) wafer maps."""
+
+import os
+import numpy as np
+from waferview import wafermap
+from waferview.constants import (
+    CHIP_SIZE,
+    LOT_ID,
+    PRODUCT_ID,
+    STACK_CHUNKS_PER_WORKER,
+    WAFER_ID,
+)
+
+# Errors that reject a single wafer instead of stopping a stack
+STACK_ERRORS = (OSError, ValueError, KeyError, SyntaxError)
+
+
+class StackMap:
+    """Die by die counts accumulated over many wafers.
+
+    For every die position ``tested`` counts the wafers where the die was
+    tested, ``fails`` the wafers where it failed and ``bin_counts`` holds one
+    count array per bin code. Memory only depends on the map size, never on
+    the number of wafers added.
+
+    The per bin counts are layers of a single ``bins x rows x cols`` array,
+    so a wafer is added in one pass over its die grid however many bins it
+    has.
+    """
+
+    def __init__(self, rows=None, cols=None):
+        """Initialize an empty stack, optionally with a fixed map size."""
+        self.rows = rows
+        self.cols = cols
+        self.wafer_count = 0
+        self.wafer_ids = []
+        self.device_attr = {}
+        self.tested = None
+        self.fails = None
+        self.bin_layers = {}
+        self._counts = None
+        if rows is not None and cols is not None:
+            self._allocate()
+
+    def check_header(self, wmap):
+        """Raise a ValueError if a wafer does not match the stacked map size."""
+        shape = (wmap.device_attr["rows"], wmap.device_attr["cols"])
+        if self.rows is not None and shape != (self.rows, self.cols):
+            raise ValueError(
+                f"Wafer {wmap.device_attr[WAFER_ID]} is {shape[0]}x{shape[1]}, "
+                f"expected {self.rows}x{self.cols}"
+            )
+
+    def add(self, wmap):
+        """Add a ``WaferMap`` or map file to the stack.
+
+        Files are checked against the stack size from their header alone, so
+        mismatched wafers are rejected before their die data is read.
+        """
+        if not isinstance(wmap, wafermap.WaferMap):
+            wmap = wafermap.WaferMap.header(wmap)
+        self.check_header(wmap)
+        if self.rows is None:
+            self.rows = wmap.device_attr["rows"]
+            self.cols = wmap.device_attr["cols"]
+            self._allocate()
+        if not self.device_attr:
+            self.device_attr = {
+                LOT_ID: wmap.device_attr[LOT_ID],
+                PRODUCT_ID: wmap.device_attr[PRODUCT_ID],
+                CHIP_SIZE: list(wmap.device_attr[CHIP_SIZE]),
+            }
+
+        grid = np.asarray(wmap.die_grid)
+        status = [wmap.bin_codes[code]["status"] for code in wmap.bin_table]
+        tested = np.array([value is not None for value in status])
+        failed = np.array([value is not None and not value for value in status])
+        self.tested += tested[grid]
+        self.fails += failed[grid]
+
+        present = np.bincount(grid.ravel(), minlength=len(wmap.bin_table)) > 0
+        counted = [
+            code
+            for index, code in enumerate(wmap.bin_table)
+            if tested[index] and present[index]
+        ]
+        self._add_layers(counted)
+        layers = np.full(len(wmap.bin_table), -1, dtype=np.intp)
+        for index, code in enumerate(wmap.bin_table):
+            if code in counted:
+                layers[index] = self.bin_layers[code]
+        die_layers = layers[grid]
+        row_index, col_index = np.nonzero(die_layers >= 0)
+        # Every die position appears once, so no count is incremented twice
+        self._counts[die_layers[row_index, col_index], row_index, col_index] += 1
+
+        self.wafer_count += 1
+        self.wafer_ids.append(wmap.device_attr[WAFER_ID])
+
+    def merge(self, other):
+        """Add the counts of another stack, such as one from a worker."""
+        if other.rows is None:
+            return
+        if self.rows is None:
+            self.rows = other.rows
+            self.cols = other.cols
+            self._allocate()
+        elif (other.rows, other.cols) != (self.rows, self.cols):
+            raise ValueError(
+                f"Stack is {other.rows}x{other.cols}, expected {self.rows}x{self.cols}"
+            )
+        if not self.device_attr:
+            self.device_attr = dict(other.device_attr)
+        self.tested += other.tested
+        self.fails += other.fails
+        self._add_layers(other.bin_layers)
+        for code, other_counts in other.bin_counts.items():
+            self._counts[self.bin_layers[code]] += other_counts
+        self.wafer_count += other.wafer_count
+        self.wafer_ids.extend(other.wafer_ids)
+
+    def fail_rate(self):
+        """Return the fraction of tested wafers failing at each die."""
+        return self.fails / np.maximum(self.tested, 1)
+
+    def _allocate(self):
+        """Create the zeroed count arrays."""
+        self.tested = np.zeros((self.rows, self.cols), dtype=np.uint32)
+        self.fails = np.zeros((self.rows, self.cols), dtype=np.uint32)
+
+    @property
+    def bin_counts(self):
+        """Return the per die count array of every bin code seen."""
+        return {code: self._counts[layer] for code, layer in self.bin_layers.items()}
+
+    def _add_layers(self, codes):
+        """Add zeroed count layers for the bin codes not counted yet."""
+        new_codes = [
+            code for code in dict.fromkeys(codes) if code not in self.bin_layers
+        ]
+        if not new_codes:
+            return
+        layers = np.zeros((len(new_codes), self.rows, self.cols), dtype=np.uint32)
+        if self._counts is None:
+            self._counts = layers
+        else:
+            self._counts = np.concatenate([self._counts, layers])
+        for code in new_codes:
+            self.bin_layers[code] = len(self.bin_layers)
+
+
+def stack_files(paths, workers=1, progress=None):
+    """Return a ``(stack, rejected)`` pair built from map files.
+
+    The first file sets the map size. Files that cannot be read or do not
+    match it are returned in ``rejected`` as ``(path, error)`` pairs instead
+    of stopping the stack. With more than one worker (None for all cores)
+    the files are split into chunks that are stacked in separate processes
+    and merged.
+
+    ``progress`` is called as ``progress("stack", done, total)`` with the
+    number of files stacked so far; returning False stops stacking with
+    ``LoadCancelled``.
+    """
+    paths = list(paths)
+    rows = cols = None
+    for path in paths:
+        try:
+            header = wafermap.WaferMap.header(path)
+        except STACK_ERRORS:
+            continue
+        rows, cols = header.device_attr["rows"], header.device_attr["cols"]
+        break
+
+    if workers == 1:
+        return _stack_chunk(paths, rows, cols, progress)
+
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    workers = workers or os.cpu_count() or 1
+    # Several chunks per worker keep progress moving and let a cancel skip
+    # the chunks not yet started
+    chunk_size = max(1, -(-len(paths) // (workers * STACK_CHUNKS_PER_WORKER)))
+    chunks = [paths[pos : pos + chunk_size] for pos in range(0, len(paths), chunk_size)]
+    stack = StackMap(rows, cols)
+    rejected = []
+    done = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = executor.map(
+            _stack_chunk, chunks, [rows] * len(chunks), [cols] * len(chunks)
+        )
+        for chunk, (part, part_rejected) in zip(chunks, parts):
+            stack.merge(part)
+            rejected.extend(part_rejected)
+            done += len(chunk)
+            try:
+                _report_progress(progress, done, len(paths))
+            except wafermap.LoadCancelled:
+                executor.shutdown(cancel_futures=True)
+                raise
+    return stack, rejected
+
+
+def _stack_chunk(paths, rows, cols, progress=None):
+    """Stack a list of files into a new stack of the given size."""
+    stack = StackMap(rows, cols)
+    rejected = []
+    for done, path in enumerate(paths, 1):
+        try:
+            stack.add(path)
+        except STACK_ERRORS as err:
+            rejected.append((path, err))
+        _report_progress(progress, done, len(paths))
+    return stack, rejected
+
+
+def _report_progress(progress, done, total):
+    """Pass stacking progress to the callback, raising LoadCancelled if asked."""
+    if progress is not None and progress("stack", done, total) is False:
+        raise wafermap.LoadCancelled("Stacking cancelled")
@@ -0,0 +1,183 @@
+"""Synthetic SEMI G85 wafer maps for tests and benchmarks."""
+
+import numpy as np
+from waferview.bintypes import CODE_RANGE
+from waferview.constants import (
+    BIN_TYPE_ASCII,
+    BIN_TYPE_DECIMAL,
+    BIN_TYPE_HEX,
+    BIN_TYPE_INT2,
+)
+
+PATTERNS = ("random", "center", "edge", "ring", "cluster")
+
+# Rows encoded and written at once
+WRITE_CHUNK_ROWS = 1024
+
+# Rows of random draws generated at once; changing it changes the maps
+_GRID_BLOCK_ROWS = 1024
+
+# Size of the grid the pattern scale is computed on
+_MEAN_GRID = 256
+
+# ASCII codes for the pass bin, the fail bins and the null bin
+_ASCII_PASS = "1"
+_ASCII_FAILS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz023456789"
+_ASCII_NULL = "."
+
+
+def bin_codes(bin_type, num_bins):
+    """Return ``(codes, null_code)`` for ``num_bins`` bins of a bin type.
+
+    The first code is the pass bin and the others are fail bins.
+    """
+    if bin_type == BIN_TYPE_ASCII:
+        if num_bins > len(_ASCII_FAILS) + 1:
+            raise ValueError(f"ASCII maps support at most {len(_ASCII_FAILS) + 1} bins")
+        return [_ASCII_PASS, *_ASCII_FAILS[: num_bins - 1]], _ASCII_NULL
+
+    code_range = CODE_RANGE[bin_type]
+    if num_bins >= code_range:
+        raise ValueError(f"{bin_type} maps support at most {code_range - 1} bins")
+    if bin_type == BIN_TYPE_DECIMAL:
+        fmt = "{:03d}"
+    elif bin_type == BIN_TYPE_INT2:
+        fmt = "{:04X}"
+    else:
+        fmt = "{:02X}"
+    return [fmt.format(value) for value in range(num_bins)], fmt.format(code_range - 1)
+
+
+def fail_probability(
+    rows, cols, pattern="random", fail_rate=0.05, seed=0, start=0, stop=None
+):
+    """Return the chance of each die failing for a spatial fail pattern.
+
+    Patterns are scaled so the mean over the wafer is about ``fail_rate``:
+    ``random`` is uniform, ``center`` and ``edge`` grow toward the wafer
+    center and edge, ``ring`` is a band at two thirds of the radius and
+    ``cluster`` adds a few random blobs. Only rows ``start`` to ``stop``
+    are returned, so large maps can be generated in blocks.
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown pattern {pattern!r}, expected one of {PATTERNS}")
+    # The mean is taken on a fixed grid so every block is scaled the same
+    xloc, yloc = _coords(_MEAN_GRID, _MEAN_GRID)
+    weight = _pattern_weight(xloc, yloc, pattern, seed)
+    mean = weight[np.hypot(xloc, yloc) <= 1].mean()
+    xloc, yloc = _coords(rows, cols, start, stop)
+    weight = _pattern_weight(xloc, yloc, pattern, seed)
+    return np.clip(weight * (fail_rate / max(mean, 1e-12)), 0, 1).astype(np.float32)
+
+
+def generate_grid(rows, cols, num_bins=3, pattern="random", fail_rate=0.05, seed=0):
+    """Return a ``rows x cols`` grid of bin indices.
+
+    Index 0 is the pass bin, 1 to ``num_bins - 1`` the fail bins and
+    ``num_bins`` the null bin, used for the dies outside the round wafer.
+    """
+    rng = np.random.default_rng(seed)
+    dtype = np.uint8 if num_bins < 256 else np.uint16
+    grid = np.zeros((rows, cols), dtype=dtype)
+    for start in range(0, rows, _GRID_BLOCK_ROWS):
+        stop = min(start + _GRID_BLOCK_ROWS, rows)
+        block = grid[start:stop]
+        chance = fail_probability(rows, cols, pattern, fail_rate, seed, start, stop)
+        failed = rng.random(block.shape, dtype=np.float32) < chance
+        if num_bins > 1:
+            block[failed] = rng.integers(1, num_bins, int(failed.sum()), dtype=dtype)
+        xloc, yloc = _coords(rows, cols, start, stop)
+        block[np.hypot(xloc, yloc) > 1] = num_bins
+    return grid
+
+
+def iter_map(
+    rows,
+    cols,
+    bin_type=BIN_TYPE_HEX,
+    num_bins=3,
+    pattern="random",
+    fail_rate=0.05,
+    seed=0,
+    wafer_size=300,
+    wafer_id="SYNTH01",
+):
+    """Yield a synthetic SEMI G85-1101 map as chunks of XML bytes.
+
+    Rows are encoded in blocks, so maps as large as 10k x 10k dies can be
+    written without holding the whole document in memory.
+    """
+    codes, null_code = bin_codes(bin_type, num_bins)
+    grid = generate_grid(rows, cols, num_bins, pattern, fail_rate, seed)
+    counts = np.bincount(grid.ravel(), minlength=num_bins + 1)
+    width = len(null_code)
+    encoded = np.array([*codes, null_code], dtype=f"S{width}")
+
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Map xmlns="http://www.semi.org" WaferId="{wafer_id}" '
+        'FormatRevision="SEMI G85-1101">\n'
+        f'<Device BinType="{bin_type}" LotId="SYNTHLOT" ProductId="SYNTH" '
+        f'DeviceSizeX="{1000 * wafer_size / cols:.3f}" '
+        f'DeviceSizeY="{1000 * wafer_size / rows:.3f}" NullBin="{null_code}" '
+        f'Rows="{rows}" Columns="{cols}" WaferSize="{wafer_size}" '
+        'CreateDate="20240101000000">\n'
+    ).encode("ascii")
+    yield "".join(
+        f'<Bin BinCode="{code}" BinQuality="{"Pass" if index == 0 else "Fail"}" '
+        f'BinDescription="{"Pass" if index == 0 else f"Fail {index}"}" '
+        f'BinCount="{counts[index]}"/>\n'
+        for index, code in enumerate(codes)
+    ).encode("ascii")
+    yield b"<Data>\n"
+    row_len = cols * width
+    for start in range(0, rows, WRITE_CHUNK_ROWS):
+        data = encoded[grid[start : start + WRITE_CHUNK_ROWS]].tobytes()
+        yield b"".join(
+            b"<Row><![CDATA[" + data[pos : pos + row_len] + b"]]></Row>\n"
+            for pos in range(0, len(data), row_len)
+        )
+    yield b"</Data>\n</Device>\n</Map>\n"
+
+
+def generate_map(rows, cols, **kwargs):
+    """Return a synthetic map as bytes; see ``iter_map`` for the options."""
+    return b"".join(iter_map(rows, cols, **kwargs))
+
+
+def write_map(path, rows, cols, **kwargs):
+    """Write a synthetic map to a file; see ``iter_map`` for the options."""
+    with open(path, "wb") as out_file:
+        for chunk in iter_map(rows, cols, **kwargs):
+            out_file.write(chunk)
+    return path
+
+
+def _coords(rows, cols, start=0, stop=None):
+    """Return die center coordinates scaled to -1..1 across the map."""
+    stop = rows if stop is None else stop
+    xloc = (np.arange(cols) + 0.5) / cols * 2 - 1
+    yloc = (np.arange(start, stop) + 0.5) / rows * 2 - 1
+    return xloc[np.newaxis, :], yloc[:, np.newaxis]
+
+
+def _pattern_weight(xloc, yloc, pattern, seed):
+    """Return the unscaled fail weight of a pattern at the given coordinates."""
+    radius = np.hypot(xloc, yloc)
+    if pattern == "random":
+        return np.ones_like(radius)
+    if pattern == "center":
+        return np.clip(1 - radius, 0, None) ** 2
+    if pattern == "edge":
+        return np.clip(radius, 0, 1) ** 6
+    if pattern == "ring":
+        return np.exp(-(((radius - 2 / 3) / 0.08) ** 2))
+    rng = np.random.default_rng(seed)
+    weight = np.full_like(radius, 0.05)
+    for xmid, ymid, size in zip(
+        rng.uniform(-0.6, 0.6, 5),
+        rng.uniform(-0.6, 0.6, 5),
+        rng.uniform(0.05, 0.15, 5),
+    ):
+        weight += np.exp(-((xloc - xmid) ** 2 + (yloc - ymid) ** 2) / size**2)
+    return weight
@@ -0,0 +1,85 @@
+"""Lightweight stage timing and tracing spans."""
+
+import contextlib
+import functools
+import os
+import sys
+import time
+from waferview.constants import TRACE_ENV
+
+_hooks = []
+_log_spans = bool(os.environ.get(TRACE_ENV))
+
+
+def add_hook(callback):
+    """Call ``callback(name, seconds, fields)`` for every finished span."""
+    _hooks.append(callback)
+
+
+def remove_hook(callback):
+    """Stop calling a span hook."""
+    _hooks.remove(callback)
+
+
+def enabled():
+    """Return True if spans are logged or passed to hooks."""
+    return _log_spans or bool(_hooks)
+
+
+@contextlib.contextmanager
+def span(name, timings=None, **fields):
+    """Time a block, storing the seconds in ``timings[name]`` if given.
+
+    Spans are only logged when the ``WAFERVIEW_TRACE`` environment variable
+    is set, and only passed to hooks added with ``add_hook``; otherwise the
+    cost is two clock reads. The fields are yielded so the block can add
+    details it only learns while running.
+    """
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[name] = elapsed
+        if _log_spans or _hooks:
+            _emit(name, elapsed, fields)
+
+
+def timed(name):
+    """Decorate a method to record its run time in ``self.timings``."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.timings is None:
+                self.timings = {}
+            with span(name, self.timings):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _emit(name, elapsed, fields):
+    """Send a finished span to the log and the hooks."""
+    if _log_spans:
+        details = "".join(f" {key}={value}" for key, value in fields.items())
+        _get_logger().debug("%s %.3f ms%s", name, elapsed * 1000, details)
+    for hook in list(_hooks):
+        hook(name, elapsed, fields)
+
+
+@functools.cache
+def _get_logger():
+    """Return the span logger, set up on first use to keep imports light."""
+    import logging  # pylint: disable=import-outside-toplevel
+
+    logger = logging.getLogger("waferview.trace")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+    return logger
@@ -1,9 +1,13 @@
 """Creates memory structure for wafer map."""
 
-import re
-import xml.etree.ElementTree as ET
-import xmltodict
-from waferview.gui.constants import (
+import os
+import numpy as np
+from waferview import parsers
+from waferview.bintypes import RowDecoder
+from waferview.cache import get_cache
+from waferview.sources import open_source, source_size
+from waferview.tracing import span, timed
+from waferview.constants import (
     SUPPORTED_FORMATS,
     WAFER_ID,
     LOT_ID,
@@ -13,32 +17,271 @@ from waferview.gui.constants import (
     CREATE_DATE,
     DEFAULT_WAFER_SIZE,
     PASS,
+    FAIL,
     NULL,
+    READ_SIZE,
+    HEADER_READ_SIZE,
+    DECODE_CHUNK_ROWS,
 )
 
 
+class LoadCancelled(Exception):
+    """Raised when a progress callback cancels loading a map."""
+
+
 class WaferMap:
-    """Representation of a wafer map."""
-
-    def __init__(self, xmlfile):
-        """Initialize a wafer map structure."""
-        self.parse(xmlfile)
-        self.check_format()
-        self.get_attributes()
-        self.get_codes()
+    """Representation of a wafer map.
+
+    Die data is held in ``die_grid``, a ``rows x cols`` array of indices into
+    ``bin_table`` (the bin codes in ``bin_codes`` order).
+    """
+
+    bin_table = None
+    _die_grid = None
+    _pixels = None
+    _source = None
+    _cache = None
+    _cache_key = None
+    _progress = None
+    _growing = None
+    _reader = None
+    _offset = 0
+    _rows_done = 0
+    _row_counts = None
+    _decoder = None
+    _null_index = 0
+    complete = True
+    backend = None
+    timings = None
+
+    def __init__(self, xmlfile, lazy=False, cache=True, progress=None):
+        """Initialize a wafer map structure.
+
+        With ``lazy`` set only the header and bin table are read; the die
+        data is decoded the first time ``die_grid`` or ``pixels`` is used.
+        Maps opened from a path are looked up in (and saved to) the decoded
+        map cache unless ``cache`` is False; a ``MapCache`` may also be given.
+        The cache is on by default and writes to ``WAFERVIEW_CACHE_DIR``, or
+        ``waferview`` in ``XDG_CACHE_HOME`` or ``~/.cache``; setting
+        ``WAFERVIEW_NO_CACHE`` turns it off.
+
+        ``progress`` is called as ``progress(stage, done, total)`` while the
+        map is read (stage ``"parse"``, in bytes) and decoded (``"decode"``,
+        in rows); ``total`` is None when unknown. Returning False cancels
+        loading with ``LoadCancelled``. The callback may run on a worker
+        thread.
+
+        The seconds spent in each stage are kept in ``timings``.
+        """
+        self._source = xmlfile
+        self._progress = progress
+        self._cache = None
+        self.timings = {}
+        source = xmlfile if isinstance(xmlfile, (str, os.PathLike)) else "<stream>"
+        with span("load", self.timings, source=source):
+            if isinstance(xmlfile, (str, os.PathLike)):
+                self._cache = get_cache(cache)
+            if self._cache is not None and self.load_cache():
+                return
+
+            self.parse(xmlfile, header_only=lazy)
+            self.check_format()
+            self.get_attributes()
+            self.get_codes()
+            if not lazy:
+                self.gen_map()
+                self.save_cache()
+
+    @classmethod
+    def header(cls, xmlfile, cache=True):
+        """Return a wafer map with only the header and bin table loaded."""
+        return cls(xmlfile, lazy=True, cache=cache)
+
+    @classmethod
+    def growing(cls, path, cache=True):
+        """Return a map of a file that is still being written.
+
+        The rows written so far are decoded and ``refresh`` adds the rows
+        appended since; dies of rows not yet written hold the null bin.
+        ``complete`` turns True once the end of the map has been read, and
+        the finished map is then saved to the cache.
+        """
+        wmap = cls.__new__(cls)
+        wmap.timings = {}
+        wmap._growing = path
+        wmap._cache = get_cache(cache)
+        wmap.restart()
+        wmap.refresh()
+        return wmap
+
+    def restart(self):
+        """Forget the rows read from a growing map so it is read again."""
+        self._reader = parsers.G85Reader()
+        self.backend = self._reader.backend
+        self._offset = 0
+        self._rows_done = 0
+        self._row_counts = None
+        self._die_grid = None
+        self._source = None
+        self.complete = False
+
+    @timed("refresh")
+    def refresh(self):
+        """Decode the rows appended to a growing map since the last call.
+
+        Reading resumes at the offset where the previous call stopped, with
+        the parser state kept, so each call costs time proportional to the
+        new data. Returns the ``(start, stop)`` range of decoded rows, which
+        is empty when nothing was added.
+        """
+        if os.path.getsize(self._growing) < self._offset:
+            # The file was replaced by a shorter one
+            self.restart()
+        if self._cache is not None:
+            # Taken before reading, as the read may be the one that completes
+            self._cache_key = self._cache.key(self._growing)
+        with open(self._growing, "rb") as map_file:
+            map_file.seek(self._offset)
+            while chunk := map_file.read(READ_SIZE):
+                self._reader.feed(chunk)
+                self._offset += len(chunk)
+
+        if self._die_grid is None:
+            if not self._reader.in_data:
+                return 0, 0
+            self._map_data = self._reader.map_data
+            self.check_format()
+            self.get_attributes()
+            self.get_codes()
+            self._decoder = self.start_grid()
+            self._row_counts = np.zeros(len(self.bin_table), dtype=np.int64)
+
+        rows = self._reader.rows
+        start = self._rows_done
+        stop = min(start + len(rows), self.device_attr["rows"])
+        if stop > start:
+            decoded = self._decoder.decode(
+                rows[: stop - start], self.device_attr["cols"], self._null_index
+            )
+            self._die_grid[start:stop] = decoded
+            self._row_counts += np.bincount(
+                decoded.ravel(), minlength=len(self.bin_table)
+            )
+        # Decoded rows are dropped so memory does not grow with the file
+        del rows[:]
+        self._rows_done = stop
+        if self._reader.complete and not self.complete:
+            self.complete = True
+            self._source = self._growing
+            self.save_cache()
+        return start, stop
+
+    @property
+    def rows_read(self):
+        """Return the number of rows decoded so far from a growing map."""
+        return self._rows_done
+
+    @property
+    def die_grid(self):
+        """Return the ``rows x cols`` array of bin table indices."""
+        if self._die_grid is None and self._source is not None:
+            self.load_data()
+        return self._die_grid
+
+    def load_data(self):
+        """Read and decode the die data of a lazily loaded map.
+
+        The map is saved to the cache under the key taken before its header
+        was read, so a file changed since is never cached as the new one.
+        """
+        if hasattr(self._source, "seek"):
+            self._source.seek(0)
+        self.parse(self._source)
         self.gen_map()
+        self.save_cache()
 
-    def parse(self, xmlfile):
-        """Parse an xml wafer map."""
-        tree = ET.iterparse(xmlfile)
-        # Strip namespace from XML file
-        for _, elem in tree:
-            _, _, elem.tag = elem.tag.rpartition("}")
-        xml_data = tree.root
-        xmlstr = ET.tostring(xml_data, encoding="utf-8", method="xml")
-        xml_dict = xmltodict.parse(xmlstr)
-        self._map_data = xml_dict["Map"]
+    @timed("cache_load")
+    def load_cache(self):
+        """Restore the decoded map from the cache, returning True on a hit.
 
+        The cache key is taken here, before the map is parsed on a miss, and
+        used again when the decoded map is saved.
+        """
+        try:
+            self._cache_key = self._cache.key(self._source)
+        except OSError:
+            return False
+        entry = self._cache.get(self._source, self._cache_key)
+        if entry is None:
+            return False
+        self.format = entry["format"]
+        self.is_valid = entry["is_valid"]
+        self.device_attr = entry["device_attr"]
+        self.bin_codes = entry["bin_codes"]
+        self.bin_table = entry["bin_table"]
+        self._die_grid = entry["die_grid"]
+        self._pixels = None
+        return True
+
+    @timed("cache_save")
+    def save_cache(self):
+        """Save the decoded map to the cache, if one is in use.
+
+        Only maps with a cache key taken before they were read are saved.
+        """
+        if self._cache is None or self._cache_key is None:
+            return
+        try:
+            self._cache.put(self._source, self, self._cache_key)
+        except OSError:
+            # A read-only or full cache should never stop a map from loading
+            pass
+
+    def parse(self, xmlfile, header_only=False):
+        """Parse a wafer map file.
+
+        The decoder of the file's format is picked from its first bytes by
+        ``parsers.reader_for``. The file is streamed through it and, for XML
+        maps, each element is consumed as soon as it is complete, so the tree
+        is never held in memory as a whole. The result mirrors the attribute
+        naming that ``xmltodict`` produced so the downstream methods are
+        unchanged. With ``header_only`` set, reading stops where the ``Data``
+        element begins. ``xmlfile`` may be any source ``open_source`` accepts.
+
+        The parser backend used is kept in ``backend`` and added to the
+        ``parse`` span.
+        """
+        if self.timings is None:
+            self.timings = {}
+        with span("parse", self.timings) as fields:
+            reader = None
+            read_size = HEADER_READ_SIZE if header_only else READ_SIZE
+            total = source_size(xmlfile) if self._progress is not None else None
+            done = 0
+            with open_source(xmlfile) as source:
+                while True:
+                    chunk = source.read(read_size)
+                    if reader is None:
+                        reader = parsers.reader_for(chunk)
+                    if not chunk:
+                        reader.close()
+                        break
+                    reader.feed(chunk)
+                    done += len(chunk)
+                    self.report_progress("parse", done, total)
+                    if header_only and reader.in_data:
+                        break
+                # The last chunk may be a view of a memory map closed next
+                del chunk
+            self.backend = fields["backend"] = reader.backend
+            self._map_data = reader.map_data
+
+    def report_progress(self, stage, done, total):
+        """Pass progress to the callback, raising LoadCancelled if asked."""
+        if self._progress is not None and self._progress(stage, done, total) is False:
+            raise LoadCancelled(f"Loading cancelled while in {stage} stage")
+
+    @timed("check_format")
     def check_format(self):
         """Verify format is supported by library."""
         self.is_valid = False
@@ -46,6 +289,7 @@ class WaferMap:
         if self.format in SUPPORTED_FORMATS:
             self.is_valid = True
 
+    @timed("get_attributes")
     def get_attributes(self):
         """Retrieve all wafer attributes."""
         device_data = self._map_data["Device"]
@@ -63,6 +307,7 @@ class WaferMap:
             "cols": int(device_data.get("@Columns", 1)),
         }
 
+    @timed("get_codes")
     def get_codes(self):
         """Get all bin codes."""
         bins = self._map_data["Device"]["Bin"]
@@ -90,8 +335,35 @@ class WaferMap:
                 "count": None,
             }
 
+    @timed("gen_map")
     def gen_map(self):
-        """Generate a wafer map with data and coordinates."""
+        """Generate the die grid from the wafer map row data.
+
+        The row strings are released once decoded.
+        """
+        decoder = self.start_grid()
+        data = self._map_data["Device"]["Data"]
+        # Rows past the declared row count are ignored, and short or long
+        # rows are padded with the null bin or cut to the declared columns
+        rows = data["Row"][: self.device_attr["rows"]]
+        cols = self.device_attr["cols"]
+        if self._progress is None:
+            if rows:
+                self._die_grid[: len(rows)] = decoder.decode(
+                    rows, cols, self._null_index
+                )
+        else:
+            for start in range(0, len(rows), DECODE_CHUNK_ROWS):
+                stop = min(start + DECODE_CHUNK_ROWS, len(rows))
+                self._die_grid[start:stop] = decoder.decode(
+                    rows[start:stop], cols, self._null_index
+                )
+                self.report_progress("decode", stop, len(rows))
+        # The row text takes more memory than the grid decoded from it
+        data["Row"] = None
+
+    def start_grid(self):
+        """Fill a new die grid with the null bin and return the row decoder."""
         if self.device_attr[CHIP_SIZE] == [0, 0]:
             # Need to use rows and columns to guess size
             self.device_attr[CHIP_SIZE][0] = (
@@ -101,32 +373,122 @@ class WaferMap:
                 1000 * self.device_attr[WAFER_SIZE] / self.device_attr["rows"]
             )
 
-        # Normalize locations to a 0 to 1 grid with 0,0 at bottom left and
-        # 1,1, at top right
-        xmax = self.device_attr[CHIP_SIZE][0] * self.device_attr["cols"]
-        ymax = self.device_attr[CHIP_SIZE][1] * self.device_attr["rows"]
-        xstep = self.device_attr[CHIP_SIZE][0] / xmax
-        ystep = -1 * self.device_attr[CHIP_SIZE][1] / ymax
-
-        self.pixels = []
-
-        xloc = 0
-        yloc = 1
-
-        bin_type = self._map_data["Device"]["@BinType"]
-        find_str = ".."
-        if bin_type == "Decimal":
-            find_str = "..."
-
-        for row in self._map_data["Device"]["Data"]["Row"]:
-            # Split data into one byte chunks
-            row_bins = re.findall(find_str, row)
-            for data in row_bins:
-                status = self.bin_codes[data]["status"]
-                desc = self.bin_codes[data]["desc"]
-                coord = (xloc, yloc + ystep)
-                size = (xstep, -1 * ystep)
-                self.pixels.append([coord, size, status, desc])
-                xloc += xstep
-            xloc = 0
-            yloc += ystep
+        self.bin_table = list(self.bin_codes)
+        decoder = RowDecoder(self._map_data["Device"]["@BinType"], self.bin_table)
+        self._null_index = decoder.bin_index.get(
+            self._map_data["Device"].get("@NullBin"), 0
+        )
+        self._die_grid = np.full(
+            (self.device_attr["rows"], self.device_attr["cols"]),
+            self._null_index,
+            dtype=_grid_dtype(len(self.bin_table)),
+        )
+        self._pixels = None
+        return decoder
+
+    @property
+    def pixels(self):
+        """Return per-die ``[coord, size, status, desc]`` entries.
+
+        This is a compatibility view over ``die_grid`` with coordinates
+        normalized to a 0 to 1 grid (0,0 at bottom left). It is only built on
+        first access since it holds several Python objects per die.
+        """
+        if self._pixels is None:
+            rows, cols = self.die_grid.shape
+            xstep = 1 / cols
+            ystep = 1 / rows
+            size = (xstep, ystep)
+            bins = [
+                (self.bin_codes[code]["status"], self.bin_codes[code]["desc"])
+                for code in self.bin_table
+            ]
+            self._pixels = []
+            for row_num, row in enumerate(self.die_grid.tolist()):
+                yloc = 1 - (row_num + 1) * ystep
+                for col_num, index in enumerate(row):
+                    status, desc = bins[index]
+                    coord = (col_num * xstep, yloc)
+                    self._pixels.append([coord, size, status, desc])
+        return self._pixels
+
+    def die_info(self, row, col):
+        """Return the bin code, description and result of a single die.
+
+        ``result`` is ``"Pass"``, ``"Fail"`` or ``"NULL"`` for untested dies.
+        """
+        code = self.bin_table[self.die_grid[row, col]]
+        bin_data = self.bin_codes[code]
+        result = NULL
+        if bin_data["status"]:
+            result = PASS
+        elif bin_data["status"] is not None:
+            result = FAIL
+        return {
+            "row": row,
+            "col": col,
+            "code": code,
+            "desc": bin_data["desc"],
+            "result": result,
+        }
+
+    def bin_counts(self):
+        """Return the number of dies in each bin, in ``bin_table`` order.
+
+        For a growing map the counts kept while decoding are used, with the
+        rows not yet written counted as null dies.
+        """
+        if self._row_counts is not None:
+            counts = self._row_counts.copy()
+            rows, cols = self._die_grid.shape
+            counts[self._null_index] += (rows - self._rows_done) * cols
+            return counts
+        return np.bincount(self.die_grid.ravel(), minlength=len(self.bin_table))
+
+    @timed("stats")
+    def stats(self):
+        """Return die counts and yield computed from the die grid.
+
+        The result holds the die count of every bin code (``bins``), the
+        ``total_die``, ``pass`` and ``fail`` counts of tested dies, the
+        ``yield`` in percent and, under ``mismatch``, any bin whose counted
+        dies differ from the declared ``BinCount`` as ``(declared, counted)``.
+        """
+        counts = self.bin_counts().tolist()
+        bins = dict(zip(self.bin_table, counts))
+        total_count = 0
+        pass_count = 0
+        mismatch = {}
+        for code, count in bins.items():
+            bin_data = self.bin_codes[code]
+            if bin_data["status"] is not None:
+                total_count += count
+            if bin_data["status"]:
+                pass_count += count
+            try:
+                declared = int(bin_data["count"])
+            except (TypeError, ValueError):
+                continue
+            if declared != count:
+                mismatch[code] = (declared, count)
+
+        yield_pct = 0.0
+        if total_count:
+            yield_pct = round(pass_count / total_count * 100.0, 2)
+        return {
+            "bins": bins,
+            "total_die": total_count,
+            "pass": pass_count,
+            "fail": total_count - pass_count,
+            "yield": yield_pct,
+            "mismatch": mismatch,
+        }
+
+
+def _grid_dtype(num_bins):
+    """Return the smallest integer type able to index every bin."""
+    if num_bins <= np.iinfo(np.uint8).max + 1:
+        return np.uint8
+    if num_bins <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.uint32
@@ -0,0 +1,418 @@
+"""Watch directories for new wafer maps and summarize them as they arrive."""
+
+import csv
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from waferview.batch import SPATIAL_KEYS, SUMMARY_KEYS, is_map, summarize
+from waferview.constants import WATCH_INTERVAL, WATCH_SETTLE
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+class InotifySource:
+    """Changed files reported by Linux inotify.
+
+    Every write to a watched directory arrives as an event, so nothing is
+    scanned unless the kernel's event queue overflows.
+    """
+
+    def __init__(self, directories, matches):
+        """Start watching directories for files accepted by ``matches``."""
+        import ctypes  # pylint: disable=import-outside-toplevel
+
+        libc = _libc()
+        self.matches = matches
+        self.since = time.time()
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.directories = {}
+        try:
+            for directory in directories:
+                wd = libc.inotify_add_watch(
+                    self.fd, os.fsencode(directory), _WATCH_MASK
+                )
+                if wd < 0:
+                    err = ctypes.get_errno()
+                    raise OSError(err, os.strerror(err), directory)
+                self.directories[wd] = directory
+        except OSError:
+            self.close()
+            raise
+
+    def changes(self, timeout):
+        """Return ``(path, finished)`` for files changed within ``timeout``.
+
+        ``finished`` is True once the writer has closed or renamed the file.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        changed = []
+        while True:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size : pos + _EVENT.size + length]
+                pos += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.extend(self.recent())
+                    continue
+                name = os.fsdecode(name.rstrip(b"\0"))
+                if mask & IN_ISDIR or not self.matches(name):
+                    continue
+                finished = bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))
+                changed.append((os.path.join(self.directories[wd], name), finished))
+        return changed
+
+    def recent(self):
+        """Return the files changed since the last queue overflow.
+
+        Events were dropped, so the directories are listed once and every
+        file modified since the previous overflow is reported again.
+        """
+        since, self.since = self.since, time.time()
+        return [
+            (path, False)
+            for path, (_, mtime_ns) in scan(self.directories.values(), self.matches)
+            if mtime_ns / 1e9 >= since - 1
+        ]
+
+    def close(self):
+        """Stop watching."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingSource:
+    """Changed files found by comparing directory snapshots.
+
+    Each directory is listed once per ``interval`` and a file counts as
+    changed when its size or modification time differs from the last
+    snapshot.
+    """
+
+    def __init__(self, directories, matches, interval=WATCH_INTERVAL):
+        """Take the first snapshot of the directories."""
+        self.directories = list(directories)
+        self.matches = matches
+        self.interval = interval
+        self.snapshot = dict(scan(self.directories, self.matches))
+        self.next_scan = time.monotonic() + interval
+
+    def changes(self, timeout):
+        """Return ``(path, False)`` for files changed within ``timeout``."""
+        wait = self.next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return []
+        self.next_scan = time.monotonic() + self.interval
+        snapshot = dict(scan(self.directories, self.matches))
+        changed = [
+            (path, False)
+            for path, state in snapshot.items()
+            if self.snapshot.get(path) != state
+        ]
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        """Stop watching."""
+
+
+class DirectoryWatcher:
+    """Report map files in directories once they are fully written.
+
+    Changes come from inotify where available and from polling otherwise.
+    A changed file is held back until its writer closes it or it has not
+    changed for ``settle`` seconds, so maps are never read half written.
+    With ``existing`` set the maps already in the directories are reported
+    too.
+    """
+
+    def __init__(
+        self,
+        directories,
+        extension=".xml",
+        settle=WATCH_SETTLE,
+        interval=WATCH_INTERVAL,
+        existing=False,
+        use_inotify=None,
+    ):
+        """Start watching directories.
+
+        ``use_inotify`` forces (True) or disables (False) inotify; by
+        default it is used when the platform supports it.
+        """
+        self.directories = [os.path.abspath(path) for path in directories]
+        self.extension = extension
+        self.settle = settle
+        self.interval = interval
+        self.pending = {}
+        self.source = None
+        if use_inotify is not False:
+            try:
+                self.source = InotifySource(self.directories, self.matches)
+            except OSError:
+                if use_inotify:
+                    raise
+        if self.source is None:
+            self.source = PollingSource(self.directories, self.matches, interval)
+        if existing:
+            for path, _ in scan(self.directories, self.matches):
+                self.pending[path] = (0.0, True)
+
+    def __enter__(self):
+        """Return the watcher."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop watching."""
+        self.close()
+
+    @property
+    def inotify(self):
+        """Return True if changes come from inotify."""
+        return isinstance(self.source, InotifySource)
+
+    def matches(self, name):
+        """Return True if a file name is a watched map."""
+        return not name.startswith(".") and is_map(name, self.extension)
+
+    def poll(self, timeout=None):
+        """Wait up to ``timeout`` seconds for changes and return ready maps."""
+        if timeout is None:
+            timeout = self.interval
+        changes = self.source.changes(timeout)
+        now = time.monotonic()
+        for path, finished in changes:
+            self.pending[path] = (now, finished)
+        return self.ready()
+
+    def ready(self):
+        """Return the pending maps that are fully written."""
+        now = time.monotonic()
+        ready = [
+            path
+            for path, (changed, finished) in self.pending.items()
+            if finished or now - changed >= self.settle
+        ]
+        for path in ready:
+            del self.pending[path]
+        return [path for path in ready if os.path.isfile(path)]
+
+    def close(self):
+        """Stop watching."""
+        self.source.close()
+
+
+def scan(directories, matches):
+    """Yield ``(path, (size, mtime_ns))`` for the matching files."""
+    for directory in directories:
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if not matches(entry.name):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, (stat.st_size, stat.st_mtime_ns)
+
+
+def ingest(
+    watcher,
+    workers=None,
+    cache=True,
+    spatial_stats=False,
+    profile=False,
+    stop=None,
+):
+    """Summarize maps on a process pool as the watcher reports them.
+
+    Summaries are yielded as soon as each map is decoded, which also stores
+    it in the decoded map cache. Runs until ``stop`` (a ``threading.Event``)
+    is set; with a single worker the maps are summarized in this process.
+    """
+    if stop is None:
+        stop = threading.Event()
+    if workers == 1:
+        while not stop.is_set():
+            for path in watcher.poll():
+                yield summarize(path, cache, spatial_stats, profile)
+        return
+
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        running = set()
+        while not stop.is_set():
+            # Check back often while maps are being summarized
+            timeout = min(watcher.interval, 0.05) if running else None
+            for path in watcher.poll(timeout):
+                running.add(
+                    executor.submit(summarize, path, cache, spatial_stats, profile)
+                )
+            done = {future for future in running if future.done()}
+            running -= done
+            for future in done:
+                yield future.result()
+
+
+class SummaryWriter:
+    """Append summaries to a CSV or JSON lines stream as they arrive."""
+
+    def __init__(self, out_file, out_format="csv", spatial_stats=False):
+        """Initialize the writer, adding a CSV header to empty files."""
+        self.out_file = out_file
+        self.out_format = out_format
+        self.keys = SUMMARY_KEYS + (SPATIAL_KEYS if spatial_stats else []) + ["bins"]
+        self.writer = None
+        if out_format == "csv":
+            self.writer = csv.writer(out_file)
+            if not out_file.seekable() or out_file.tell() == 0:
+                self.writer.writerow(self.keys)
+
+    def write(self, summary):
+        """Write one summary and flush it."""
+        if self.writer is None:
+            json.dump(summary, self.out_file)
+            self.out_file.write("\n")
+        else:
+            row = dict(summary)
+            row["bins"] = " ".join(
+                f"{code}:{count}" for code, count in summary.get("bins", {}).items()
+            )
+            self.writer.writerow([row.get(key, "") for key in self.keys])
+        self.out_file.flush()
+
+
+def main(argv=None):
+    """Run the directory watcher from the command line."""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog="waferview-watch",
+        description="Summarize wafer maps as they are written to directories.",
+    )
+    parser.add_argument("directories", nargs="+", help="directories to watch")
+    parser.add_argument("-o", "--output", help="file to append to (default: stdout)")
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["csv", "jsonl"],
+        help="output format (default: from output extension, else csv)",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="worker processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--existing", action="store_true", help="also summarize maps already present"
+    )
+    parser.add_argument(
+        "--poll", action="store_true", help="poll the directories instead of inotify"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=WATCH_INTERVAL,
+        help="seconds between directory polls",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=WATCH_SETTLE,
+        help="seconds a map must be unchanged before it is read",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="do not use the decoded map cache"
+    )
+    parser.add_argument(
+        "--spatial",
+        action="store_true",
+        help="add zone, edge exclusion and failure cluster statistics",
+    )
+    args = parser.parse_args(argv)
+
+    out_format = args.format
+    if out_format is None:
+        out_format = (
+            "jsonl" if str(args.output).lower().endswith((".jsonl", ".json")) else "csv"
+        )
+
+    watcher = DirectoryWatcher(
+        args.directories,
+        settle=args.settle,
+        interval=args.interval,
+        existing=args.existing,
+        use_inotify=False if args.poll else None,
+    )
+    method = "inotify" if watcher.inotify else "polling"
+    print(f"Watching {', '.join(watcher.directories)} ({method})", file=sys.stderr)
+    out_file = sys.stdout
+    if args.output:
+        out_file = open(args.output, "a", newline="", encoding="utf-8")
+    try:
+        writer = SummaryWriter(out_file, out_format, args.spatial)
+        for summary in ingest(
+            watcher,
+            args.workers,
+            cache=not args.no_cache,
+            spatial_stats=args.spatial,
+        ):
+            writer.write(summary)
+            if "error" in summary:
+                print(f"{summary['file']}: {summary['error']}", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+    return 0
+
+
+def _libc():
+    """Return the C library if it provides inotify, else raise OSError."""
+    if not sys.platform.startswith("linux"):
+        raise OSError("inotify is not available")
+    import ctypes.util  # pylint: disable=import-outside-toplevel
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError, TypeError) as err:
+        raise OSError("inotify is not available") from err
+    return libc
+
+
+if __name__ == "__main__":
+    sys.exit(main())